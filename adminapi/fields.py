@@ -1,22 +1,140 @@
-import io
+import binascii
+import tempfile
 
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from drf_extra_fields.fields import Base64FileField
 from drf_yasg import openapi
 from pypdf import PdfReader
 from pypdf.errors import PdfReadError
 from rest_framework import serializers
+from rest_framework.fields import FileField
+
+# bytes at start of file checked for PDF header
+PDF_HEADER_SIZE = 1024
+
+
+def is_valid_pdf(f):
+    """
+    Check an open (binary, seekable) file for the PDF header, then let pypdf read header, cross-reference table
+    and trailer - without parsing the whole document. pypdf finds the end-of-file marker also before trailing data.
+    """
+    f.seek(0)
+    if b'%PDF-' not in f.read(PDF_HEADER_SIZE):
+        return False
+    try:
+        f.seek(0)
+        PdfReader(f)
+    except PdfReadError:
+        return False
+    else:
+        return True
+
+
+class PDFFile(FileField):
+    """
+    Uploaded PDF file (e.g. multipart), checked with is_valid_pdf and limited to max_size
+    (default: settings.PDF_UPLOAD_MAX_SIZE)
+    """
+    def __init__(self, *args, **kwargs):
+        self.max_size = kwargs.pop('max_size', getattr(settings, 'PDF_UPLOAD_MAX_SIZE', None))
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        if self.max_size and file.size > self.max_size:
+            raise serializers.ValidationError(f"File is larger than the maximum size of {self.max_size} bytes")
+        if not is_valid_pdf(file):
+            raise serializers.ValidationError("File is not a valid pdf file")
+        file.seek(0)
+        return file
 
 
 class PDFBase64File(Base64FileField):
+    """
+    Base64-encoded PDF file, decoded chunk by chunk into a spooled temporary file, so that large files are not kept
+    in memory twice. Files larger than max_size (default: settings.PDF_UPLOAD_MAX_SIZE) are rejected while decoding.
+    """
     ALLOWED_TYPES = ['pdf']
 
-    def get_file_extension(self, filename, decoded_file):
+    # base64 characters decoded at once (multiple of 4)
+    CHUNK_SIZE = 4 * 1024 * 1024
+    # decoded files larger than this are spooled to disk
+    SPOOL_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, *args, **kwargs):
+        self.max_size = kwargs.pop('max_size', getattr(settings, 'PDF_UPLOAD_MAX_SIZE', None))
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+
+        if not isinstance(base64_data, str):
+            raise serializers.ValidationError(f"Invalid type. This is not an base64 string: {type(base64_data)}")
+
+        file_mime_type = None
+        # Strip base64 header, get mime_type from base64 header.
+        if ";base64," in base64_data:
+            header, base64_data = base64_data.split(";base64,")
+            if self.trust_provided_content_type:
+                file_mime_type = header.replace("data:", "")
+
+        # reject oversized files before decoding anything
+        if self.max_size and len(base64_data) // 4 * 3 > self.max_size + self.CHUNK_SIZE:
+            raise serializers.ValidationError(self.size_error_message())
+
+        decoded_file, size = self.decode(base64_data)
+        file_name = self.get_file_name(decoded_file)
+        file_extension = self.get_file_extension(file_name, decoded_file)
+        if file_extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+
+        decoded_file.seek(0)
+        data = UploadedFile(
+            file=decoded_file,
+            name=f'{file_name}.{file_extension}',
+            content_type=file_mime_type,
+            size=size
+        )
+        return FileField.to_internal_value(self, data)
+
+    def decode(self, base64_data):
+        """
+        Decode base64 string chunk by chunk into a SpooledTemporaryFile, enforcing max_size
+        """
+        decoded_file = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE)
+        size = 0
+        remainder = b''
         try:
-            PdfReader(io.BytesIO(decoded_file))
-        except PdfReadError as e:
-            raise serializers.ValidationError("File is not a valid pdf file")
-        else:
+            for start in range(0, len(base64_data), self.CHUNK_SIZE):
+                chunk = remainder + base64_data[start:start + self.CHUNK_SIZE].encode('ascii').translate(None, b' \t\r\n')
+                # decode complete 4-character groups only, carry over the rest
+                cut = len(chunk) - len(chunk) % 4
+                remainder = chunk[cut:]
+                decoded = binascii.a2b_base64(chunk[:cut])
+                size += len(decoded)
+                if self.max_size and size > self.max_size:
+                    raise serializers.ValidationError(self.size_error_message())
+                decoded_file.write(decoded)
+            if remainder:
+                raise binascii.Error('Incorrect padding')
+        except (UnicodeEncodeError, binascii.Error, ValueError):
+            decoded_file.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        except serializers.ValidationError:
+            decoded_file.close()
+            raise
+        return decoded_file, size
+
+    def get_file_extension(self, filename, decoded_file):
+        if is_valid_pdf(decoded_file):
             return 'pdf'
+        else:
+            raise serializers.ValidationError("File is not a valid pdf file")
+
+    def size_error_message(self):
+        return f"File is larger than the maximum size of {self.max_size} bytes"
 
     class Meta:
         swagger_schema_fields = {
@@ -0,0 +1,56 @@
+import base64
+import os
+
+from django.test import SimpleTestCase
+from rest_framework import serializers
+
+from adminapi.fields import PDFBase64File
+
+
+class PDFBase64FileTest(SimpleTestCase):
+    def setUp(self):
+        base64_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))),
+                                   "submissionapi", "tests", "file_base64", "file.txt")
+        with open(base64_file, 'r') as file:
+            self.base64_content = file.read()
+        self.pdf = base64.b64decode(self.base64_content)
+
+    def test_decode_chunked(self):
+        field = PDFBase64File()
+        field.CHUNK_SIZE = 1000
+        value = field.to_internal_value(self.base64_content)
+        self.assertTrue(value.name.endswith('.pdf'))
+        self.assertEqual(value.size, len(self.pdf))
+        self.assertEqual(b''.join(value.chunks()), self.pdf)
+
+    def test_data_uri(self):
+        field = PDFBase64File()
+        value = field.to_internal_value('data:application/pdf;base64,' + self.base64_content.replace('\n', ''))
+        self.assertEqual(value.size, len(self.pdf))
+
+    def test_not_pdf(self):
+        field = PDFBase64File()
+        with self.assertRaisesMessage(serializers.ValidationError, 'not a valid pdf'):
+            field.to_internal_value(base64.b64encode(b'Hello world, this is not a PDF file.').decode())
+        # truncated file without end-of-file marker
+        with self.assertRaisesMessage(serializers.ValidationError, 'not a valid pdf'):
+            field.to_internal_value(base64.b64encode(self.pdf[:len(self.pdf) // 2]).decode())
+
+    def test_trailing_data(self):
+        # accepted by pypdf, like data appended after the end-of-file marker by some producers
+        field = PDFBase64File()
+        value = field.to_internal_value(base64.b64encode(self.pdf + b'\n' + b'\0' * 4096).decode())
+        self.assertTrue(value.name.endswith('.pdf'))
+
+    def test_invalid_base64(self):
+        field = PDFBase64File()
+        with self.assertRaises(serializers.ValidationError):
+            field.to_internal_value(self.base64_content.replace('\n', '')[:-1])
+
+    def test_max_size(self):
+        field = PDFBase64File(max_size=len(self.pdf) - 1)
+        field.CHUNK_SIZE = 1000
+        with self.assertRaisesMessage(serializers.ValidationError, 'maximum size'):
+            field.to_internal_value(self.base64_content)
+        field = PDFBase64File(max_size=len(self.pdf))
+        self.assertEqual(field.to_internal_value(self.base64_content).size, len(self.pdf))
@@ -11,7 +11,7 @@ from adminapi.views.dashboard_views import ReportsByAgency, DashboardBadgesView
 from adminapi.views.flag_views import ReportFlagList
 from adminapi.views.institution_search_views import InstitutionAllList
 from adminapi.views.institution_views import InstitutionDetail, InstitutionCreate
-from adminapi.views.report_search_views import ReportList
+from adminapi.views.report_search_views import ReportList, ReportMeiliList
 from adminapi.views.report_views import ReportDetail, ReportFlagRemove, ReportCreate
 from adminapi.views.select_views import CountrySelectList, AgencySelectList, AgencyESGActivitySelectList, \
     LanguageSelectList, AssociationSelectList, EQARDecisionTypeSelectList, IdentifierResourceSelectList, \
@@ -105,6 +105,8 @@ urlpatterns = [
 
     # Browse endpoints
     re_path(r'^browse/(?P<request_type>["all"|"my"]+)/reports/$', ReportList.as_view(), name='report-list'),
+    re_path(r'^browse/(?P<request_type>["all"|"my"]+)/reports/meili/$', ReportMeiliList.as_view(),
+            name='report-list-meili'),
     re_path(r'^browse/(?P<request_type>["all"|"my"]+)/agencies/$', AgencyList.as_view(), name='agency-all'),
 
     # Swagger endpoints
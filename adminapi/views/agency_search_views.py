@@ -43,6 +43,7 @@ class AgencyList(ListAPIView):
     def list(self, request, request_type, *args, **kwargs):
         limit = request.query_params.get('limit', 10)
         offset = request.query_params.get('offset', 0)
+        cursor = request.query_params.get('cursor', None)
 
         filters = []
         filters_or = []
@@ -99,7 +100,8 @@ class AgencyList(ListAPIView):
         params['date_filters'] = date_filters
 
         searcher = Searcher(self.core)
-        searcher.initialize(params, start=offset, rows_per_page=limit, tie_breaker='name_sort asc')
+        searcher.initialize(params, start=offset, rows_per_page=limit, tie_breaker='name_sort asc',
+                            cursor_mark=cursor)
 
         try:
             response = searcher.search()
@@ -111,6 +113,10 @@ class AgencyList(ListAPIView):
             'results': response.docs,
             'facets': response.facets
         }
-        if (int(limit) + int(offset)) < int(response.hits):
+        if cursor:
+            resp['next_cursor'] = searcher.next_cursor(response)
+            if resp['next_cursor']:
+                resp['next'] = True
+        elif (int(limit) + int(offset)) < int(response.hits):
             resp['next'] = True
         return Response(resp)
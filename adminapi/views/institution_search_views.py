@@ -45,6 +45,7 @@ class InstitutionAllList(ListAPIView):
     def list(self, request, *args, **kwargs):
         limit = request.query_params.get('limit', 10)
         offset = request.query_params.get('offset', 0)
+        cursor = request.query_params.get('cursor', None)
 
         filters = []
         qf = [
@@ -90,7 +91,8 @@ class InstitutionAllList(ListAPIView):
         params['filters'] = filters
 
         searcher = Searcher(self.core)
-        searcher.initialize(params, start=offset, rows_per_page=limit, tie_breaker='name_sort asc')
+        searcher.initialize(params, start=offset, rows_per_page=limit, tie_breaker='name_sort asc',
+                            cursor_mark=cursor)
 
         try:
             response = searcher.search()
@@ -102,6 +104,10 @@ class InstitutionAllList(ListAPIView):
             'results': response.docs,
             'facets': response.facets
         }
-        if (int(limit) + int(offset)) < int(response.hits):
+        if cursor:
+            resp['next_cursor'] = searcher.next_cursor(response)
+            if resp['next_cursor']:
+                resp['next'] = True
+        elif (int(limit) + int(offset)) < int(response.hits):
             resp['next'] = True
         return Response(resp)
@@ -1,18 +1,24 @@
 import datetime
 import re
+from functools import cached_property
 
 from django.conf import settings
+from django.db.models import Q
 from django.utils.decorators import method_decorator
 from django_filters import rest_framework as filters, OrderingFilter
 from drf_yasg.utils import swagger_auto_schema
 from pysolr import SolrError
+from rest_framework.exceptions import ParseError
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework.status import HTTP_400_BAD_REQUEST
 
 from adminapi.inspectors.report_search_inspector import ReportSearchInspector
+from agencies.models import Agency, AgencyESGActivity
+from countries.models import Country
 from eqar_backend.searchers import Searcher
 from reports.models import Report
+from webapi.v2.views.meili_solr_view import MeiliSolrBackportView
 
 
 class ReportFilterClass(filters.FilterSet):
@@ -49,6 +55,7 @@ class ReportList(ListAPIView):
     def list(self, request, request_type, *args, **kwargs):
         limit = request.query_params.get('limit', 10)
         offset = request.query_params.get('offset', 0)
+        cursor = request.query_params.get('cursor', None)
 
         filters = []
         filters_or = []
@@ -146,7 +153,8 @@ class ReportList(ListAPIView):
         params['date_filters'] = date_filters
 
         searcher = Searcher(self.core)
-        searcher.initialize(params, start=offset, rows_per_page=limit, tie_breaker='institution_programme_sort asc')
+        searcher.initialize(params, start=offset, rows_per_page=limit, tie_breaker='institution_programme_sort asc',
+                            cursor_mark=cursor)
 
         try:
             response = searcher.search()
@@ -158,6 +166,175 @@ class ReportList(ListAPIView):
             'results': response.docs,
             'facets': response.facets
         }
-        if (int(limit) + int(offset)) < int(response.hits):
+        if cursor:
+            resp['next_cursor'] = searcher.next_cursor(response)
+            if resp['next_cursor']:
+                resp['next'] = True
+        elif (int(limit) + int(offset)) < int(response.hits):
             resp['next'] = True
         return Response(resp)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+   filter_inspectors=[ReportSearchInspector]
+))
+class ReportMeiliList(MeiliSolrBackportView):
+    """
+    Returns a list of reports based on Meilisearch, in the same format as the Solr-based admin report list.
+    """
+    queryset = Report.objects.all()
+    filter_backends = (filters.DjangoFilterBackend,)
+    filterset_class = ReportFilterClass
+
+    MEILI_INDEX = 'INDEX_REPORTS'
+    ORDERING_MAPPING = {
+        "name": "institutions.name_sort",
+        "institution_programme_sort": "institutions.name_sort",
+        "date_created": "created_at",
+        "date_updated": "updated_at",
+        "valid_from": "valid_from",
+        "valid_to_calculated": "valid_to_calculated",
+        "agency": "agency.acronym_primary",
+        "agency_sort": "agency.acronym_primary",
+        "country": "institutions.locations.country.name_english",
+        "activity": "agency_esg_activities.type",
+        "flag": "flag",
+        "flag_level": "flag",
+    }
+    CURSOR_FIELDS = ( 'created_at', 'updated_at', 'valid_from', 'valid_to_calculated' )
+    FACET_NAMES = {
+        'agency.id': 'agency_facet',
+        'contributing_agencies.id': 'agency_facet',
+        'institutions.locations.country.id': 'country_facet',
+        'platforms.locations.country.id': 'country_facet',
+        'flag': 'flag_level_facet',
+        'agency_esg_activities.id': 'activity_facet',
+        'agency_esg_activities.type': 'activity_type_facet',
+        'programmes.programme_type': 'programme_type_facet',
+    }
+    FACET_LOOKUP = {
+        'agency.id':                         { 'model': Agency,            'attribute': 'acronym_primary' },
+        'contributing_agencies.id':          { 'model': Agency,            'attribute': 'acronym_primary' },
+        'institutions.locations.country.id': { 'model': Country,           'attribute': 'name_english' },
+        'platforms.locations.country.id':    { 'model': Country,           'attribute': 'name_english' },
+        'agency_esg_activities.id':          { 'model': AgencyESGActivity, 'attribute': 'activity_display' },
+    }
+    ATTRIBUTES_TO_RETRIEVE = [
+        'id', 'local_identifier',
+        'agency', 'agency_esg_activities',
+        'institutions', 'programmes',
+        'valid_from', 'valid_to', 'valid_to_calculated',
+        'created_at', 'updated_at',
+        'flag',
+    ]
+
+    @cached_property
+    def activity_names(self):
+        """
+        names of all ESG activities, as indexed in Solr (display name, if set)
+        """
+        return {
+            activity.id: activity.activity_display or activity.activity
+            for activity in AgencyESGActivity.objects.all()
+        }
+
+    def make_my_filter(self, request):
+        """
+        reports created by the user or by/with the agency the user submits for
+        """
+        my_filter = [ f'created_by = {request.user.id}' ]
+        submitting_agency = request.user.deqarprofile.submitting_agency
+        if submitting_agency.agency:
+            agency_id = submitting_agency.agency.id
+            my_filter.append(f'agency.id = {agency_id} OR contributing_agencies.id = {agency_id}')
+        return ' OR '.join(my_filter)
+
+    def make_filters(self, request):
+        filters = []
+
+        if self.kwargs.get('request_type') == 'my':
+            filters.append(self.make_my_filter(request))
+
+        if report_id := request.query_params.get('id', None):
+            if not report_id.isdecimal():
+                raise ParseError(detail=f'value [{report_id}] for id cannot be parsed to int')
+            filters.append(f'id = {report_id}')
+
+        if local_id := request.query_params.get('local_id', None):
+            filters.append(f'local_identifier = "{local_id}"')
+
+        if agency_id := self.lookup_object(Agency, 'acronym_primary', 'agency', 'id', 'agency_id'):
+            filters.append(f'agency.id = {agency_id} OR contributing_agencies.id = {agency_id}')
+
+        if country_id := self.lookup_object(Country, 'name_english', 'country', 'id', 'country_id'):
+            filters.append(f'institutions.locations.country.id = {country_id} OR platforms.locations.country.id = {country_id}')
+
+        if activity := request.query_params.get('activity', None):
+            activity_ids = AgencyESGActivity.objects.filter(
+                Q(activity_display=activity) | Q(activity=activity)
+            ).values_list('id', flat=True)
+            if not activity_ids:
+                raise ParseError(detail=f'unknown value [{activity}] for activity')
+            filters.append(f'agency_esg_activities.id IN [ {", ".join(str(i) for i in activity_ids)} ]')
+
+        if activity_type := request.query_params.get('activity_type', None):
+            filters.append(f'agency_esg_activities.type = "{activity_type}"')
+
+        if flag := request.query_params.get('flag', None):
+            filters.append(f'flag = "{flag}"')
+
+        if programme_type := request.query_params.get('programme_type', None):
+            filters.append(f'programmes.programme_type = "{programme_type}"')
+
+        if request.query_params.get('active', None) == 'true':
+            filters.append(f'valid_to_calculated >= {int(datetime.datetime.now().timestamp())}')
+
+        if year := request.query_params.get('year', None):
+            if re.match(r'.*([1-3][0-9]{3})', year):
+                try:
+                    filters.append(f'valid_from <= {int(datetime.datetime(year=int(year), month=12, day=31, hour=23, minute=59, second=59).timestamp())}')
+                    filters.append(f'valid_to_calculated >= {int(datetime.datetime(year=int(year), month=1, day=1).timestamp())}')
+                except ValueError:
+                    pass
+
+        if year_created := request.query_params.get('year_created', None):
+            if re.match(r'.*([1-3][0-9]{3})', year_created):
+                try:
+                    date_from = datetime.datetime(year=int(year_created), month=1, day=1)
+                    date_to = datetime.datetime(year=int(year_created), month=12, day=31, hour=23, minute=59, second=59)
+                    filters.append(f'created_at {int(date_from.timestamp())} TO {int(date_to.timestamp())}')
+                except ValueError:
+                    pass
+
+        return filters
+
+    def make_meili_params(self, request):
+        return {
+            'attributesToRetrieve': self.ATTRIBUTES_TO_RETRIEVE,
+        }
+
+    def convert_hit(self, r):
+        """
+        convert result structure to the fields previously returned from Solr
+        """
+        institutions = r.pop('institutions')
+        r['country'] = list({ l['country']['name_english'] for i in institutions for l in i['locations'] })
+        institutions = "; ".join(i['name_primary'] for i in institutions)
+        programmes = " / ".join(p['name_primary'] for p in r.pop('programmes'))
+        if programmes:
+            r['institution_programme_primary'] = f'{institutions} - {programmes}'
+        else:
+            r['institution_programme_primary'] = institutions
+
+        r['local_id'] = r.pop('local_identifier')
+        r['agency_acronym'] = r.pop('agency')['acronym_primary']
+        activities = r.pop('agency_esg_activities')
+        r['agency_esg_activity'] = [ self.activity_names.get(a['id']) for a in activities ]
+        r['agency_esg_activity_type'] = list({ a['type'] for a in activities })
+        r['flag_level'] = r.pop('flag')
+
+        r['valid_from'] = self.timestamp_to_isodatetime(r['valid_from'])
+        r['valid_to'] = self.timestamp_to_isodatetime(r['valid_to'])
+        r['valid_to_calculated'] = self.timestamp_to_isodatetime(r['valid_to_calculated'])
+        r['date_created'] = self.timestamp_to_isodatetime(r.pop('created_at'))
+        r['date_updated'] = self.timestamp_to_isodatetime(r.pop('updated_at'))
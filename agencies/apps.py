@@ -7,4 +7,5 @@ class AgenciesConfig(AppConfig):
     def ready(self):
         super(AgenciesConfig, self).ready()
         from agencies.signals import do_index_agencies
+        from agencies.signals import do_delete_agencies
         from agencies.signals import do_index_reports_upon_activity_name_change
\ No newline at end of file
@@ -46,7 +46,7 @@ class AgencyIndexer:
             'allowed_agency_facet': []
         }
 
-    def index(self):
+    def index(self, fail_silently=True):
         self._index_agency()
         self._remove_duplicates()
         self._remove_empty_keys()
@@ -55,6 +55,17 @@ class AgencyIndexer:
             print('Indexed Agency No. %s!' % self.doc['id'])
         except pysolr.SolrError as e:
             print('Error with Agency No. %s! Error: %s' % (self.doc['id'], e))
+            if not fail_silently:
+                raise
+
+    @classmethod
+    def delete_many(cls, agency_ids):
+        """
+        Delete several agencies from Solr with one request
+        """
+        agency_ids = [ str(agency_id) for agency_id in agency_ids ]
+        if agency_ids:
+            cls(None).solr.delete(id=agency_ids, commit=True)
 
     def _index_agency(self):
         # Index display fields
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0019_alter_agencyactivitygroup_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReindexJob',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('reason', models.CharField(blank=True, max_length=200)),
+                ('reports_total', models.PositiveIntegerField(default=0)),
+                ('reports_done', models.PositiveIntegerField(default=0)),
+                ('programmes_total', models.PositiveIntegerField(default=0)),
+                ('programmes_done', models.PositiveIntegerField(default=0)),
+                ('institutions_total', models.PositiveIntegerField(default=0)),
+                ('institutions_done', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('activity', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='agencies.agencyesgactivity')),
+                ('agency', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='agencies.agency')),
+            ],
+            options={
+                'verbose_name': 'Reindex Job',
+                'db_table': 'deqar_agency_reindex_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
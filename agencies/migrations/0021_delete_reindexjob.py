@@ -0,0 +1,16 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0020_reindexjob'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ReindexJob',
+        ),
+    ]
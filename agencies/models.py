@@ -1,7 +1,6 @@
 import datetime
 from datetime import date
 
-import celery
 from django.db import models
 from django.db.models import Q
 from django.contrib.auth.models import User
@@ -123,10 +122,12 @@ class AgencyNameVersion(models.Model):
             self.agency_name.agency.name_primary = new_name_primary
             self.agency_name.agency.acronym_primary = new_acronym_primary
             self.agency_name.agency.save()
-            celery.current_app.send_task('agencies.tasks.index_reports_when_agency_acronym_changes',
-                                         (self.agency_name.agency.id,))
-            celery.current_app.send_task('agencies.tasks.index_institutions_when_agency_acronym_changes',
-                                         (self.agency_name.agency.id,))
+            # the name and acronym are part of the report documents; the relay reindexes the programmes and
+            # institutions of the reports along with them
+            from agencies.reindex import get_affected_ids
+            from outbox.models import OutboxEvent
+            OutboxEvent.record(OutboxEvent.ENTITY_REPORT,
+                               get_affected_ids(agency_id=self.agency_name.agency.id)['reports'])
 
     class Meta:
         db_table = 'deqar_agency_name_versions'
@@ -212,6 +213,27 @@ class AgencyESGActivity(models.Model):
     activity_valid_from = models.DateField(default=date.today)
     activity_valid_to = models.DateField(blank=True, null=True)
 
+    # fields that are denormalised into the search indexes of reports, programmes and institutions
+    INDEXED_FIELDS = ('activity', 'activity_display', 'activity_group_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # keep loaded values, so that changes to indexed fields can be detected without re-reading the record
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def indexed_fields_changed(self):
+        """
+        Whether any of INDEXED_FIELDS changed since the record was loaded
+        """
+        if self._state.adding or self.id is None:
+            return False
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or any(loaded.get(field, models.DEFERRED) is models.DEFERRED for field in self.INDEXED_FIELDS):
+            loaded = AgencyESGActivity.objects.filter(id=self.id).values(*self.INDEXED_FIELDS).first() or {}
+        return any(loaded.get(field) != getattr(self, field) for field in self.INDEXED_FIELDS)
+
     def __str__(self):
         if self.activity_display:
             return self.activity_display
@@ -0,0 +1,30 @@
+from django.db.models import Q
+
+from programmes.models import Programme
+from reports.models import Report
+
+
+def get_affected_ids(agency_id=None, activity_id=None):
+    """
+    IDs of the reports, programmes and institutions whose index documents include data of the agency (as agency
+    or contributing agency) or the ESG activity - one query per entity, returns dict of sorted lists
+    """
+    if agency_id is not None:
+        reports = Report.objects.filter(
+            Q(agency_id=agency_id) |
+            Q(id__in=Report.contributing_agencies.through.objects.filter(agency_id=agency_id).values('report_id'))
+        ).values('id')
+    else:
+        reports = Report.objects.filter(
+            id__in=Report.agency_esg_activities.through.objects.filter(agencyesgactivity_id=activity_id).values('report_id')
+        ).values('id')
+
+    return {
+        'reports': sorted(reports.values_list('id', flat=True)),
+        'programmes': sorted(Programme.objects.filter(report_id__in=reports).values_list('id', flat=True)),
+        'institutions': sorted(
+            Report.institutions.through.objects.filter(report_id__in=reports)
+                .order_by().values_list('institution_id', flat=True).distinct()
+        ),
+    }
+
@@ -1,26 +1,29 @@
-import sys
-
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 
 from agencies.models import Agency, AgencyESGActivity, AgencyNameVersion
-from agencies.tasks import index_agency
-from reports.tasks import index_report
+from outbox.models import OutboxEvent
 
 
 @receiver(post_save, sender=Agency)
 def do_index_agencies(sender, instance, **kwargs):
-    index_agency.delay(instance.id)
+    OutboxEvent.record(OutboxEvent.ENTITY_AGENCY, instance.id)
+
+
+@receiver(post_delete, sender=Agency)
+def do_delete_agencies(sender, instance, **kwargs):
+    OutboxEvent.record(OutboxEvent.ENTITY_AGENCY, instance.id, op=OutboxEvent.OP_DELETE)
 
 
 @receiver(pre_save, sender=AgencyESGActivity)
 def do_index_reports_upon_activity_name_change(sender, instance, **kwargs):
-    if 'test' not in sys.argv:
-        if instance.id is not None:
-            original = AgencyESGActivity.objects.get(id=instance.id)
-            if original.activity_display != instance.activity_display or \
-               original.activity != instance.activity or \
-               original.activity_type != instance.activity_type:
-                # If the activity name has changed, re-index all reports
-                for report in instance.reports.iterator():
-                    index_report.delay(report.id)
+    if instance.indexed_fields_changed():
+        # If the activity name or group has changed, re-index everything that includes it: the relay reindexes
+        # the programmes and institutions of the reports along with them
+        OutboxEvent.record(OutboxEvent.ENTITY_REPORT, instance.reports.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=AgencyESGActivity)
+def do_reset_loaded_values(sender, instance, **kwargs):
+    # only once saved, so that all pre_save receivers compare against the values loaded before
+    instance._loaded_values = { field: getattr(instance, field) for field in instance.INDEXED_FIELDS }
@@ -0,0 +1,82 @@
+from django.db.models import Q
+from django.test import TestCase
+
+from agencies import reindex
+from agencies.models import AgencyESGActivity, AgencyNameVersion
+from institutions.models import Institution
+from outbox.models import OutboxEvent
+from programmes.models import Programme
+from reports.models import Report
+
+
+class CascadeReindexTestCase(TestCase):
+    """
+    Test module for cascade reindexing upon agency/activity changes
+    """
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'qf_ehea_level', 'eqar_decision_type', 'language',
+        'agency_activity_type', 'agency_focus', 'identifier_resource', 'flag', 'permission_type', 'degree_outcome',
+        'agency_historical_field',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'institution_historical_field',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+        'programme_demo_01', 'programme_demo_02', 'programme_demo_03',
+        'programme_demo_04', 'programme_demo_05', 'programme_demo_06',
+        'programme_demo_07', 'programme_demo_08', 'programme_demo_09',
+        'programme_demo_10', 'programme_demo_11', 'programme_demo_12',
+        'report_decision', 'report_status',
+        'users', 'report_demo_01',
+    ]
+
+    def test_affected_ids_agency(self):
+        with self.assertNumQueries(3):
+            affected = reindex.get_affected_ids(agency_id=2)
+        reports = Report.objects.filter(Q(agency_id=2) | Q(contributing_agencies__id=2)).distinct()
+        self.assertTrue(affected['reports'])
+        self.assertEqual(affected['reports'], sorted(reports.values_list('id', flat=True)))
+        self.assertEqual(affected['programmes'],
+                         sorted(Programme.objects.filter(report__in=reports).values_list('id', flat=True)))
+        self.assertEqual(affected['institutions'],
+                         sorted(Institution.objects.filter(reports__in=reports).distinct().values_list('id', flat=True)))
+
+    def test_affected_ids_activity(self):
+        activity = AgencyESGActivity.objects.filter(reports__isnull=False).first()
+        with self.assertNumQueries(3):
+            affected = reindex.get_affected_ids(activity_id=activity.id)
+        self.assertEqual(affected['reports'], sorted(activity.reports.values_list('id', flat=True)))
+
+    def test_indexed_fields_changed(self):
+        activity = AgencyESGActivity.objects.get(id=1)
+        with self.assertNumQueries(0):
+            self.assertFalse(activity.indexed_fields_changed())
+            activity.activity_description = 'not indexed'
+            self.assertFalse(activity.indexed_fields_changed())
+            activity.activity_display = 'New display name'
+            self.assertTrue(activity.indexed_fields_changed())
+        # values not loaded
+        activity = AgencyESGActivity.objects.only('id').get(id=1)
+        activity.activity = 'Renamed'
+        self.assertTrue(activity.indexed_fields_changed())
+        self.assertFalse(AgencyESGActivity(activity='New').indexed_fields_changed())
+
+    def test_activity_change_recorded(self):
+        activity = AgencyESGActivity.objects.filter(reports__isnull=False).first()
+        # the display name is recomputed upon saving
+        activity.save()
+        OutboxEvent.objects.all().delete()
+        activity.activity_description = 'not indexed'
+        activity.save()
+        self.assertFalse(OutboxEvent.objects.exists())
+        activity.activity = 'Renamed'
+        activity.save()
+        self.assertEqual(set(OutboxEvent.objects.filter(entity=OutboxEvent.ENTITY_REPORT).values_list('object_id', flat=True)),
+                         set(activity.reports.values_list('id', flat=True)))
+
+    def test_agency_name_change_recorded(self):
+        name_version = AgencyNameVersion.objects.filter(agency_name__agency_id=5, acronym_is_primary=True).first()
+        OutboxEvent.objects.all().delete()
+        name_version.acronym = 'NEW'
+        name_version.save()
+        self.assertTrue(OutboxEvent.objects.filter(entity=OutboxEvent.ENTITY_REPORT).exists())
+        self.assertEqual(set(OutboxEvent.objects.filter(entity=OutboxEvent.ENTITY_REPORT).values_list('object_id', flat=True)),
+                         set(reindex.get_affected_ids(agency_id=5)['reports']))
@@ -1,5 +1,6 @@
+import io
 import os
-from datetime import datetime
+import threading
 
 from django.core.exceptions import ObjectDoesNotExist
 from langdetect import detect, DetectorFactory, LangDetectException
@@ -8,12 +9,25 @@ from django.db.models import Q
 
 from agencies.models import Agency, AgencyActivityType
 from countries.models import Country
-from institutions.models import Institution, InstitutionHierarchicalRelationship
+from institutions.graph import get_graph
+from institutions.models import Institution
+from connectapi.europass.change_detection import EuropassFingerprint
 from programmes.models import Programme
 from reports.models import Report
 from lxml import etree
 from urllib.parse import urljoin
 
+XSD_FILE = os.path.join(os.path.dirname(__file__), 'schema', 'ams.xsd')
+
+# compiled schema, kept per thread as validators collect their error log
+_schema = threading.local()
+
+
+def get_schema():
+    if not hasattr(_schema, 'schema'):
+        _schema.schema = etree.XMLSchema(etree.parse(XSD_FILE))
+    return _schema.schema
+
 
 class AccrediationXMLCreatorV2:
     attr_qname = etree.QName("http://www.w3.org/2001/XMLSchema-instance", "schemaLocation")
@@ -41,6 +55,27 @@ class AccrediationXMLCreatorV2:
         'third cycle': 'http://data.europa.eu/snb/eqf/8',
     }
 
+    # related objects fetched in bulk with each chunk of reports/institutions
+    REPORT_PREFETCH = (
+        'institutions__institutionqfehealevel_set__qf_ehea_level',
+        'agency_esg_activities',
+        'reportfile_set__languages',
+        'programme_set__qf_ehea_level',
+        'programme_set__programmename_set',
+        'programme_set__programmeidentifier_set',
+        'reportlink_set',
+        'reportupdatelog_set',
+    )
+    INSTITUTION_PREFETCH = (
+        'institutioncountry_set__country__parent',
+        'institutionidentifier_set',
+        'institutionname_set',
+        'institutionupdatelog_set',
+    )
+    CHUNK_SIZE = 200
+    # hierarchical relationship types not followed when collecting institutions
+    HIERARCHY_EXCLUDE_TYPES = (1,)
+
     def __init__(self, country, request=None, baseurl=None, check=True):
         DetectorFactory.seed = 0
         self.request = request
@@ -51,7 +86,11 @@ class AccrediationXMLCreatorV2:
         self.agencies = set()
         self.institutions = set()
         self.agency_countries = set()
+        self.institution_locations = []
         self.locations = set()
+        self._activity_types = None
+        self._graph = None
+        self._hierarchy = None
         self.root = etree.Element(
             f"{self.NS}Accreditations",
             {self.attr_qname: 'http://data.europa.eu/snb/model/ap/ams-constraints/ ams.xsd'},
@@ -79,14 +118,90 @@ class AccrediationXMLCreatorV2:
         self.create_xml()
         return self.validate_xml()
 
-    def get_mtime(self):
+    def stream(self, output):
+        """
+        Write the XML document incrementally to a file-like object, without building the whole
+        tree in memory. The output is not validated against the XSD.
+        """
+        for _ in self.write_xml(output):
+            pass
+
+    def iter_xml(self):
+        """
+        Generate the XML document as a sequence of byte strings, e.g. for a streaming HTTP response
+        """
+        buffer = io.BytesIO()
+        for _ in self.write_xml(buffer):
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    def write_xml(self, output):
+        """
+        Write the XML document to output element by element, yielding after each chunk of records
+        """
         self.collect_reports()
-        last_modified = datetime.fromtimestamp(0)
-        for report in self.reports.iterator():
-            # update last modified
-            if report.updated_at > last_modified:
-                last_modified = report.updated_at
-        return last_modified
+        with etree.xmlfile(output, encoding='utf-8') as xf:
+            xf.write_declaration()
+            with xf.element(self.root.tag, self.root.attrib, nsmap=self.root.nsmap):
+                with xf.element(f"{self.NS}accreditationReferences"):
+                    for i, report in enumerate(self.reports.select_related('agency', 'decision')
+                                                           .prefetch_related(*self.REPORT_PREFETCH)
+                                                           .iterator(chunk_size=self.CHUNK_SIZE)):
+                        self.accreditations = etree.Element(f"{self.NS}accreditationReferences", nsmap=self.NSMAP)
+                        self.add_report(report)
+                        self._flush_container(xf, self.accreditations)
+                        if i % self.CHUNK_SIZE == self.CHUNK_SIZE - 1:
+                            xf.flush()
+                            yield
+
+                with xf.element(f"{self.NS}agentReferences"):
+                    self.orgReferences = etree.Element(f"{self.NS}agentReferences", nsmap=self.NSMAP)
+                    self.add_agencies()
+                    self._flush_container(xf, self.orgReferences)
+                    for i, institution in enumerate(self.get_institutions()):
+                        self.assemble_institution(institution)
+                        self._flush_container(xf, self.orgReferences)
+                        if i % self.CHUNK_SIZE == self.CHUNK_SIZE - 1:
+                            xf.flush()
+                            yield
+
+                with xf.element(f"{self.NS}locationReferences"):
+                    self.locationReferences = etree.Element(f"{self.NS}locationReferences", nsmap=self.NSMAP)
+                    self.add_location_from_agencies()
+                    self.add_locations_from_institutions()
+                    self._flush_container(xf, self.locationReferences)
+        yield
+
+    @classmethod
+    def _flush_container(cls, xf, container):
+        # write out and discard the elements collected in a detached container element
+        for element in container:
+            cls._write_element(xf, element)
+        for element in list(container):
+            container.remove(element)
+
+    @classmethod
+    def _write_element(cls, xf, element):
+        # xf.write(element) would serialise each record standalone, repeating all namespace declarations;
+        # written through xf.element() it uses the namespaces already declared on the root element
+        if not isinstance(element.tag, str):
+            xf.write(element, with_tail=False)
+        else:
+            with xf.element(element.tag, element.attrib):
+                if element.text:
+                    xf.write(element.text)
+                for child in element:
+                    cls._write_element(xf, child)
+        if element.tail:
+            xf.write(element.tail)
+
+    def get_fingerprint(self):
+        return EuropassFingerprint.for_country(self.country)
+
+    def get_mtime(self):
+        return self.get_fingerprint().last_modified
 
     def collect_reports(self):
         institutions = Institution.objects.filter(
@@ -100,40 +215,64 @@ class AccrediationXMLCreatorV2:
             ~Q(flag=3)
         ).order_by('id').distinct('id')
 
-    def collect_institution(self, iid):
-        # add institution to list for inclusion, recurse to children and parents
-        if iid not in self.institutions:
-            self.institutions.add(iid)
-
-            # Add child institutions
-            for ih in InstitutionHierarchicalRelationship.objects.filter(
-                institution_parent__id=iid,
-            ).exclude(relationship_type=1).values('institution_child_id').all():
-                self.collect_institution(ih['institution_child_id'])
-
-            # Add parent institutions
-            for ih in InstitutionHierarchicalRelationship.objects.filter(
-                institution_child__id=iid,
-            ).exclude(relationship_type=1).values('institution_parent_id').all():
-                self.collect_institution(ih['institution_parent_id'])
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = get_graph()
+        return self._graph
 
-    def create_xml(self):
-        for report in self.reports.iterator():
-            self.current_report = report
-            # Prepare list for agencies
-            self.agencies.add(report.agency_id)
+    @property
+    def hierarchy(self):
+        """
+        Hierarchical relationships (other than type 1) as (children, parents) maps of institution IDs,
+        taken from the institution relationship graph and ordered by relationship ID
+        """
+        if self._hierarchy is None:
+            children = {}
+            parents = {}
+            for parent_id, edges in self.graph.children.items():
+                for edge in edges:
+                    if edge.type_id not in self.HIERARCHY_EXCLUDE_TYPES:
+                        children.setdefault(parent_id, []).append(edge.institution)
+            for child_id, edges in self.graph.parents.items():
+                for edge in edges:
+                    if edge.type_id not in self.HIERARCHY_EXCLUDE_TYPES:
+                        parents.setdefault(child_id, []).append(edge.institution)
+            self._hierarchy = (children, parents)
+        return self._hierarchy
+
+    def get_activity_type(self, report):
+        if self._activity_types is None:
+            self._activity_types = { t.id: t for t in AgencyActivityType.objects.all() }
+        return self._activity_types[report.activity_type_id]
 
-            # Prepare list for institutions
-            for institution in report.institutions.values('id').all():
-                self.collect_institution(institution['id'])
+    def collect_institution(self, iid):
+        # add institution to list for inclusion, walk to children and parents
+        self.graph.hierarchy_component(iid, exclude_types=self.HIERARCHY_EXCLUDE_TYPES, seen=self.institutions)
 
-            # Create accreditation records
-            self.add_accreditation()
+    def create_xml(self):
+        for report in self.reports.select_related('agency', 'decision') \
+                                  .prefetch_related(*self.REPORT_PREFETCH) \
+                                  .iterator(chunk_size=self.CHUNK_SIZE):
+            self.add_report(report)
 
         # Create orgs and organisations
         self.add_agencies()
         self.add_location_from_agencies()
         self.add_institutions()
+        self.add_locations_from_institutions()
+
+    def add_report(self, report):
+        self.current_report = report
+        # Prepare list for agencies
+        self.agencies.add(report.agency_id)
+
+        # Prepare list for institutions
+        for institution in report.institutions.all():
+            self.collect_institution(institution.id)
+
+        # Create accreditation records
+        self.add_accreditation()
 
     def add_accreditation(self):
             acc = etree.SubElement(self.accreditations, f"{self.NS}accreditation",
@@ -151,7 +290,7 @@ class AccrediationXMLCreatorV2:
             issued.text = self.current_report.created_at.strftime("%Y-%m-%dT%H:%M:%S")
 
             # type
-            activity_type = AgencyActivityType.objects.get(pk=self.current_report.get_activity_type())
+            activity_type = self.get_activity_type(self.current_report)
             etree.SubElement(acc, f"{self.NS}type", uri=self.REPORT_TYPES[activity_type.type])
 
             # title
@@ -172,12 +311,14 @@ class AccrediationXMLCreatorV2:
                 pref_label.text = self.current_report.decision.decision
 
             # report
-            for idx, reportfile in enumerate(self.current_report.reportfile_set.exclude(file='').iterator()):
+            report_files = [ reportfile for reportfile in self.current_report.reportfile_set.all() if reportfile.file ]
+            for idx, reportfile in enumerate(report_files):
+                languages = reportfile.languages.all()
                 if idx == 0:
                     rf = etree.SubElement(acc, f"{self.NS}report")
 
                     if reportfile.file_display_name:
-                        lang = reportfile.languages.first().iso_639_1 if reportfile.languages.count() > 0 else 'en'
+                        lang = languages[0].iso_639_1 if len(languages) > 0 else 'en'
                         rf_title = etree.SubElement(
                             rf,
                             f"{self.NS}title",
@@ -190,12 +331,12 @@ class AccrediationXMLCreatorV2:
                             attrib={'language': 'en'})
                         rf_title.text = "quality assurance report"
 
-                    if reportfile.languages.count() > 0:
+                    if len(languages) > 0:
                         etree.SubElement(
                             rf,
                             f"{self.NS}language",
                             uri=f"http://publications.europa.eu/resource/authority/language/"
-                                f"{self.encode_language(reportfile.languages.first().iso_639_2)}")
+                                f"{self.encode_language(languages[0].iso_639_2)}")
 
                     content_url = etree.SubElement(rf, f"{self.NS}contentUrl")
                     content_url.text = self.build_absolute_uri(reportfile.file.url)
@@ -226,7 +367,7 @@ class AccrediationXMLCreatorV2:
                     })
                 pref_label.text = programme.name_primary
                 # Programme alternative titles
-                for alternative_name in programme.programmename_set.iterator():
+                for alternative_name in programme.programmename_set.all():
                     if alternative_name.name and not alternative_name.name_is_primary:
                         alt_label = etree.SubElement(
                             programme_element,
@@ -234,15 +375,16 @@ class AccrediationXMLCreatorV2:
                             attrib={'language': self.guess_language_from_string(alternative_name.name)})
                         alt_label.text = alternative_name.name
                 # Agency identifiers
-                if programme.programmeidentifier_set.count() > 0:
-                    programme_identifier = programme.programmeidentifier_set.first()
+                programme_identifiers = programme.programmeidentifier_set.all()
+                if len(programme_identifiers) > 0:
+                    programme_identifier = min(programme_identifiers, key=lambda i: i.pk)
                     notation = etree.SubElement(programme_element,
                                                 f"{{http://www.w3.org/2004/02/skos/core#}}notation")
                     notation.text = programme_identifier.identifier
 
             # accreditingAgent
             etree.SubElement(acc, f"{self.NS}accreditingAgent",
-                             idref=f"https://data.deqar.eu/agency/{self.current_report.agency.id}")
+                             idref=f"https://data.deqar.eu/agency/{self.current_report.agency_id}")
 
             # issued
             if self.current_report.valid_from:
@@ -277,7 +419,7 @@ class AccrediationXMLCreatorV2:
             content_url = etree.SubElement(landing_page, f"{self.NS}contentUrl")
             content_url.text = f"https://data.deqar.eu/report/{self.current_report.id}"
 
-            for rl in self.current_report.reportlink_set.iterator():
+            for rl in self.current_report.reportlink_set.all():
                 if rl.link:
                     landing_page = etree.SubElement(acc, f"{self.NS}landingPage")
                     lp_title = etree.SubElement(landing_page, f"{self.NS}title", attrib={'language': 'en'})
@@ -287,24 +429,25 @@ class AccrediationXMLCreatorV2:
                     content_url.text = rl.link
 
             # supplementaryDocument
-            for idx, reportfile in enumerate(self.current_report.reportfile_set.exclude(file='').iterator()):
+            for idx, reportfile in enumerate(report_files):
+                languages = reportfile.languages.all()
                 if idx > 0:
                         rf = etree.SubElement(acc, f"{self.NS}supplementaryDocument")
 
                         if reportfile.file_display_name:
-                            lang = reportfile.languages.first().iso_639_1 if reportfile.languages.count() > 0 else 'en'
+                            lang = languages[0].iso_639_1 if len(languages) > 0 else 'en'
                             rf_title = etree.SubElement(rf, f"{self.NS}title", attrib={'language': lang})
                             rf_title.text = reportfile.file_display_name
                         else:
                             rf_title = etree.SubElement(rf, f"{self.NS}title", attrib={'language': 'en'})
                             rf_title.text = "quality assurance report"
 
-                        if reportfile.languages.count() > 0:
+                        if len(languages) > 0:
                             etree.SubElement(
                                 rf,
                                 f"{self.NS}language",
                                 uri=f"http://publications.europa.eu/resource/authority/language/"
-                                    f"{self.encode_language(reportfile.languages.first().iso_639_2)}")
+                                    f"{self.encode_language(languages[0].iso_639_2)}")
 
                         content_url = etree.SubElement(rf, f"{self.NS}contentUrl")
                         content_url.text = self.build_absolute_uri(reportfile.file.url)
@@ -314,7 +457,7 @@ class AccrediationXMLCreatorV2:
             status.text = "released"
 
             # lastModificationDate
-            last_modifiation = self.current_report.reportupdatelog_set.first()
+            last_modifiation = min(self.current_report.reportupdatelog_set.all(), key=lambda l: l.pk, default=None)
             modified = etree.SubElement(acc, f"{self.NS}modified")
             if last_modifiation:
                 modified.text = last_modifiation.updated_at.strftime("%Y-%m-%dT%H:%M:%S")
@@ -415,12 +558,17 @@ class AccrediationXMLCreatorV2:
             else:
                 last_modifiation_date.text = agency.created_at.strftime("%Y-%m-%dT%H:%M:%S")
 
+    def get_institutions(self):
+        return Institution.objects.filter(pk__in=self.institutions) \
+                                  .prefetch_related(*self.INSTITUTION_PREFETCH) \
+                                  .iterator(chunk_size=self.CHUNK_SIZE)
+
     def add_institutions(self):
-        for institution in Institution.objects.filter(pk__in=self.institutions).iterator():
+        for institution in self.get_institutions():
             self.assemble_institution(institution)
 
     def assemble_institution(self, institution):
-        country = institution.institutioncountry_set.filter(country_verified=True).first()
+        country = next((ic for ic in institution.institutioncountry_set.all() if ic.country_verified), None)
         org = etree.SubElement(self.orgReferences, f"{self.NS}organisation",
                                id=f"https://data.deqar.eu/institution/{institution.id}")
 
@@ -465,7 +613,7 @@ class AccrediationXMLCreatorV2:
         scheme_agency.text = "DEQAR"
 
         # vatIdentifier
-        for identifier in institution.institutionidentifier_set.filter(resource='EU-VAT').iterator():
+        for identifier in [ i for i in institution.institutionidentifier_set.all() if i.resource_id == 'EU-VAT' ]:
             vat = etree.SubElement(
                 org,
                 f"{self.NS}vatIdentifier"
@@ -494,7 +642,7 @@ class AccrediationXMLCreatorV2:
             content_url.text = institution.website_link
 
         # additionalNote
-        for name in institution.institutionname_set.iterator():
+        for name in institution.institutionname_set.all():
             if name.name_english:
                 if institution.name_primary != name.name_english:
                     note = etree.SubElement(org, f"{self.NS}additionalNote")
@@ -542,41 +690,34 @@ class AccrediationXMLCreatorV2:
                         note_literal.text = f"{name.name_official}"
 
         # location
-        for ic in institution.institutioncountry_set.iterator():
+        for ic in institution.institutioncountry_set.all():
             etree.SubElement(
                 org,
                 f"{self.NS}location",
                 attrib={'idref': f"https://data.deqar.eu/institution-location/{ic.id}"}
             )
-            self.add_location_from_institution(ic)
+            self.institution_locations.append(ic)
 
         # hasSubOrganization
-        try:
-            for ih in InstitutionHierarchicalRelationship.objects.filter(
-                institution_parent=institution
-            ).exclude(relationship_type=1).all():
-                if ih.institution_child_id in self.institutions:
-                    etree.SubElement(
-                        org,
-                        f"{self.NS}hasSubOrganization",
-                        attrib={'idref': f"https://data.deqar.eu/institution/{ih.institution_child_id}"}
-                    )
-        except ObjectDoesNotExist:
-            pass
+        children, parents = self.hierarchy
+        for child_id in children.get(institution.id, []):
+            if child_id in self.institutions:
+                etree.SubElement(
+                    org,
+                    f"{self.NS}hasSubOrganization",
+                    attrib={'idref': f"https://data.deqar.eu/institution/{child_id}"}
+                )
 
         # subOrganizationOf
-        ih = InstitutionHierarchicalRelationship.objects.filter(
-            institution_child=institution
-        ).exclude(relationship_type=1).first()
-        if ih:
+        if institution.id in parents:
             etree.SubElement(
                 org,
                 f"{self.NS}subOrganizationOf",
-                attrib={'idref': f"https://data.deqar.eu/institution/{ih.institution_parent_id}"}
+                attrib={'idref': f"https://data.deqar.eu/institution/{parents[institution.id][0]}"}
             )
 
         # lastModificationDate
-        last_modifiation = institution.institutionupdatelog_set.first()
+        last_modifiation = min(institution.institutionupdatelog_set.all(), key=lambda l: l.pk, default=None)
         if last_modifiation:
             last_modifiation_date = etree.SubElement(org, f"{self.NS}modified")
             last_modifiation_date.text = last_modifiation.updated_at.strftime("%Y-%m-%dT%H:%M:%S")
@@ -608,6 +749,10 @@ class AccrediationXMLCreatorV2:
                 f"{self.NS}countryCode",
                 attrib={'uri': self.get_eu_controlled_vocab_country(country)}
             )
+    def add_locations_from_institutions(self):
+        for ic in self.institution_locations:
+            self.add_location_from_institution(ic)
+
     def add_location_from_institution(self, ic):
         location = etree.SubElement(
             self.locationReferences,
@@ -650,9 +795,7 @@ class AccrediationXMLCreatorV2:
         if (self.request is not None and self.request.query_params.get('check', '') == 'false') or (not self.check):
             return self.root
         else:
-            xsd_file = os.path.join(os.getcwd(), 'connectapi/europass/schema/ams.xsd')
-            xsd_root = etree.parse(xsd_file)
-            schema = etree.XMLSchema(xsd_root)
+            schema = get_schema()
             if not schema.validate(self.root):
                 log = schema.error_log
                 for log_entry in log:
@@ -664,12 +807,13 @@ class AccrediationXMLCreatorV2:
 
     def collect_eqf_levels(self, report):
         eqf_levels = set()
-        if report.get_activity_type() == 2:
-            for institution in report.institutions.iterator():
-                for level in institution.institutionqfehealevel_set.exclude(qf_ehea_level__level='other').iterator():
-                    eqf_levels.add(level.qf_ehea_level.level)
+        if report.activity_type_id == 2:
+            for institution in report.institutions.all():
+                for level in institution.institutionqfehealevel_set.all():
+                    if level.qf_ehea_level.level != 'other':
+                        eqf_levels.add(level.qf_ehea_level.level)
         else:
-            for programme in report.programme_set.iterator():
+            for programme in report.programme_set.all():
                 if programme.qf_ehea_level:
                     if programme.qf_ehea_level.level != 'other':
                         eqf_levels.add(programme.qf_ehea_level.level)
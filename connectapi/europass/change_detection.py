@@ -0,0 +1,106 @@
+import hashlib
+from datetime import datetime
+
+from django.db.models import Func, F, IntegerField, OuterRef, Q, Subquery
+
+from agencies.models import Agency, AgencyUpdateLog
+from countries.models import Country
+from institutions.models import InstitutionCountry, InstitutionHierarchicalRelationship, InstitutionUpdateLog
+from reports.models import Report
+
+
+def aggregate_subquery(queryset, function, field, distinct=False, output_field=None):
+    """
+    Scalar subquery computing an aggregate over the whole (correlated) queryset, without GROUP BY
+    """
+    template = '%(function)s(DISTINCT %(expressions)s)' if distinct else '%(function)s(%(expressions)s)'
+    return Subquery(
+        queryset.order_by().values(value=Func(F(field), function=function, template=template,
+                                              output_field=output_field)),
+        output_field=output_field
+    )
+
+
+def max_of(queryset, field='updated_at'):
+    return aggregate_subquery(queryset, 'MAX', field)
+
+
+def count_of(queryset, field='id', distinct=False):
+    return aggregate_subquery(queryset, 'COUNT', field, distinct=distinct, output_field=IntegerField())
+
+
+class EuropassFingerprint:
+    """
+    Fingerprint of everything that goes into the Europass/QDR export of a country: maximum timestamps and counts
+    of its reports, institutions, institution locations and hierarchical relationships, and of agencies.
+
+    Agencies are considered globally, as their changes are rare and the join via reports would be expensive.
+    All values are computed in one aggregate query, which can also cover several countries at once.
+    """
+    TIMESTAMPS = ('reports_updated', 'institutions_updated', 'agencies_updated')
+
+    def __init__(self, country, values):
+        self.country = country
+        self.values = values
+
+    @staticmethod
+    def annotations():
+        country = OuterRef('pk')
+        reports = Report.objects.filter(
+            Q(institutions__institutioncountry__country=country) &
+            Q(institutions__institutioncountry__country_verified=True) &
+            Q(status=1) &
+            ~Q(decision=3) &
+            ~Q(flag=3)
+        )
+        institution_countries = InstitutionCountry.objects.filter(country=country, country_verified=True)
+        institution_logs = InstitutionUpdateLog.objects.filter(
+            institution__institutioncountry__country=country,
+            institution__institutioncountry__country_verified=True
+        )
+        relationships = InstitutionHierarchicalRelationship.objects.filter(
+            Q(institution_parent__institutioncountry__country=country) |
+            Q(institution_child__institutioncountry__country=country)
+        )
+        return {
+            'reports_updated': max_of(reports),
+            'reports_count': count_of(reports, distinct=True),
+            'report_max_id': max_of(reports, 'id'),
+            'institutions_updated': max_of(institution_logs),
+            'institution_countries_count': count_of(institution_countries),
+            'institution_countries_max_id': max_of(institution_countries, 'id'),
+            'relationships_count': count_of(relationships, distinct=True),
+            'relationships_max_id': max_of(relationships, 'id'),
+            'agencies_updated': max_of(AgencyUpdateLog.objects.all()),
+            'agencies_count': count_of(Agency.objects.all()),
+        }
+
+    @classmethod
+    def for_countries(cls, countries=None):
+        """
+        Fingerprints of several countries (default: all), computed in a single query
+        """
+        if countries is None:
+            countries = Country.objects.all()
+        annotations = cls.annotations()
+        return [
+            cls(country, { name: getattr(country, name) for name in annotations })
+            for country in countries.annotate(**annotations)
+        ]
+
+    @classmethod
+    def for_country(cls, country):
+        return cls.for_countries(Country.objects.filter(pk=country.pk))[0]
+
+    @property
+    def last_modified(self):
+        timestamps = [ self.values[name] for name in self.TIMESTAMPS if self.values[name] ]
+        return max(timestamps, default=datetime.fromtimestamp(0))
+
+    @property
+    def digest(self):
+        data = ';'.join(f'{name}={self.values[name]}' for name in sorted(self.values))
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def __str__(self):
+        return self.digest
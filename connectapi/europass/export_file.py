@@ -0,0 +1,104 @@
+import gzip
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+class EuropassExportFile:
+    """
+    Pregenerated Europass/QDR export file of one country, as written by make_europass, plus a gzip-compressed copy.
+
+    The fingerprint of the data the file was generated from is stored alongside, so it can be compared against the
+    current state of the database; the modification time is set to the last update of that data.
+    """
+    accepts_gzip = re.compile(r'\bgzip\b')
+
+    def __init__(self, country, directory=None):
+        self.country = country
+        self.directory = os.path.join(settings.MEDIA_ROOT, directory or settings.EUROPASS_EXPORT_DIRECTORY)
+        self.path = os.path.join(self.directory, f'{country.iso_3166_alpha2}.xml')
+        self.gzip_path = f'{self.path}.gz'
+        self.fingerprint_path = f'{self.path}.fingerprint'
+
+    @property
+    def mtime(self):
+        if os.path.isfile(self.path):
+            return int(os.path.getmtime(self.path))
+        else:
+            return None
+
+    @property
+    def fingerprint(self):
+        if os.path.isfile(self.path) and os.path.isfile(self.fingerprint_path):
+            with open(self.fingerprint_path) as f:
+                return f.read().strip()
+        else:
+            return None
+
+    def is_current(self, fingerprint):
+        """
+        Check if the file exists and was generated from data with the given fingerprint
+        """
+        return self.fingerprint == fingerprint.digest
+
+    def save_fingerprint(self, fingerprint):
+        with open(self.fingerprint_path, 'w') as f:
+            f.write(fingerprint.digest)
+
+    def discard_fingerprint(self):
+        if os.path.isfile(self.fingerprint_path):
+            os.remove(self.fingerprint_path)
+
+    @contextmanager
+    def replace(self, last_modified):
+        """
+        Write a new version of the file: it is written to a temporary file in the same directory and compressed, and
+        both files then replace the served ones atomically, so requests never get a partially written file. The
+        fingerprint is discarded when the files are replaced; save the new one afterwards.
+        """
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        tmp_gzip_path = f'{self.gzip_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                yield f
+            with open(tmp_path, 'rb') as f_in, gzip.open(tmp_gzip_path, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            generated_at = datetime.now()
+            for path in (tmp_path, tmp_gzip_path):
+                os.utime(path, (int(generated_at.timestamp()), int(last_modified.timestamp())))
+            self.discard_fingerprint()
+            os.replace(tmp_gzip_path, self.gzip_path)
+            os.replace(tmp_path, self.path)
+        finally:
+            for path in (tmp_path, tmp_gzip_path):
+                if os.path.isfile(path):
+                    os.remove(path)
+
+    def get_etag(self):
+        return f'W/"{self.fingerprint}"'
+
+    def get_response(self, request):
+        """
+        Serve the file, honouring conditional requests and gzip content encoding
+        """
+        mtime = self.mtime
+        etag = self.get_etag()
+        response = get_conditional_response(request, etag=etag, last_modified=mtime)
+        if response is None:
+            if self.accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')) \
+                    and os.path.isfile(self.gzip_path) and int(os.path.getmtime(self.gzip_path)) == mtime:
+                response = FileResponse(open(self.gzip_path, 'rb'), content_type='application/xml')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = FileResponse(open(self.path, 'rb'), content_type='application/xml')
+        response['Last-Modified'] = http_date(mtime)
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -0,0 +1,87 @@
+import json
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Service unavailable, try again later.'
+    default_code = 'service_unavailable'
+
+
+class SSIkitClient:
+    """
+    Client for the Walt.ID SSIkit core API, which signs credential offers
+    """
+
+    def __init__(self):
+        # Get api endpoint from settings
+        self.core_api = getattr(settings, "LETSTRUST_CORE_API", None)
+        if not self.core_api:
+            raise ServiceUnavailable(
+                detail="LETSTRUST_CORE_API value is not present in the settings"
+            )
+        # Get timeout
+        self.request_timeout = getattr(settings, "LETSTRUST_TIMEOUT", 1.5)
+
+    def create_vc(self, issuer_did, offer):
+        """
+        Issue one single VC using the Walt.ID API
+        """
+        post_data = {
+            'issuerDid': issuer_did,
+            'subjectDid': None,
+            'credentialOffer': json.dumps(offer)
+        }
+        api = '%s/vc/create/' % self.core_api
+        try:
+            r = requests.post(api, json=post_data, timeout=self.request_timeout)
+        except requests.ConnectionError:
+            raise ServiceUnavailable(detail='SSIkit unavailable (connection error)')
+        except requests.Timeout:
+            raise ServiceUnavailable(detail='SSIkit unavailable (timeout)')
+        except requests.RequestException as error:
+            raise ServiceUnavailable(detail='SSIkit unavailable (%s)' % type(error))
+
+        # for better readability
+        post_data['credentialOffer'] = offer
+
+        if r.status_code == 200:
+            return r.json()
+        else:
+            response = {
+                'detail': 'SSIkit failure'
+            }
+            try:
+                response['ssikit_status'] = r.json()
+            except requests.exceptions.JSONDecodeError:
+                response['ssikit_status'] = { "status": r.status_code, "title": r.text }
+            response['post_data'] = post_data
+            raise ServiceUnavailable(detail=response)
+
+
+class StubSSIkitClient:
+    """
+    Local stand-in for the SSIkit API, e.g. for tests: returns the offer with a dummy proof
+    """
+    issued = []
+
+    def create_vc(self, issuer_did, offer):
+        vc = dict(offer)
+        vc['proof'] = {
+            'type': 'StubSignature',
+            'verificationMethod': issuer_did,
+        }
+        self.issued.append(vc)
+        return vc
+
+
+def get_ssikit_client():
+    """
+    Instantiate the SSIkit client class configured as LETSTRUST_SSIKIT_CLIENT
+    """
+    return import_string(getattr(settings, "LETSTRUST_SSIKIT_CLIENT", "connectapi.letstrust.ssikit.SSIkitClient"))()
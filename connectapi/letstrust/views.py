@@ -1,31 +1,24 @@
 import json
 import datetime
 
-import requests
-from datedelta import datedelta
 from copy import deepcopy
+from urllib.parse import urljoin
 
-from rest_framework.exceptions import APIException, NotFound
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework import status
 from django.conf import settings
-from django.db.models import Q
+from django.core.cache import cache
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_control
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
-from institutions.models import InstitutionIdentifier
+from connectapi.letstrust.ssikit import ServiceUnavailable, get_ssikit_client
+from institutions.models import InstitutionHierarchicalRelationship, InstitutionIdentifier
 from reports.models import Report
-from agencies.models import AgencyActivityType
-
-class ServiceUnavailable(APIException):
-    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-    default_detail = 'Service unavailable, try again later.'
-    default_code = 'service_unavailable'
 
 
 @method_decorator(name='get', decorator=swagger_auto_schema(
@@ -45,21 +38,18 @@ class VCIssue(APIView):
     # Provisional: hard-coded templates - define in subclass
     vc_template = None
 
+    # base URL for report file links when issuing outside a request (batch issuing)
+    base_url = None
+
     def __init__(self):
-        # Get api endpoint from settings
-        self.core_api = getattr(settings, "LETSTRUST_CORE_API", None)
-        if not self.core_api:
-            raise ServiceUnavailable(
-                detail="LETSTRUST_CORE_API value is not present in the settings"
-            )
+        # SSIkit API client, configurable in settings
+        self.ssikit = get_ssikit_client()
         # Get EQAR DID from settings, drop error if not set
         self.eqar_did = getattr(settings, "LETSTRUST_EQAR_DID", None)
         if not self.eqar_did:
             raise ServiceUnavailable(
                 detail="LETSTRUST_EQAR_DID value is not present in the settings"
             )
-        # Get timeout
-        self.request_timeout = getattr(settings, "LETSTRUST_TIMEOUT", 1.5)
         # Check if template is defined
         if not self.vc_template:
             raise ServiceUnavailable(
@@ -77,42 +67,31 @@ class VCIssue(APIView):
         report_id = self.kwargs['report_id']
         report = get_object_or_404(Report, pk=report_id)
 
-        return self.issue_vc(self.compose_vc(report))
+        return Response(self.get_vc(report))
+
+    def get_vc(self, report):
+        """
+        Return VC for report from cache, or issue and cache it
+        """
+        cache_key = self.get_cache_key(report)
+        vc = cache.get(cache_key)
+        if vc is None:
+            vc = self.issue_vc(self.compose_vc(report))
+            cache.set(cache_key, vc, settings.VC_CACHE_MAX_AGE)
+        return vc
+
+    def get_cache_key(self, report):
+        """
+        VCs are cached per report version; the base URL is part of the key as it appears in report file links
+        """
+        return 'letstrust-vc:%s:%s:%s:%s' % (self.__class__.__name__, self._build_absolute_uri('/'),
+                                            report.id, report.updated_at.timestamp())
 
     def issue_vc(self, offer):
         """
-        Issue one single VC using the Walt.ID API
+        Issue one single VC using the SSIkit API
         """
-        post_data = {
-            'issuerDid': self.eqar_did,
-            'subjectDid': None,
-            'credentialOffer': json.dumps(offer)
-        }
-        api = '%s/vc/create/' % self.core_api
-        try:
-            r = requests.post(api, json=post_data, timeout=self.request_timeout)
-        except requests.ConnectionError:
-            raise ServiceUnavailable(detail='SSIkit unavailable (connection error)')
-        except requests.Timeout:
-            raise ServiceUnavailable(detail='SSIkit unavailable (timeout)')
-        except requests.RequestException as error:
-            raise ServiceUnavailable(detail='SSIkit unavailable (%s)' % type(error))
-
-        # for better readability
-        post_data['credentialOffer'] = offer
-
-        if r.status_code == 200:
-            return Response(r.json())
-        else:
-            response = {
-                'detail': 'SSIkit failure'
-            }
-            try:
-                response['ssikit_status'] = r.json()
-            except requests.exceptions.JSONDecodeError:
-                response['ssikit_status'] = { "status": r.status_code, "title": r.text }
-            response['post_data'] = post_data
-            raise ServiceUnavailable(detail=response)
+        return self.ssikit.create_vc(self.eqar_did, offer)
 
     def populate_vc(self, report):
         """
@@ -125,20 +104,20 @@ class VCIssue(APIView):
         vc_offer['issuer'] = self.eqar_did
         vc_offer['issuanceDate'] = self._translate_date(report.valid_from)
         vc_offer['validFrom'] = self._translate_date(report.valid_from)
-        vc_offer['expirationDate'] = self._translate_date(report.valid_to if report.valid_to else report.valid_from + datedelta(years=6))
+        vc_offer['expirationDate'] = self._translate_date(report.valid_to_calculated)
 
         # Fill institution-independent data
         vc_offer['credentialSubject'] = {}
         vc_offer['credentialSubject']['authorizationClaims'] = {}
-        vc_offer['credentialSubject']['authorizationClaims']['accreditationType'] = self._translate_activity_type(AgencyActivityType.objects.get(id=report.get_activity_type()))
+        vc_offer['credentialSubject']['authorizationClaims']['accreditationType'] = self._translate_activity_type(report.activity_type)
         vc_offer['credentialSubject']['authorizationClaims']['decision'] = report.decision.decision
         vc_offer['credentialSubject']['authorizationClaims']['report'] = []
         for reportfile in report.reportfile_set.iterator():
             try:
-                vc_offer['credentialSubject']['authorizationClaims']['report'].append(self.request.build_absolute_uri(reportfile.file.url))
+                vc_offer['credentialSubject']['authorizationClaims']['report'].append(self._build_absolute_uri(reportfile.file.url))
             except (ValueError):
                 pass
-        if report.get_activity_type() in [ 1, 3 ]:
+        if report.activity_type_id in [ 1, 3 ]:
             # Programme data for programme-level reports
             vc_offer['credentialSubject']['authorizationClaims']['limitQualification'] = []
             for programme in report.programme_set.iterator():
@@ -162,7 +141,7 @@ class VCIssue(APIView):
         for location in institution.institutioncountry_set.filter(country_verified=True).iterator():
             subject['authorizationClaims']['limitJurisdiction'].append(self._translate_country(location.country))
         # QF levels for institutional reports
-        if report.get_activity_type() in [ 2, 4 ]:
+        if report.activity_type_id in [ 2, 4 ]:
             self._set_if(subject['authorizationClaims'], 'limitQFLevel', self._collect_qf_levels(institution))
 
         return subject
@@ -190,6 +169,12 @@ class VCIssue(APIView):
     Helper functions
     """
 
+    def _build_absolute_uri(self, location):
+        if getattr(self, 'request', None) is not None:
+            return self.request.build_absolute_uri(location)
+        else:
+            return urljoin(self.base_url, location)
+
     def _collect_qf_levels(self, institution):
         qf_levels = set()
         for level in institution.institutionqfehealevel_set.iterator():
@@ -361,8 +346,28 @@ class EBSIVCIssue(VCIssue):
             raise NotFound(
                 detail="Report is not marked as 'part of obligatory EQA system' and cannot be issued as EBSI VC."
             )
+        self.institution_dids = self._collect_dids(report)
         return(super().compose_vc(report))
 
+    def _collect_dids(self, report):
+        """
+        Look up EBSI DIDs of all institutions of the report, or of their parent institutions, in two queries
+        """
+        institution_ids = set(report.institutions.values_list('id', flat=True))
+        parents = {}
+        for parent_id, child_id in InstitutionHierarchicalRelationship.objects \
+                .filter(institution_child__in=institution_ids) \
+                .values_list('institution_parent_id', 'institution_child_id'):
+            parents.setdefault(child_id, set()).add(parent_id)
+        candidates = institution_ids.union(*parents.values())
+        identifiers = list(InstitutionIdentifier.objects.filter(institution__in=candidates,
+                                                                resource=self.resource_did_ebsi))
+        dids = {}
+        for institution_id in institution_ids:
+            own_or_parent = parents.get(institution_id, set()) | { institution_id }
+            dids[institution_id] = next((i for i in identifiers if i.institution_id in own_or_parent), None)
+        return dids
+
     def populate_vc(self, report):
         """
         Add additional data (quick fix)
@@ -375,7 +380,7 @@ class EBSIVCIssue(VCIssue):
         """
         Get EBSI DID of the institutions mentioned in the report
         """
-        institution_did = InstitutionIdentifier.objects.filter(Q(institution=institution) | Q(institution__relationship_parent__institution_child=institution), resource=self.resource_did_ebsi).first()
+        institution_did = self.institution_dids.get(institution.id)
         if not institution_did:
             raise NotFound(
                 detail="No DID-EBSI identifier found for %s (%s)" % (institution.deqar_id, institution)
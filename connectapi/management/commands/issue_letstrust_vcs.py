@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from rest_framework.exceptions import APIException
+
+from connectapi.letstrust.views import DEQARVCIssue, EBSIVCIssue
+from reports.models import Report
+
+
+class Command(BaseCommand):
+    help = "Pre-issue Let's Trust Verifiable Credentials for reports and store them in the VC cache."
+
+    VC_TYPES = {
+        'deqar': DEQARVCIssue,
+        'ebsi': EBSIVCIssue,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('REPORT', nargs='*', type=int,
+                            help='ID(s) of the report(s) to issue VCs for.')
+        parser.add_argument('--all', '-a', action='store_true',
+                            help='Issue VCs for all reports.')
+        parser.add_argument('--type', '-t', choices=self.VC_TYPES.keys(), default='deqar',
+                            help='Type of VC to issue (default: deqar).')
+        parser.add_argument('--base', '-b', required=True,
+                            help='The base URL to prefix report file links with.')
+        parser.add_argument('--jobs', '-j', type=int, default=4,
+                            help='Number of concurrent requests to the SSIkit API (default: 4).')
+        parser.add_argument('--force', '-f', action='store_true',
+                            help='Re-issue VCs even if they are cached.')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            reports = Report.objects.all()
+        elif options['REPORT']:
+            reports = Report.objects.filter(pk__in=options['REPORT'])
+        else:
+            raise CommandError('Specify either Report ID or --all.')
+        if options['type'] == 'ebsi':
+            reports = reports.filter(status=1)
+
+        view = self.VC_TYPES[options['type']]()
+        view.base_url = options['base']
+
+        self.stats = dict(issued=0, cached=0, failed=0)
+        # offers are composed here, only the SSIkit requests run in the thread pool; at most a few
+        # requests per thread are queued at any time
+        max_pending = options['jobs'] * 2
+        pending = {}
+        with ThreadPoolExecutor(max_workers=options['jobs']) as executor:
+            for report in reports.order_by('id').iterator():
+                cache_key = view.get_cache_key(report)
+                if not options['force'] and cache.get(cache_key) is not None:
+                    self.stats['cached'] += 1
+                    continue
+                try:
+                    offer = view.compose_vc(report)
+                except APIException as error:
+                    self.report_failure(report, error)
+                    continue
+                pending[executor.submit(view.issue_vc, offer)] = (report, cache_key)
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    self.collect(done, pending, options)
+            self.collect(wait(pending).done, pending, options)
+
+        self.stdout.write(f'''
+            VCs issued: {self.stats['issued']}
+            VCs already cached: {self.stats['cached']}
+            Failed: {self.stats['failed']}
+        ''')
+
+    def collect(self, done, pending, options):
+        for future in done:
+            report, cache_key = pending.pop(future)
+            try:
+                vc = future.result()
+            except APIException as error:
+                self.report_failure(report, error)
+            else:
+                cache.set(cache_key, vc, settings.VC_CACHE_MAX_AGE)
+                self.stats['issued'] += 1
+                if options['verbosity'] > 1:
+                    self.stdout.write(self.style.SUCCESS(f'Report {report.id}: VC issued'))
+
+    def report_failure(self, report, error):
+        self.stats['failed'] += 1
+        self.stderr.write(self.style.ERROR(f'Report {report.id}: {error.detail}'))
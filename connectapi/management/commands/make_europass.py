@@ -1,16 +1,37 @@
+import io
 import os
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
 
 from django.conf import settings
 
 from django.core.management import BaseCommand
 
+from django.db import connections
 from django.db.models import Q
 
 from lxml import etree
 
 from countries.models import Country
 from connectapi.europass.accrediation_xml_creator_v2 import AccrediationXMLCreatorV2
+from connectapi.europass.change_detection import EuropassFingerprint
+from connectapi.europass.export_file import EuropassExportFile
+
+
+# options passed on to worker processes
+WORKER_OPTIONS = ('base', 'directory', 'force', 'regenerate', 'stream', 'verbosity')
+
+
+def export_country(ctry_code, options):
+    """
+    Export one country in a worker process, returning its output and result
+    """
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    command = Command(stdout=stdout, stderr=stderr)
+    result = command.export_country(ctry_code, options)
+    return stdout.getvalue(), stderr.getvalue(), result
+
 
 class Command(BaseCommand):
     help = 'Generate XML export files for Europass/QDR.'
@@ -20,61 +41,127 @@ class Command(BaseCommand):
                             help='The two letter ISO code of the country/-ies to export.')
         parser.add_argument('--base', '-b',
                             help='The base URL to prefix report file links with.')
-        parser.add_argument('--directory', '-d', default='europass-v2',
+        parser.add_argument('--directory', '-d', default=settings.EUROPASS_EXPORT_DIRECTORY,
                             help='The directory (relative to MEDIA_ROOT) where to place exported files.')
         parser.add_argument('--force', '-f',
                             help='Skip check against XSD files.', action='store_true')
         parser.add_argument('--regenerate', '-r',
                             help='Skip modification time check and always regenerate files.', action='store_true')
+        parser.add_argument('--stream', '-s',
+                            help='Write file incrementally while generating it (implies --force).', action='store_true')
+        parser.add_argument('--jobs', '-j', type=int, default=1,
+                            help='Number of countries to export in parallel processes (default: 1).')
 
     def handle(self, *args, **options):
-        # make export directory
-        base_dir = os.path.join(settings.MEDIA_ROOT, options['directory'])
-        os.makedirs(base_dir, exist_ok=True)
-
-        for ctry_code in options['COUNTRY']:
-            try:
-                country = Country.objects.get(Q(iso_3166_alpha3=ctry_code.upper()) | Q(iso_3166_alpha2__exact=ctry_code))
-            except:
-                self.stderr.write(f'Unknown country code: [{ctry_code}]')
+        results = []
+        if options['jobs'] > 1 and len(options['COUNTRY']) > 1:
+            worker_options = { key: options[key] for key in WORKER_OPTIONS }
+            # worker processes must open their own database connections, rather than inherit ours
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['jobs']) as executor:
+                futures = [ executor.submit(export_country, ctry_code, worker_options)
+                            for ctry_code in options['COUNTRY'] ]
+                for future in futures:
+                    stdout, stderr, result = future.result()
+                    self.stdout.write(stdout, ending='')
+                    self.stderr.write(stderr, ending='')
+                    results.append(result)
+        else:
+            for ctry_code in options['COUNTRY']:
+                results.append(self.export_country(ctry_code, options))
+
+        self.print_summary(results, options)
+
+    def export_country(self, ctry_code, options):
+        """
+        Export one country, returns dict with status, generation time and file size
+        """
+        result = dict(country=ctry_code, status='unknown', duration=timedelta(0), size=None)
+        try:
+            country = Country.objects.get(Q(iso_3166_alpha3=ctry_code.upper()) | Q(iso_3166_alpha2__exact=ctry_code))
+        except:
+            self.stderr.write(f'Unknown country code: [{ctry_code}]')
+            return result
+
+        result['country'] = country.iso_3166_alpha2
+        creator = AccrediationXMLCreatorV2(country, baseurl=options.get('base'),
+                                           check=not (options['force'] or options['stream']))
+        export_file = EuropassExportFile(country, options['directory'])
+        os.makedirs(export_file.directory, exist_ok=True)
+        start_at = datetime.now()
+        file_path = export_file.path
+        fingerprint = EuropassFingerprint.for_country(country)
+        new_mtime = fingerprint.last_modified
+
+        log_hdr = f'\nProcessing XML file for {country} ({file_path}):'
+
+        if os.path.isfile(file_path):
+            if export_file.is_current(fingerprint):
+                if options['regenerate'] or options['verbosity'] > 1:
+                    self.stdout.write(log_hdr)
+                    self.stdout.write(self.style.SUCCESS(f'  - Last-Modified: {new_mtime} (unchanged)'))
+                if not options['regenerate']:
+                    result['status'] = 'unchanged'
+                    result['size'] = os.path.getsize(file_path)
+                    return result
             else:
-                creator = AccrediationXMLCreatorV2(country, baseurl=options.get('base'), check=not options['force'])
-                start_at = datetime.now()
-                file_path = os.path.join(base_dir, f'{country.iso_3166_alpha2}.xml')
-                new_mtime = creator.get_mtime()
-
-                log_hdr = f'\nProcessing XML file for {country} ({file_path}):'
-
-                if os.path.isfile(file_path):
-                    if int(new_mtime.timestamp()) == int(os.path.getmtime(file_path)):
-                        if options['regenerate'] or options['verbosity'] > 1:
-                            self.stdout.write(log_hdr)
-                            self.stdout.write(self.style.SUCCESS(f'  - Last-Modified: {new_mtime} (unchanged)'))
-                        if not options['regenerate']:
-                            continue
+                self.stdout.write(log_hdr)
+                self.stdout.write(self.style.WARNING(f'  - Last-Modified: {datetime.fromtimestamp(os.path.getmtime(file_path))} -> {new_mtime}'))
+                self.stdout.write(self.style.WARNING(f'  - Fingerprint: {export_file.fingerprint} -> {fingerprint}'))
+        else:
+            self.stdout.write(log_hdr)
+            self.stdout.write(self.style.WARNING(f'  - Last-Modified: {new_mtime} (new file)'))
+
+        valid = True
+        if options['stream']:
+            with export_file.replace(new_mtime) as f:
+                creator.stream(f)
+            self.stdout.write(f'  - validation skipped (--stream/-s)')
+        else:
+            with export_file.replace(new_mtime) as f:
+                output = creator.create()
+                f.write(etree.tostring(output, encoding='utf8'))
+                if output.tag == '{http://data.europa.eu/snb/model/application-profile/ams-constraints/}Accreditations':
+                    if options['force']:
+                        self.stdout.write(f'  - validation skipped (--force/-f)')
                     else:
-                        self.stdout.write(log_hdr)
-                        self.stdout.write(self.style.WARNING(f'  - Last-Modified: {datetime.fromtimestamp(os.path.getmtime(file_path))} -> {new_mtime}'))
+                        self.stdout.write(self.style.SUCCESS(f'  - validated against XSD'))
                 else:
-                    self.stdout.write(log_hdr)
-                    self.stdout.write(self.style.WARNING(f'  - Last-Modified: {new_mtime} (new file)'))
-
-                with open(file_path, 'wb') as f:
-                    output = creator.create()
-                    f.write(etree.tostring(output, encoding='utf8'))
-                    if output.tag == '{http://data.europa.eu/snb/model/application-profile/ams-constraints/}Accreditations':
-                        if options['force']:
-                            self.stdout.write(f'  - validation skipped (--force/-f)')
-                        else:
-                            self.stdout.write(self.style.SUCCESS(f'  - validated against XSD'))
-                    else:
-                        self.stdout.write(self.style.ERROR(f'  - validation error occured'))
-
-                done_at = datetime.now()
-                duration = done_at - start_at
-
-                self.stdout.write(f'  - file size: {os.path.getsize(file_path)}')
-                self.stdout.write(f'  - generation time: {duration}')
-
-                os.utime(file_path, (int(done_at.timestamp()), int(new_mtime.timestamp())))
-
+                    self.stdout.write(self.style.ERROR(f'  - validation error occured'))
+                    valid = False
+
+        done_at = datetime.now()
+        duration = done_at - start_at
+
+        self.stdout.write(f'  - file size: {os.path.getsize(file_path)}')
+        self.stdout.write(f'  - generation time: {duration}')
+
+        # invalid files are kept for inspection, but not marked as up-to-date
+        if valid:
+            export_file.save_fingerprint(fingerprint)
+
+        result.update(status='generated' if valid else 'invalid', duration=duration,
+                      size=os.path.getsize(file_path))
+        return result
+
+    def print_summary(self, results, options):
+        generated = [ r for r in results if r['status'] != 'unchanged' ]
+        if len(results) < 2 or not (generated or options['verbosity'] > 1):
+            return
+        self.stdout.write('\nSummary:')
+        for r in results:
+            if r['status'] == 'unchanged' and options['verbosity'] < 2:
+                continue
+            line = f"  - {r['country']:<10} {r['status']:<10} {str(r['duration']):>16} {r['size'] or '-':>12}"
+            if r['status'] == 'generated':
+                self.stdout.write(self.style.SUCCESS(line))
+            elif r['status'] == 'unchanged':
+                self.stdout.write(line)
+            else:
+                self.stdout.write(self.style.ERROR(line))
+        self.stdout.write(f'''
+            Countries generated: {len([ r for r in results if r['status'] == 'generated' ])}
+            Countries unchanged: {len([ r for r in results if r['status'] == 'unchanged' ])}
+            Countries failed: {len([ r for r in results if r['status'] in ('invalid', 'unknown') ])}
+            Total generation time: {sum((r['duration'] for r in results), timedelta(0))}
+        ''')
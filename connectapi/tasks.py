@@ -0,0 +1,21 @@
+from celery.task import task
+from django.core.management import call_command
+
+from connectapi.europass.change_detection import EuropassFingerprint
+from connectapi.europass.export_file import EuropassExportFile
+from countries.models import Country
+from institutions.models import InstitutionCountry
+
+
+@task(name="regenerate_europass_files")
+def regenerate_europass_files():
+    """
+    Regenerate the Europass/QDR export files of those countries whose data changed since the last run
+    """
+    countries = Country.objects.filter(
+        pk__in=InstitutionCountry.objects.filter(country_verified=True).values('country')
+    ).order_by('iso_3166_alpha2')
+    stale = [ fingerprint.country.iso_3166_alpha2 for fingerprint in EuropassFingerprint.for_countries(countries)
+              if not EuropassExportFile(fingerprint.country).is_current(fingerprint) ]
+    if stale:
+        call_command('make_europass', *stale)
@@ -1,9 +1,21 @@
+import gzip
+import os
+import tempfile
+from datetime import datetime
+
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
 from lxml import etree
 
+from connectapi.europass.change_detection import EuropassFingerprint
+from countries.models import Country
+from institutions.models import InstitutionCountry
+from reports.models import Report
+
 class EuropassTest(APITestCase):
     """
     Test module for the Europass/QDR export
@@ -41,3 +53,76 @@ class EuropassTest(APITestCase):
         self.assertEqual(response['Content-Type'], 'application/xml')
         xml = etree.fromstring(response.content)
         self.assertEqual(xml.tag, '{http://data.europa.eu/snb/model/application-profile/ams-constraints/}Accreditations')
+
+    def test_europass_xml_streamed(self):
+        """
+        Test streamed generation of XML files for EDC
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        response = self.client.get('/connectapi/v1/europass/accreditations-v2/DEU/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        content = b''.join(response.streaming_content)
+        streamed = etree.fromstring(content)
+        self.assertEqual(streamed.tag, '{http://data.europa.eu/snb/model/application-profile/ams-constraints/}Accreditations')
+        # namespaces are only declared on the root element
+        self.assertEqual(content.count(b'xmlns:skos='), 1)
+        response = self.client.get('/connectapi/v1/europass/accreditations-v2/DEU/', { "check": "true" })
+        parser = etree.XMLParser(remove_blank_text=True)
+        self.assertEqual(etree.tostring(etree.fromstring(content, parser), method='c14n'),
+                         etree.tostring(etree.fromstring(response.content, parser), method='c14n'))
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_europass_xml_pregenerated(self):
+        """
+        Test serving of pregenerated XML files for EDC
+        """
+        call_command('make_europass', 'DE', stdout=open(os.devnull, 'w'))
+        response = self.client.get('/connectapi/v1/europass/accreditations-v2/DEU/')
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        self.assertIn('Last-Modified', response)
+        self.assertIn('ETag', response)
+        xml = etree.fromstring(b''.join(response.streaming_content))
+        self.assertEqual(xml.tag, '{http://data.europa.eu/snb/model/application-profile/ams-constraints/}Accreditations')
+
+        # conditional request
+        response = self.client.get('/connectapi/v1/europass/accreditations-v2/DEU/',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        # gzip content encoding
+        response = self.client.get('/connectapi/v1/europass/accreditations-v2/DEU/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(etree.fromstring(gzip.decompress(b''.join(response.streaming_content))).tag, xml.tag)
+
+        # fall back to generation after reports were updated
+        Report.objects.filter(id=1).update(updated_at=datetime.now())
+        response = self.client.get('/connectapi/v1/europass/accreditations-v2/DEU/')
+        self.assertNotIn('ETag', response)
+        self.assertEqual(etree.fromstring(b''.join(response.streaming_content)).tag, xml.tag)
+
+    def test_europass_fingerprint(self):
+        """
+        Test change detection for XML files for EDC
+        """
+        with self.assertNumQueries(1):
+            fingerprints = { f.country.iso_3166_alpha2: f for f in EuropassFingerprint.for_countries() }
+        self.assertEqual(len(fingerprints), Country.objects.count())
+        germany = Country.objects.get(iso_3166_alpha2='DE')
+        fingerprint = EuropassFingerprint.for_country(germany)
+        self.assertEqual(fingerprint.digest, fingerprints['DE'].digest)
+        self.assertGreater(fingerprint.values['reports_count'], 0)
+        self.assertEqual(fingerprint.last_modified, max(fingerprint.values[name] for name in fingerprint.TIMESTAMPS
+                                                         if fingerprint.values[name]))
+
+        # updated report
+        Report.objects.filter(id=1).update(updated_at=datetime.now())
+        updated = EuropassFingerprint.for_country(germany)
+        self.assertNotEqual(updated.digest, fingerprint.digest)
+        self.assertGreater(updated.last_modified, fingerprint.last_modified)
+
+        # additional institution location
+        institution_country = InstitutionCountry.objects.filter(country=germany).first()
+        InstitutionCountry.objects.create(institution=institution_country.institution, country=germany,
+                                          city='Bonn', country_source='test')
+        self.assertNotEqual(EuropassFingerprint.for_country(germany).digest, updated.digest)
@@ -0,0 +1,80 @@
+import io
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from connectapi.letstrust.ssikit import StubSSIkitClient
+from institutions.models import InstitutionIdentifier, InstitutionHierarchicalRelationship
+from reports.models import Report
+
+
+@override_settings(LETSTRUST_CORE_API='http://ssikit.invalid',
+                   LETSTRUST_EQAR_DID='did:key:eqar',
+                   LETSTRUST_EQAR_EBSI_DID='did:ebsi:eqar',
+                   LETSTRUST_SSIKIT_CLIENT='connectapi.letstrust.ssikit.StubSSIkitClient',
+                   CACHES={ 'default': { 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache' } })
+class LetsTrustTest(APITestCase):
+    """
+    Test module for issuing Verifiable Credentials via Let's Trust
+    """
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'qf_ehea_level', 'eqar_decision_type', 'language',
+        'agency_activity_type', 'agency_focus', 'identifier_resource', 'flag', 'permission_type',
+        'agency_historical_field',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'institution_historical_field',
+        'institution_hierarchical_relationship_type',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+        'report_decision', 'report_status',
+        'users', 'report_demo_01'
+    ]
+
+    def setUp(self):
+        cache.clear()
+        StubSSIkitClient.issued = []
+
+    def test_deqar_vc_cached(self):
+        response = self.client.get('/connectapi/v1/letstrust/vc/issue/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], 'https://data.deqar.eu/report/1')
+        self.assertEqual(response.data['proof']['verificationMethod'], 'did:key:eqar')
+        self.assertEqual(len(StubSSIkitClient.issued), 1)
+
+        # served from cache
+        response = self.client.get('/connectapi/v1/letstrust/vc/issue/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(StubSSIkitClient.issued), 1)
+
+        # issued again after the report was updated
+        Report.objects.filter(pk=1).update(updated_at=datetime.now())
+        response = self.client.get('/connectapi/v1/letstrust/vc/issue/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(StubSSIkitClient.issued), 2)
+
+    def test_ebsi_vc_parent_did(self):
+        response = self.client.get('/connectapi/v1/letstrust/ebsi-vc/issue/1')
+        self.assertEqual(response.status_code, 404)
+
+        # DID of parent institution is used
+        report = Report.objects.get(pk=1)
+        institution = report.institutions.first()
+        InstitutionHierarchicalRelationship.objects.create(institution_parent_id=3, institution_child=institution)
+        InstitutionIdentifier.objects.create(institution_id=3, identifier='did:ebsi:parent', resource_id='DID-EBSI')
+        response = self.client.get('/connectapi/v1/letstrust/ebsi-vc/issue/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['credentialSubject']['id'], 'did:ebsi:parent')
+
+    def test_issue_command(self):
+        stdout = io.StringIO()
+        call_command('issue_letstrust_vcs', '1', '2', '3', '--base', 'https://backend.deqar.eu/', '--jobs', '2',
+                     stdout=stdout)
+        self.assertIn('VCs issued: 3', stdout.getvalue())
+        self.assertEqual(len(StubSSIkitClient.issued), 3)
+
+        stdout = io.StringIO()
+        call_command('issue_letstrust_vcs', '1', '2', '3', '--base', 'https://backend.deqar.eu/', stdout=stdout)
+        self.assertIn('VCs already cached: 3', stdout.getvalue())
+        self.assertEqual(len(StubSSIkitClient.issued), 3)
@@ -0,0 +1,77 @@
+import gzip
+import io
+import os
+import tempfile
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from lxml import etree
+
+from countries.models import Country
+
+from connectapi.europass.accrediation_xml_creator_v2 import get_schema
+from connectapi.europass.change_detection import EuropassFingerprint
+from connectapi.europass.export_file import EuropassExportFile
+from connectapi.tests import test_europass
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class MakeEuropassTest(TransactionTestCase):
+    """
+    Test module for the make_europass command
+    """
+    fixtures = test_europass.EuropassTest.fixtures
+
+    def test_schema_cached(self):
+        self.assertIs(get_schema(), get_schema())
+
+    def test_parallel_export(self):
+        stdout = io.StringIO()
+        call_command('make_europass', 'DE', 'AT', 'XX', '--jobs', '2', stdout=stdout, stderr=io.StringIO())
+        output = stdout.getvalue()
+        self.assertIn('Summary:', output)
+        self.assertIn('Countries generated: 2', output)
+        self.assertIn('Countries failed: 1', output)
+        for code in ('DE', 'AT'):
+            path = os.path.join(settings.MEDIA_ROOT, settings.EUROPASS_EXPORT_DIRECTORY, f'{code}.xml')
+            self.assertTrue(get_schema().validate(etree.parse(path)))
+            self.assertTrue(os.path.isfile(f'{path}.fingerprint'))
+            self.assertTrue(os.path.isfile(f'{path}.gz'))
+        self.assertFalse([ name for name in os.listdir(os.path.dirname(path)) if name.endswith('.tmp') ])
+
+        # second run: nothing to do
+        stdout = io.StringIO()
+        call_command('make_europass', 'DE', 'AT', '--jobs', '2', stdout=stdout)
+        self.assertEqual(stdout.getvalue(), '')
+
+    def test_replace(self):
+        export_file = EuropassExportFile(Country.objects.get(iso_3166_alpha2='DE'))
+        os.makedirs(export_file.directory, exist_ok=True)
+        last_modified = datetime(2020, 1, 1)
+        with export_file.replace(last_modified) as f:
+            f.write(b'<old/>')
+        export_file.save_fingerprint(EuropassFingerprint.for_country(export_file.country))
+
+        # the served file stays complete until the new one is written
+        with self.assertRaises(RuntimeError):
+            with export_file.replace(last_modified) as f:
+                f.write(b'<new')
+                with open(export_file.path, 'rb') as served:
+                    self.assertEqual(served.read(), b'<old/>')
+                raise RuntimeError
+        with open(export_file.path, 'rb') as served:
+            self.assertEqual(served.read(), b'<old/>')
+        self.assertIsNotNone(export_file.fingerprint)
+        self.assertFalse([ name for name in os.listdir(export_file.directory) if name.endswith('.tmp') ])
+
+        with export_file.replace(last_modified) as f:
+            f.write(b'<new/>')
+        with gzip.open(export_file.gzip_path) as served:
+            self.assertEqual(served.read(), b'<new/>')
+        self.assertEqual(export_file.mtime, int(last_modified.timestamp()))
+        self.assertEqual(int(os.path.getmtime(export_file.gzip_path)), export_file.mtime)
+        # not marked as current until the new fingerprint is saved
+        self.assertIsNone(export_file.fingerprint)
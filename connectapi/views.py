@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django_filters import rest_framework as filters, OrderingFilter
 from drf_yasg.utils import swagger_auto_schema
@@ -18,6 +19,7 @@ from eqar_backend.serializer_fields.boolean_extended_serializer_field import Boo
 
 from webapi.v2.views.meili_solr_view import MeiliSolrBackportView
 from connectapi.europass.accrediation_xml_creator_v2 import AccrediationXMLCreatorV2
+from connectapi.europass.export_file import EuropassExportFile
 
 from agencies.models import AgencyESGActivity
 from countries.models import Country
@@ -238,9 +240,14 @@ class AgencyActivityDEQARConnectList(generics.ListAPIView):
 @method_decorator(name='get', decorator=swagger_auto_schema(
     manual_parameters=[
         openapi.Parameter('country_code', 'path', description='Country code (ISO 3166-alpha2 or -alpha3)', required=True, type=openapi.TYPE_STRING),
+        openapi.Parameter('check', 'query', description='Generate the document and validate it against XSD before '
+                                                        'returning it; otherwise the pregenerated file is served if '
+                                                        'up-to-date, or the document streamed as it is generated',
+                          required=False, type=openapi.TYPE_BOOLEAN),
     ],
     responses={
         200: 'DEQAR reports according to ELM application profile Accreditations (RDF+XML)',
+        304: 'Pregenerated file not modified',
         404: 'Country could not be found',
     }
 ))
@@ -254,4 +261,10 @@ class AccreditationXMLViewV2(APIView):
             Country, Q(iso_3166_alpha3=country_code.upper()) | Q(iso_3166_alpha2__exact=country_code)
         )
         creator = AccrediationXMLCreatorV2(country, request)
-        return Response(creator.create(), content_type='application/xml')
+        if request.query_params.get('check', '') == 'true':
+            return Response(creator.create(), content_type='application/xml')
+        export_file = EuropassExportFile(country)
+        if export_file.is_current(creator.get_fingerprint()):
+            return export_file.get_response(request)
+        else:
+            return StreamingHttpResponse(creator.iter_xml(), content_type='application/xml')
@@ -103,12 +103,25 @@ class MeiliClient:
         """
         return self.meili.index(index).add_documents(doc)
 
+    def fetch_documents(self, index, parameters):
+        """
+        Fetch documents, optionally filtered, returning the raw response (dict with results and total)
+        """
+        return self.meili.http.post(f'{self.meili.config.paths.index}/{index}/{self.meili.config.paths.document}/fetch',
+                                    body=parameters)
+
     def delete_document(self, index, doc_id):
         """
         Delete a document from the index
         """
         return self.meili.index(index).delete_document(doc_id)
 
+    def delete_documents(self, index, doc_ids):
+        """
+        Delete several documents from the index
+        """
+        return self.meili.index(index).delete_documents(doc_ids)
+
 
 class MeiliIndexer:
     """
@@ -128,6 +141,17 @@ class MeiliIndexer:
         else:
             return taskinfo
 
+    def index_many(self, obj_ids):
+        """
+        Index several objects with one request; IDs of objects that no longer exist are skipped
+        """
+        docs = self.serializer(self.model.objects.filter(pk__in=obj_ids), many=True).data
+        taskinfo = self.meili.add_document(self.index_uid, list(docs))
+        if self.sync:
+            return self.meili.wait_for(taskinfo)
+        else:
+            return taskinfo
+
     def delete(self, obj_id):
         taskinfo = self.meili.delete_document(self.index_uid, obj_id)
         if self.sync:
@@ -135,6 +159,16 @@ class MeiliIndexer:
         else:
             return taskinfo
 
+    def delete_many(self, obj_ids):
+        """
+        Delete several objects with one request
+        """
+        taskinfo = self.meili.delete_documents(self.index_uid, list(obj_ids))
+        if self.sync:
+            return self.meili.wait_for(taskinfo)
+        else:
+            return taskinfo
+
 
 class CheckMeiliIndex(BaseCommand):
     """
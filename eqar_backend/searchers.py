@@ -22,12 +22,15 @@ class Searcher:
         self.facet = False
         self.facet_fields = []
         self.facet_sort = 'count'
+        self.cursor_mark = None
 
-    def initialize(self, params, start=0, rows_per_page=10, tie_breaker="", paginated=True):
+    def initialize(self, params, start=0, rows_per_page=10, tie_breaker="", paginated=True, cursor_mark=None):
         self.start = start
         self.rows_per_page = rows_per_page
         self.tie_breaker = tie_breaker
         self.paginated = paginated
+        # in paginated mode, a cursor mark ('*' for the first page) replaces start
+        self.cursor_mark = cursor_mark
 
         search = params.get('search', '*:*')
         self.set_q(search)
@@ -71,7 +74,16 @@ class Searcher:
             'facet.limit': -1,
             'facet.mincount': 1
         }
-        if self.paginated:
+        if self.paginated and self.cursor_mark:
+            return self.solr.search(
+                q=self.q,
+                sort=self.sort,
+                rows=self.rows_per_page,
+                facet=self.facet,
+                cursorMark=self.cursor_mark,
+                **search_kwargs
+            )
+        elif self.paginated:
             return self.solr.search(
                 q=self.q,
                 sort=self.sort,
@@ -89,6 +101,14 @@ class Searcher:
                 **search_kwargs
             )
 
+    def next_cursor(self, response):
+        """
+        Cursor mark for the next page, or None if the response was the last page
+        """
+        if len(response.docs) < int(self.rows_per_page) or response.nextCursorMark == self.cursor_mark:
+            return None
+        return response.nextCursorMark
+
     def set_q(self, search):
         self.q = search
         if search == "":
@@ -44,7 +44,8 @@ INSTALLED_APPS = [
     'submissionapi',
     'webapi',
     'adminapi',
-    'connectapi'
+    'connectapi',
+    'outbox'
 ]
 
 MIDDLEWARE = [
@@ -1,4 +1,6 @@
 import os
+import sys
+from celery.schedules import crontab
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/1.11/howto/deployment/checklist/
@@ -25,6 +27,10 @@ STORAGES = {
     "default": {
         "BACKEND": "eqar_backend.storage.ByteTruncatingFileSystemStorage",
     },
+    # report files only: other files (e.g. EQAR decisions) are overwritten in place, which hard links do not allow
+    "reports": {
+        "BACKEND": "eqar_backend.storage.ContentAddressedFileSystemStorage",
+    },
     "staticfiles": {
         "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
     },
@@ -39,6 +45,37 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Europe/Brussels'
+# periodic tasks, run by the worker when scheduled by exactly one beat process (see Procfile)
+CELERY_BEAT_SCHEDULE = {
+    'regenerate-europass-files': {
+        'task': 'regenerate_europass_files',
+        'schedule': crontab(minute=15),
+    },
+    'clean-report-file-uploads': {
+        'task': 'clean_report_file_uploads',
+        'schedule': crontab(minute=45),
+    },
+    # fallback for the relay process: pass on changes to the search indexes every minute
+    'relay-outbox': {
+        'task': 'relay_outbox',
+        'schedule': crontab(),
+    },
+}
+
+# Cache shared between web and worker processes (e.g. issued VCs)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+    }
+}
+# tests clear the cache, so they must not share the Redis database
+if sys.argv[1:2] == [ 'test' ]:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 # Meilisearch
 MEILI_API_URL = "http://localhost:7700"
@@ -54,4 +91,16 @@ DJOSER = {
 # Connect API: time for which issued VCs may be cached
 VC_CACHE_MAX_AGE = 86400
 
+# Connect API: directory (relative to MEDIA_ROOT) with pregenerated Europass/QDR export files
+EUROPASS_EXPORT_DIRECTORY = 'europass-v2'
+
+# Maximum size of PDF files uploaded base64-encoded (decoded size, in bytes)
+PDF_UPLOAD_MAX_SIZE = 128 * 1024 * 1024
+
+# Directory (relative to MEDIA_ROOT) for partially received chunked report file uploads
+REPORT_FILE_UPLOAD_DIRECTORY = 'partial-uploads'
+
+# Chunked report file uploads not continued for this number of hours are removed
+REPORT_FILE_UPLOAD_EXPIRY_HOURS = 24
+
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
\ No newline at end of file
@@ -1,6 +1,10 @@
+import errno
+import filecmp
+import hashlib
 import os
+import uuid
 
-from django.core.files.storage import FileSystemStorage
+from django.core.files.storage import FileSystemStorage, InvalidStorageError, default_storage, storages
 
 class ByteTruncatingFileSystemStorage(FileSystemStorage):
 
@@ -29,3 +33,129 @@ class ByteTruncatingFileSystemStorage(FileSystemStorage):
             file_root = encoded[:max_root_bytes].decode('utf-8', errors='ignore')
         return super().get_alternative_name(file_root, file_ext)
 
+
+class ContentAddressedFileSystemStorage(ByteTruncatingFileSystemStorage):
+    """
+    File system storage that keeps each distinct file content only once.
+
+    Every saved file is hashed (MD5, the same checksum as ReportFile.file_checksum) and stored
+    as a blob under BLOB_DIR, keyed by its hash; the file name requested by the caller is a hard
+    link to that blob. File names, URLs and paths therefore look exactly as with
+    ByteTruncatingFileSystemStorage. Before a file is linked to an existing blob, their contents
+    are compared, so that colliding hashes never merge different files.
+
+    Files must not be modified in place, as this would change every name linked to the same blob.
+
+    The file system link count serves as reference counter: a blob is referenced by every
+    name linked to it, and is garbage-collected when the last of these names is deleted.
+    Where hard links are not possible (e.g. file system does not support them), files are
+    simply kept as regular, non-deduplicated files.
+    """
+    BLOB_DIR = '.blobs'
+    CHUNK_SIZE = 64 * 2**10
+
+    def blob_path(self, digest):
+        """
+        absolute path of the blob for a given hex digest
+        """
+        return os.path.join(self.location, self.BLOB_DIR, digest[:2], digest[2:4], digest)
+
+    def file_digest(self, name):
+        """
+        MD5 hex digest of a stored file, read in chunks
+        """
+        hasher = hashlib.md5()
+        with open(self.path(name), 'rb') as f:
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def _save(self, name, content):
+        name = super()._save(name, content)
+        # content hashed while it was written (see reports.models.HashingFile) need not be read again
+        digest = content.hexdigest() if hasattr(content, 'hexdigest') else None
+        self.deduplicate(name, digest)
+        return name
+
+    def deduplicate(self, name, digest=None):
+        """
+        Replace the stored file by a hard link to the blob with identical content, or make it
+        the blob if there is none yet. Returns True if the file was linked to an existing blob.
+        """
+        path = self.path(name)
+        blob = self.blob_path(digest or self.file_digest(name))
+        try:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.link(path, blob)
+            return False
+        except FileExistsError:
+            pass
+        except OSError as exc:
+            if exc.errno in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                return False
+            raise
+
+        if os.path.samefile(path, blob) or not filecmp.cmp(path, blob, shallow=False):
+            return False
+
+        # link to the existing blob under a temporary name, then atomically replace the file
+        tmp = os.path.join(os.path.dirname(path), f'.{uuid.uuid4().hex}.tmp')
+        os.link(blob, tmp)
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            os.remove(tmp)
+            raise
+        return True
+
+    def delete(self, name, digest=None):
+        """
+        Delete the file and, if it was the last reference to its blob, the blob as well.
+        Pass the known digest of the file (e.g. ReportFile.file_checksum) to avoid hashing it again.
+        """
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        path = self.path(name)
+        blob = None
+        try:
+            # only a file with exactly one more link (the blob itself) can be its last reference
+            if os.path.isfile(path) and os.stat(path).st_nlink == 2:
+                blob = self.blob_path(digest or self.file_digest(name))
+                if not os.path.exists(blob) or not os.path.samefile(path, blob):
+                    blob = None
+        except FileNotFoundError:
+            pass
+        super().delete(name)
+        if blob:
+            self._remove_orphan(blob)
+
+    def _remove_orphan(self, blob):
+        try:
+            if os.stat(blob).st_nlink == 1:
+                os.remove(blob)
+                return True
+        except FileNotFoundError:
+            pass
+        return False
+
+    def collect_garbage(self):
+        """
+        Remove all blobs that are no longer referenced by any file. Returns number of blobs removed.
+        """
+        removed = 0
+        for root, dirs, files in os.walk(os.path.join(self.location, self.BLOB_DIR)):
+            for blob in files:
+                if self._remove_orphan(os.path.join(root, blob)):
+                    removed += 1
+        return removed
+
+
+def get_report_file_storage():
+    """
+    Storage of ReportFile.file: the "reports" entry of STORAGES (the content-addressed storage in production),
+    or the default storage if there is none
+    """
+    try:
+        return storages['reports']
+    except InvalidStorageError:
+        return default_storage
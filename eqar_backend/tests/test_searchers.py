@@ -0,0 +1,37 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from eqar_backend.searchers import Searcher
+
+
+class SearcherTest(SimpleTestCase):
+    """
+    Test cursor pagination of the Solr searcher
+    """
+
+    def search(self, cursor_mark, docs, next_cursor_mark):
+        searcher = Searcher('test-core')
+        searcher.initialize({ 'ordering': 'name_sort' }, start=20, rows_per_page=2, cursor_mark=cursor_mark)
+        results = mock.Mock(docs=docs, nextCursorMark=next_cursor_mark)
+        with mock.patch.object(searcher.solr, 'search', return_value=results) as search:
+            response = searcher.search()
+        return searcher, search.call_args.kwargs, response
+
+    def test_paginated(self):
+        searcher, kwargs, response = self.search(None, [ {}, {} ], None)
+        self.assertEqual(kwargs['start'], 20)
+        self.assertNotIn('cursorMark', kwargs)
+
+    def test_cursor(self):
+        searcher, kwargs, response = self.search('*', [ {}, {} ], 'AoE1')
+        self.assertNotIn('start', kwargs)
+        self.assertEqual(kwargs['cursorMark'], '*')
+        self.assertEqual(kwargs['sort'], 'name_sort asc,score desc,id asc')
+        self.assertEqual(searcher.next_cursor(response), 'AoE1')
+
+        searcher, kwargs, response = self.search('AoE1', [ {} ], 'AoE2')
+        self.assertIsNone(searcher.next_cursor(response))
+
+        searcher, kwargs, response = self.search('AoE2', [ {}, {} ], 'AoE2')
+        self.assertIsNone(searcher.next_cursor(response))
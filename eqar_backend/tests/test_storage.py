@@ -0,0 +1,77 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from eqar_backend.storage import ContentAddressedFileSystemStorage, get_report_file_storage
+from reports.models import ReportFile
+
+
+class ContentAddressedStorageTestCase(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp(prefix='test_storage_')
+        self.storage = ContentAddressedFileSystemStorage(location=self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_identical_files_share_blob(self):
+        name_1 = self.storage.save('AQ/2020/1/report.pdf', ContentFile(b'%PDF-1.4 identical'))
+        name_2 = self.storage.save('AQ/2021/2/report.pdf', ContentFile(b'%PDF-1.4 identical'))
+        self.assertTrue(os.path.samefile(self.storage.path(name_1), self.storage.path(name_2)))
+        blob = self.storage.blob_path(self.storage.file_digest(name_1))
+        self.assertEqual(os.stat(blob).st_nlink, 3)
+        with self.storage.open(name_2) as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 identical')
+
+    def test_different_files_separate_blobs(self):
+        name_1 = self.storage.save('report-1.pdf', ContentFile(b'%PDF-1.4 one'))
+        name_2 = self.storage.save('report-2.pdf', ContentFile(b'%PDF-1.4 two'))
+        self.assertFalse(os.path.samefile(self.storage.path(name_1), self.storage.path(name_2)))
+
+    def test_blob_removed_with_last_reference(self):
+        name_1 = self.storage.save('report-1.pdf', ContentFile(b'%PDF-1.4 identical'))
+        name_2 = self.storage.save('report-2.pdf', ContentFile(b'%PDF-1.4 identical'))
+        blob = self.storage.blob_path(self.storage.file_digest(name_1))
+        self.storage.delete(name_1)
+        self.assertTrue(os.path.exists(blob))
+        self.storage.delete(name_2)
+        self.assertFalse(os.path.exists(blob))
+
+    def test_deduplicate_existing_file(self):
+        name = self.storage.save('report-1.pdf', ContentFile(b'%PDF-1.4 identical'))
+        os.makedirs(os.path.join(self.location, 'legacy'))
+        with open(os.path.join(self.location, 'legacy', 'report.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4 identical')
+        self.assertTrue(self.storage.deduplicate('legacy/report.pdf'))
+        self.assertTrue(os.path.samefile(self.storage.path(name), self.storage.path('legacy/report.pdf')))
+
+    def test_collect_garbage(self):
+        name = self.storage.save('report-1.pdf', ContentFile(b'%PDF-1.4 orphan'))
+        blob = self.storage.blob_path(self.storage.file_digest(name))
+        os.remove(self.storage.path(name))
+        self.assertEqual(self.storage.collect_garbage(), 1)
+        self.assertFalse(os.path.exists(blob))
+
+    def test_delete_with_known_digest(self):
+        digest = hashlib.md5(b'%PDF-1.4 identical').hexdigest()
+        name = self.storage.save('report-1.pdf', ContentFile(b'%PDF-1.4 identical'))
+        blob = self.storage.blob_path(digest)
+        self.assertTrue(os.path.samefile(self.storage.path(name), blob))
+        self.storage.delete(name, digest=digest)
+        self.assertFalse(os.path.exists(blob))
+
+    def test_colliding_digest_not_linked(self):
+        name = self.storage.save('report-1.pdf', ContentFile(b'%PDF-1.4 one'))
+        with open(os.path.join(self.location, 'report-2.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4 two')
+        self.assertFalse(self.storage.deduplicate('report-2.pdf', digest=self.storage.file_digest(name)))
+        with self.storage.open('report-2.pdf') as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 two')
+
+    def test_report_file_storage(self):
+        # only report files use the storage configured as "reports", other file fields keep the default storage
+        self.assertIs(ReportFile._meta.get_field('file').storage, get_report_file_storage())
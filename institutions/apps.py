@@ -8,5 +8,6 @@ class InstitutionsConfig(AppConfig):
         super(InstitutionsConfig, self).ready()
         from institutions.signals import do_index_institutions_upon_institution_save
         from institutions.signals import do_remove_institutions_upon_institution_delete
+        from institutions.signals import do_invalidate_relationship_graph
         from institutions.signals import do_index_institutions_upon_hierarchical_relationship_save
         from institutions.signals import do_index_institutions_upon_historical_relationship_save
@@ -0,0 +1,172 @@
+from collections import defaultdict, namedtuple
+from itertools import chain
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from institutions.models import InstitutionHierarchicalRelationship, InstitutionHistoricalRelationship, \
+    HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM, HIERARCHICAL_TYPE_ALLIANCE, \
+    HISTORICAL_TYPE_SUCCEEDED, HISTORICAL_TYPE_ABSORBED
+
+CACHE_KEY = 'institutions:relationship-graph'
+# safety net for changes that bypass the model signals
+CACHE_TIMEOUT = 3600
+
+# relationship to another institution: `institution` is the ID on the far side of the edge
+HierarchicalEdge = namedtuple('HierarchicalEdge', 'id institution type_id type valid_from valid_to')
+HistoricalEdge = namedtuple('HistoricalEdge', 'id institution type_id date')
+
+
+class RelationshipGraph:
+    """
+    Hierarchical and historical relationships between institutions as in-memory adjacency maps, so that
+    walking them costs no database round trips. Edges are kept in order of relationship ID.
+    """
+
+    def __init__(self, hierarchical, historical):
+        children = defaultdict(list)
+        parents = defaultdict(list)
+        targets = defaultdict(list)
+        sources = defaultdict(list)
+        for id, parent_id, child_id, type_id, type, valid_from, valid_to in hierarchical:
+            children[parent_id].append(HierarchicalEdge(id, child_id, type_id, type, valid_from, valid_to))
+            parents[child_id].append(HierarchicalEdge(id, parent_id, type_id, type, valid_from, valid_to))
+        for id, source_id, target_id, type_id, date in historical:
+            targets[source_id].append(HistoricalEdge(id, target_id, type_id, date))
+            sources[target_id].append(HistoricalEdge(id, source_id, type_id, date))
+        # plain dicts, so that lookups never modify a graph shared between callers
+        self.children = dict(children)
+        self.parents = dict(parents)
+        self.targets = dict(targets)
+        self.sources = dict(sources)
+
+    @classmethod
+    def load(cls):
+        """
+        Load both relationship tables, with one query each
+        """
+        hierarchical = InstitutionHierarchicalRelationship.objects.order_by('id').values_list(
+            'id', 'institution_parent_id', 'institution_child_id', 'relationship_type_id', 'relationship_type__type',
+            'valid_from', 'valid_to')
+        historical = InstitutionHistoricalRelationship.objects.order_by('id').values_list(
+            'id', 'institution_source_id', 'institution_target_id', 'relationship_type_id', 'relationship_date')
+        return cls(list(hierarchical), list(historical))
+
+    def hierarchical(self, institution_id):
+        """
+        Hierarchical relationships of an institution: first to its children, then to its parents
+        """
+        return chain(self.children.get(institution_id, ()), self.parents.get(institution_id, ()))
+
+    def report_contributors(self, institution_id):
+        """
+        Institutions whose reports belong to this institution, see Institution.get_report_contributors()
+        """
+        contributors = [(institution_id, True, None, None)]
+        # sub-units (non-platform hierarchical children); alliances are excluded here because their
+        # report flow is reversed (see below) - an alliance does not inherit its members' reports
+        for edge in self.children.get(institution_id, ()):
+            if edge.type_id not in (HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM, HIERARCHICAL_TYPE_ALLIANCE):
+                contributors.append((edge.institution, True, edge.valid_from, edge.valid_to))
+        # European Universities alliance: this institution is a member (child) -> it inherits its
+        # alliance parent's reports (reverse of the ordinary parent-pulls-children direction)
+        for edge in self.parents.get(institution_id, ()):
+            if edge.type_id == HIERARCHICAL_TYPE_ALLIANCE:
+                contributors.append((edge.institution, True, edge.valid_from, edge.valid_to))
+        # historical: this institution succeeded another (it is the target of a 'succeeded' row) ->
+        # it inherits the predecessor's (source's) reports from the succession date on
+        for edge in self.sources.get(institution_id, ()):
+            if edge.type_id == HISTORICAL_TYPE_SUCCEEDED:
+                contributors.append((edge.institution, False, edge.date, None))
+        # historical: this institution absorbed another (it is the source of an 'absorbed' row) ->
+        # it inherits the absorbed institution's (target's) reports from the absorption date on
+        for edge in self.targets.get(institution_id, ()):
+            if edge.type_id == HISTORICAL_TYPE_ABSORBED:
+                contributors.append((edge.institution, False, edge.date, None))
+        return contributors
+
+    def report_dependents(self, institution_id):
+        """
+        Institutions (including this one) whose has_report depends on this institution's reports, see
+        Institution.get_report_dependents()
+        """
+        ids = {institution_id}
+        # institutions for which this one is a non-platform, non-alliance child (its parents)
+        for edge in self.parents.get(institution_id, ()):
+            if edge.type_id not in (HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM, HIERARCHICAL_TYPE_ALLIANCE):
+                ids.add(edge.institution)
+        # European Universities alliance: this institution is the alliance (parent) -> each member
+        # (child) inherits its reports, so their has_report must be recomputed when this one's change
+        for edge in self.children.get(institution_id, ()):
+            if edge.type_id == HIERARCHICAL_TYPE_ALLIANCE:
+                ids.add(edge.institution)
+        # this institution is a predecessor (source of a 'succeeded' row) -> the successor (target) inherits
+        for edge in self.targets.get(institution_id, ()):
+            if edge.type_id == HISTORICAL_TYPE_SUCCEEDED:
+                ids.add(edge.institution)
+        # this institution was absorbed (target of an 'absorbed' row) -> the absorber (source) inherits
+        for edge in self.sources.get(institution_id, ()):
+            if edge.type_id == HISTORICAL_TYPE_ABSORBED:
+                ids.add(edge.institution)
+        return ids
+
+    def hierarchy_component(self, institution_id, exclude_types=(), seen=None):
+        """
+        All institutions reachable from this one via hierarchical relationships in either direction, except
+        relationships of the excluded types. Institutions already in `seen` are not walked again; the set is
+        updated in place and returned.
+        """
+        seen = set() if seen is None else seen
+        pending = [ institution_id ]
+        while pending:
+            institution_id = pending.pop()
+            if institution_id not in seen:
+                seen.add(institution_id)
+                for edge in self.hierarchical(institution_id):
+                    if edge.type_id not in exclude_types:
+                        pending.append(edge.institution)
+        return seen
+
+
+def get_graph():
+    """
+    Relationship graph, shared through the cache. Once the current transaction has changed relationships, the graph
+    is loaded from the database and not cached, as it reflects changes that are not committed (yet).
+    """
+    if changed_in_transaction():
+        return RelationshipGraph.load()
+    graph = cache.get(CACHE_KEY)
+    if graph is None:
+        graph = RelationshipGraph.load()
+        cache.set(CACHE_KEY, graph, CACHE_TIMEOUT)
+    return graph
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+
+
+def _invalidate_on_commit():
+    cache.delete(CACHE_KEY)
+
+
+def mark_changed(loaddata=False):
+    """
+    Drop the cached graph, now and once the current transaction is committed, in case another process cached the
+    old graph in the meantime. Fixtures being loaded do not need the graph, so it is still cached while loading.
+    """
+    invalidate()
+    if loaddata:
+        transaction.on_commit(invalidate)
+    elif not changed_in_transaction():
+        transaction.on_commit(_invalidate_on_commit)
+
+
+def changed_in_transaction():
+    """
+    Whether the current transaction changed relationships: the callback of mark_changed() is still pending. Django
+    discards it when the transaction (or the savepoint it was registered in) is rolled back, and runs it on commit.
+    """
+    return connection.in_atomic_block and any(
+        callback[1] is _invalidate_on_commit for callback in connection.run_on_commit
+    )
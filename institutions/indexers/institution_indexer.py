@@ -1,12 +1,11 @@
 import json
 import re
+from collections import defaultdict
 
 import pysolr
 from django.conf import settings
-from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
 
-from agencies.models import AgencyActivityType
+from institutions.graph import get_graph
 from institutions.models import Institution
 from reports.models import Report
 
@@ -15,10 +14,25 @@ class InstitutionIndexer:
     """
     Class to index Institution and their corresponding Report records to Solr.
     """
+    # institutions indexed and posted to Solr at once by index_many
+    CHUNK_SIZE = 500
+
+    # related records used to build the documents, prefetched by index_many
+    PREFETCH = (
+        'institutionname_set__institutionnameversion_set',
+        'institutioncountry_set__country',
+        'institutionqfehealevel_set__qf_ehea_level',
+    )
+    # related records of hierarchically related institutions, loaded by get_related_institutions
+    RELATED_PREFETCH = (
+        'institutionname_set__institutionnameversion_set',
+    )
 
     def __init__(self, institution_id):
         self.institution_id = institution_id
         self.institution = None
+        self.graph = None
+        self.related_institutions = None
         self.solr_core = getattr(settings, "SOLR_CORE_INSTITUTIONS", "deqar-institutions")
         self.solr_url = "%s/%s" % (getattr(settings, "SOLR_URL", "http://localhost:8983/solr"), self.solr_core)
         self.solr = pysolr.Solr(self.solr_url, always_commit=True)
@@ -90,18 +104,97 @@ class InstitutionIndexer:
 
     def index(self):
         self._get_institution()
-        self._index_main_institution()
-        self._index_hierarchical_institutions()
-        self._index_reports()
-        self._store_json()
-        self._remove_duplicates()
-        self._remove_empty_keys()
+        self.graph = get_graph()
+        self.related_institutions = self.get_related_institutions([self.institution.id], self.graph)
+        self._build_doc(self.get_report_facets([self.institution.id]).get(self.institution.id))
         try:
             self.solr.add([self.doc])
             print('Indexed Institution No. %s!' % self.doc['id'])
         except pysolr.SolrError as e:
             print('Error with Institution No. %s! Error: %s' % (self.doc['id'], e))
 
+    @classmethod
+    def index_many(cls, institution_ids, chunk_size=None, fail_silently=True):
+        """
+        Index several institutions: related records and report facets are fetched for a chunk of institutions at
+        once, and the documents of each chunk are posted to Solr in one request, committing once at the end.
+        Solr errors are printed, or raised if fail_silently is False.
+        """
+        institution_ids = list(institution_ids)
+        chunk_size = chunk_size or cls.CHUNK_SIZE
+        solr = None
+        graph = get_graph()
+        for start in range(0, len(institution_ids), chunk_size):
+            chunk = institution_ids[start:start + chunk_size]
+            report_facets = cls.get_report_facets(chunk)
+            related_institutions = cls.get_related_institutions(chunk, graph)
+            docs = []
+            for institution in Institution.objects.filter(id__in=chunk).prefetch_related(*cls.PREFETCH):
+                indexer = cls(institution.id)
+                indexer.institution = institution
+                indexer.graph = graph
+                indexer.related_institutions = related_institutions
+                indexer._build_doc(report_facets.get(institution.id))
+                docs.append(indexer.doc)
+                solr = indexer.solr
+            if docs:
+                try:
+                    solr.add(docs, commit=False)
+                    print('Indexed Institutions No. %s-%s (%d records)!' % (chunk[0], chunk[-1], len(docs)))
+                except pysolr.SolrError as e:
+                    print('Error with Institutions No. %s-%s! Error: %s' % (chunk[0], chunk[-1], e))
+                    if not fail_silently:
+                        raise
+        if solr:
+            solr.commit()
+
+    @classmethod
+    def delete_many(cls, institution_ids):
+        """
+        Delete several institutions from Solr with one request
+        """
+        institution_ids = [ str(institution_id) for institution_id in institution_ids ]
+        if institution_ids:
+            cls(None).solr.delete(id=institution_ids, commit=True)
+
+    @classmethod
+    def get_related_institutions(cls, institution_ids, graph):
+        """
+        Institutions hierarchically related to any of the given ones, as a dict by ID, with their names prefetched
+        """
+        related_ids = {
+            edge.institution for institution_id in institution_ids for edge in graph.hierarchical(institution_id)
+        }
+        return Institution.objects.filter(id__in=related_ids).prefetch_related(*cls.RELATED_PREFETCH).in_bulk()
+
+    @staticmethod
+    def get_report_facets(institution_ids):
+        """
+        Facet values from the reports of several institutions, computed with two aggregate queries.
+        Returns a dict mapping institution ID to facet lists; institutions without reports are not included.
+        """
+        facets = defaultdict(lambda: defaultdict(set))
+        reports = Report.objects.filter(institutions__in=institution_ids).order_by()
+
+        for row in reports.values('institutions', 'agency__acronym_primary', 'status__status', 'crossborder').distinct():
+            institution = facets[row['institutions']]
+            institution['reports_agencies'].add(row['agency__acronym_primary'])
+            institution['status_facet'].add(row['status__status'])
+            institution['crossborder_facet'].update({ False, row['crossborder'] })
+
+        for row in reports.filter(agency_esg_activities__isnull=False).values(
+                'institutions',
+                'agency_esg_activities__activity_display',
+                'agency_esg_activities__activity_group__activity_type__type').distinct():
+            institution = facets[row['institutions']]
+            institution['activity_facet'].add(row['agency_esg_activities__activity_display'])
+            institution['activity_type_facet'].add(row['agency_esg_activities__activity_group__activity_type__type'])
+
+        return {
+            institution_id: { key: list(values) for key, values in institution.items() }
+            for institution_id, institution in facets.items()
+        }
+
     def delete(self):
         self.solr.delete(self.institution_id)
         print('Deleted Institution No. %s!' % self.institution_id)
@@ -110,6 +203,14 @@ class InstitutionIndexer:
     def _get_institution(self):
         self.institution = Institution.objects.get(pk=self.institution_id)
 
+    def _build_doc(self, report_facets=None):
+        self._index_main_institution()
+        self._index_hierarchical_institutions()
+        self._add_report_facets(report_facets or {})
+        self._store_json()
+        self._remove_duplicates()
+        self._remove_empty_keys()
+
     def _index_main_institution(self):
         # Index display fields
         # has_report is maintained on the model (single source of truth, incl. related reports)
@@ -179,7 +280,7 @@ class InstitutionIndexer:
         self.doc['name_version_transliterated'] = list(filter(None, self.doc['name_version_transliterated']))
 
         # Index places
-        for icountry in self.institution.institutioncountry_set.iterator():
+        for icountry in self.institution.institutioncountry_set.all():
             self.doc['place'].append({
                 'country': icountry.country.name_english.strip(),
                 'city': icountry.city.strip() if icountry.city else None,
@@ -203,7 +304,7 @@ class InstitutionIndexer:
         self.doc['city'] = cities
 
         # Index QF-EHEA level
-        for iqfehealevel in self.institution.institutionqfehealevel_set.iterator():
+        for iqfehealevel in self.institution.institutionqfehealevel_set.all():
             self.doc['qf_ehea_level'].append(iqfehealevel.qf_ehea_level.level.strip())
             self.doc['qf_ehea_level_id'].append(iqfehealevel.qf_ehea_level.id)
             self.doc['qf_ehea_level_facet'].append(iqfehealevel.qf_ehea_level.level.strip())
@@ -214,36 +315,27 @@ class InstitutionIndexer:
     def _index_hierarchical_institutions(self):
         # Index children
         includes = []
-        for related_institution in self.institution.relationship_parent.iterator():
-            includes.append({
-                'name_primary': related_institution.institution_child.name_primary,
-                'website_link': related_institution.institution_child.website_link,
-                'relationship_type': related_institution.relationship_type.type
-                if related_institution.relationship_type else None,
-                'valid_from': str(related_institution.valid_from)
-                if related_institution.valid_from else None,
-                'valid_to': str(related_institution.valid_to)
-                if related_institution.valid_to else None
-            })
-            self._index_related_institution(related_institution.institution_child)
+        for edge in self.graph.children.get(self.institution.id, ()):
+            includes.append(self._hierarchical_relationship(edge))
         self.doc['hierarchical_relationships']['includes'] = includes
 
         # Index parents
         part_of = []
-        for related_institution in self.institution.relationship_child.iterator():
-            part_of.append({
-                'name_primary': related_institution.institution_parent.name_primary,
-                'website_link': related_institution.institution_parent.website_link,
-                'relationship_type': related_institution.relationship_type.type
-                if related_institution.relationship_type else None,
-                'valid_from': str(related_institution.valid_from)
-                if related_institution.valid_from else None,
-                'valid_to': str(related_institution.valid_to)
-                if related_institution.valid_to else None
-            })
-            self._index_related_institution(related_institution.institution_parent)
+        for edge in self.graph.parents.get(self.institution.id, ()):
+            part_of.append(self._hierarchical_relationship(edge))
         self.doc['hierarchical_relationships']['part_of'] = part_of
 
+    def _hierarchical_relationship(self, edge):
+        related_institution = self.related_institutions[edge.institution]
+        self._index_related_institution(related_institution)
+        return {
+            'name_primary': related_institution.name_primary,
+            'website_link': related_institution.website_link,
+            'relationship_type': edge.type,
+            'valid_from': str(edge.valid_from) if edge.valid_from else None,
+            'valid_to': str(edge.valid_to) if edge.valid_to else None
+        }
+
     def _index_related_institution(self, related_institution):
         # Index name versions
         aggregated_name_official = self.doc['aggregated_name_official']
@@ -252,12 +344,12 @@ class InstitutionIndexer:
         aggregated_name_version = self.doc['aggregated_name_version']
         aggregated_name_version_transliterated = self.doc['aggregated_name_version_transliterated']
 
-        for iname in related_institution.institutionname_set.iterator():
+        for iname in related_institution.institutionname_set.all():
             aggregated_name_official.append(iname.name_official.strip())
             aggregated_name_official_transliterated.append(iname.name_official_transliterated.strip())
             aggregated_name_english.append(iname.name_english.strip())
 
-            for iname_version in iname.institutionnameversion_set.iterator():
+            for iname_version in iname.institutionnameversion_set.all():
                 aggregated_name_version.append(iname_version.name.strip())
                 aggregated_name_version_transliterated.append(iname_version.transliteration.strip())
 
@@ -282,27 +374,6 @@ class InstitutionIndexer:
         self.doc['place'] = json.dumps(self.doc['place'])
         self.doc['hierarchical_relationships'] = json.dumps(self.doc['hierarchical_relationships'])
 
-    def _index_reports(self):
-        reports = Report.objects.filter(institutions=self.institution).iterator()
-        self._add_reports(reports)
-
-    def _add_reports(self, reports):
-        for report in reports:
-            self.doc['reports_agencies'].append(report.agency.acronym_primary)
-            self.doc['status_facet'].append(report.status.status)
-            for activity in report.agency_esg_activities.all():
-                self.doc['activity_facet'].append(activity.activity_display)
-
-            try:
-                for activity in report.agency_esg_activities.all():
-                    at = AgencyActivityType.objects.get(id=activity.activity_type_id)
-                    self.doc['activity_type_facet'].append(at.type)
-            except ObjectDoesNotExist:
-                at = None
-            self.doc['crossborder_facet'].append(False)
-
-            # Cross-border filter
-            focus_countries = report.agency.agencyfocuscountry_set
-            for ic in self.institution.institutioncountry_set.iterator():
-                if focus_countries.filter(Q(country__id=ic.country.id) & Q(country_is_crossborder=True)):
-                    self.doc['crossborder_facet'].append(True)
+    def _add_report_facets(self, report_facets):
+        for key, values in report_facets.items():
+            self.doc[key].extend(values)
@@ -1,36 +1,86 @@
+import csv
+import json
+
 from django.core.management import BaseCommand
+from django.db.models import Count, F, Q, Window
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Count
 from institutions.models import InstitutionIdentifier
-from agencies.models import Agency
 
 
 class Command(BaseCommand):
     help = 'Find institution identifiers that are not unique, i.e. two or more institutions are identified by the same identifier'
 
+    CSV_FIELDS = ['agency', 'identifier', 'resource', 'ambiguous', 'deqar_id', 'name_primary', 'website_link',
+                  'closure_date']
+
     def add_arguments(self, parser):
-        pass
+        parser.add_argument('--format', choices=['text', 'csv', 'json'], default='text',
+                            help='Output format (default: text)')
+
+    def get_groups(self):
+        """
+        Identifiers shared by several institutions, grouped by agency, identifier and resource, with one query.
+        A group is ambiguous if it is a global identifier (without agency) shared by more than one open institution.
+        """
+        partition = [F('agency'), F('identifier'), F('resource')]
+        identifiers = InstitutionIdentifier.objects \
+            .select_related('agency', 'institution') \
+            .annotate(n=Window(Count('id'), partition_by=partition),
+                      n_open=Window(Count('id', filter=Q(institution__closure_date__isnull=True)),
+                                    partition_by=partition)) \
+            .filter(n__gt=1) \
+            .order_by(F('agency__acronym_primary').asc(nulls_first=True), 'identifier', 'resource', 'institution__deqar_id')
+
+        groups = []
+        for i in identifiers:
+            key = (i.agency_id, i.identifier, i.resource_id)
+            if not groups or groups[-1]['key'] != key:
+                groups.append({
+                    'key': key,
+                    'agency': i.agency.acronym_primary if i.agency else None,
+                    'identifier': i.identifier,
+                    'resource': i.resource_id,
+                    'ambiguous': i.agency is None and i.n_open > 1,
+                    'institutions': [],
+                })
+            groups[-1]['institutions'].append({
+                'deqar_id': i.institution.deqar_id,
+                'name_primary': i.institution.name_primary,
+                'website_link': i.institution.website_link,
+                'closure_date': str(i.institution.closure_date) if i.institution.closure_date else None,
+            })
+        for group in groups:
+            del group['key']
+        return groups
 
     def handle(self, *args, **options):
-        self.stdout.write("Finding institution identifiers that are not unique...")
+        groups = self.get_groups()
 
-        for i in InstitutionIdentifier.objects.values('agency','identifier','resource').annotate(n=Count('institution')).filter(n__gt=1):
-            try:
-                qaa = Agency.objects.get(pk=i['agency'])
-            except ObjectDoesNotExist:
-                l = InstitutionIdentifier.objects.filter(identifier=i['identifier'], resource=i['resource'])
-                if l.filter(institution__closure_date__isnull=True).count() > 1:
-                    self.stdout.write(self.style.ERROR(f"\nglobal identifier '{i['identifier']}' ({i['resource']}) is not unique") + ", it points to these existing institutions:")
-                else:
-                    self.stdout.write(self.style.WARNING(f"\nglobal identifier '{i['identifier']}' ({i['resource']}) is not unique") + ", it points to these institutions (but only one existing one):")
+        if options['format'] == 'json':
+            json.dump(groups, self.stdout, indent=2, ensure_ascii=False)
+            self.stdout.write('')
+        elif options['format'] == 'csv':
+            writer = csv.DictWriter(self.stdout, fieldnames=self.CSV_FIELDS)
+            writer.writeheader()
+            for group in groups:
+                for institution in group['institutions']:
+                    writer.writerow(dict(agency=group['agency'], identifier=group['identifier'],
+                                         resource=group['resource'], ambiguous=group['ambiguous'], **institution))
+        else:
+            self.write_text(groups)
+
+    def write_text(self, groups):
+        self.stdout.write("Finding institution identifiers that are not unique...")
+        for group in groups:
+            if group['agency']:
+                self.stdout.write(self.style.WARNING(f"\n{group['agency']}'s identifier '{group['identifier']}' is not unique") + ", it points to these institutions:")
+            elif group['ambiguous']:
+                self.stdout.write(self.style.ERROR(f"\nglobal identifier '{group['identifier']}' ({group['resource']}) is not unique") + ", it points to these existing institutions:")
             else:
-                self.stdout.write(self.style.WARNING(f"\n{qaa.acronym_primary}'s identifier '{i['identifier']}' is not unique") + ", it points to these institutions:")
-                l = InstitutionIdentifier.objects.filter(identifier=i['identifier'], agency=qaa)
-            for j in l:
-                self.stdout.write(f"- {j.institution.deqar_id} {j.institution} ({j.institution.website_link})", ending='')
-                if j.institution.closure_date:
-                    self.stdout.write(f" - closed {j.institution.closure_date}")
+                self.stdout.write(self.style.WARNING(f"\nglobal identifier '{group['identifier']}' ({group['resource']}) is not unique") + ", it points to these institutions (but only one existing one):")
+            for institution in group['institutions']:
+                self.stdout.write(f"- {institution['deqar_id']} {institution['name_primary']} ({institution['website_link']})", ending='')
+                if institution['closure_date']:
+                    self.stdout.write(f" - closed {institution['closure_date']}")
                 else:
                     self.stdout.write('')
-
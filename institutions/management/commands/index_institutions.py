@@ -9,12 +9,15 @@ from institutions.models import Institution
 class Command(BaseCommand):
     help = 'Index Institution records.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', '-c', type=int, default=InstitutionIndexer.CHUNK_SIZE,
+                            help=f'Number of institutions posted to Solr at once (default: {InstitutionIndexer.CHUNK_SIZE}).')
+
     def handle(self, *args, **options):
         solr_core = getattr(settings, "SOLR_CORE_INSTITUTIONS", "deqar-institutions")
         solr_url = "%s/%s" % (getattr(settings, "SOLR_URL", "http://localhost:8983/solr"), solr_core)
         solr = pysolr.Solr(solr_url, always_commit=True)
         solr.delete(q='*:*', commit=True)
 
-        for inst in Institution.objects.iterator():
-            indexer = InstitutionIndexer(inst.id)
-            indexer.index()
+        institution_ids = Institution.objects.order_by('id').values_list('id', flat=True)
+        InstitutionIndexer.index_many(institution_ids, chunk_size=options['chunk_size'])
@@ -1,5 +1,6 @@
 from django.core.management import BaseCommand
 
+from institutions.graph import get_graph
 from institutions.models import Institution
 from institutions.tasks import index_institution, meili_index_institution
 
@@ -15,8 +16,9 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         changed = 0
+        graph = get_graph()
         for institution in Institution.objects.iterator():
-            expected = institution.calculate_has_report()
+            expected = institution.calculate_has_report(graph)
             if institution.has_report == expected:
                 continue
 
@@ -1,6 +1,7 @@
+from collections import defaultdict
+
 from django.core.management import BaseCommand
 from django.conf import settings
-from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
 
 import requests
 from urllib.parse import urljoin
@@ -19,49 +20,67 @@ class Command(BaseCommand):
         'entities': {
             'key': 'BAS.ENTITYID.v',
             'model': Institution,
-            'expr': 'eter_id',
-            'pattern': '%s',
+            'field': 'eter_id',
+            'related': (),
             'msg': 'Entity {orgreg} was deleted, but still exists as {deqar.deqar_id} {deqar.name_primary}'
         },
         'characteristics': {
             'key': 'CHAR.CHARID.v',
             'model': InstitutionName,
-            'expr': 'name_source_note__iregex',
-            'pattern': r'^\s*OrgReg-[0-9]{4}-%s(\s|$)',
+            'field': 'orgreg_source_id',
+            'related': ('institution',),
             'msg': 'Name {orgreg} was deleted, but still exists for {deqar.institution.name_primary}'
         },
         'locations': {
             'key': 'LOCAT.LOCATID.v',
             'model': InstitutionCountry,
-            'expr': 'country_source_note__iregex',
-            'pattern': r'^\s*OrgReg-[0-9]{4}-%s(\s|$)',
+            'field': 'orgreg_source_id',
+            'related': ('institution',),
             'msg': 'Location {orgreg} was deleted, but still exists for {deqar.institution.name_primary}'
         },
         'linkages': {
             'key': 'LINK.ID.v',
             'model': InstitutionHierarchicalRelationship,
-            'expr': 'relationship_note__iregex',
-            'pattern': r'^\s*OrgReg-[0-9]{4}-%s(\s|$)',
+            'field': 'orgreg_source_id',
+            'related': ('institution_child', 'institution_parent'),
             'msg': 'Link {orgreg} was deleted, but still exists for {deqar.institution_child.name_primary} -> {deqar.institution_parent.name_primary}'
         },
         'demographics': {
             'key': 'DEMO.EVENTID.v',
             'model': InstitutionHistoricalRelationship,
-            'expr': 'relationship_note__iregex',
-            'pattern': r'^\s*OrgReg-[0-9]{4}-%s(\s|$)',
+            'field': 'orgreg_source_id',
+            'related': ('institution_source', 'institution_target'),
             'msg': 'Demographic event {orgreg} was deleted, but still exists for {deqar.institution_source.name_primary} <-> {deqar.institution_target.name_primary}'
         }
     }
 
-    def _lookup_deqar_object(self, item):
-        if item.get('collection') not in self.Collections:
-            self.stdout.write(self.style.WARNING(f'No corresponding DEQAR model for collection: "{item.get("collection")}"'))
-        else:
-            qs = self.Collections[item['collection']]['model'].objects
-            orgreg_id = item.get(self.Collections[item['collection']]['key'])
-            for obj in qs.filter(**{ self.Collections[item['collection']]['expr']: self.Collections[item['collection']]['pattern'] % orgreg_id }):
-                self.stdout.write(self.Collections[item['collection']]['msg'].format(orgreg=orgreg_id, deqar=obj))
+    def _collect_deleted_ids(self, items):
+        """
+        OrgReg IDs of the deleted items, by collection
+        """
+        deleted = defaultdict(set)
+        for item in items:
+            if not item.get('deleted', False):
+                continue
+            if item.get('collection') not in self.Collections:
+                self.stdout.write(self.style.WARNING(f'No corresponding DEQAR model for collection: "{item.get("collection")}"'))
+            else:
+                orgreg_id = item.get(self.Collections[item['collection']]['key'])
+                if orgreg_id is not None:
+                    deleted[item['collection']].add(str(orgreg_id))
+        return deleted
 
+    def _lookup_deqar_objects(self, collection, orgreg_ids):
+        spec = self.Collections[collection]
+        # OrgReg IDs parsed from source notes are stored in upper case
+        if spec['field'] == 'orgreg_source_id':
+            lookup_ids = { orgreg_id.upper(): orgreg_id for orgreg_id in orgreg_ids }
+        else:
+            lookup_ids = { orgreg_id: orgreg_id for orgreg_id in orgreg_ids }
+        for obj in spec['model'].objects.select_related(*spec['related']) \
+                                        .filter(**{ f"{spec['field']}__in": list(lookup_ids) }) \
+                                        .order_by(spec['field'], 'id'):
+            self.stdout.write(spec['msg'].format(orgreg=lookup_ids[getattr(obj, spec['field'])], deqar=obj))
 
     def handle(self, *args, **options):
         api_base = getattr(settings, "ORGREG_API_BASE", "https://register.orgreg.joanneum.at/api/2.0/")
@@ -78,7 +97,6 @@ class Command(BaseCommand):
         )
         response.raise_for_status()
 
-        for item in response.json():
-            if item.get('deleted', False):
-                self._lookup_deqar_object(item)
+        for collection, orgreg_ids in self._collect_deleted_ids(response.json()).items():
+            self._lookup_deqar_objects(collection, orgreg_ids)
 
@@ -1,11 +1,20 @@
 from django.core.management import BaseCommand
-from institutions.models import Institution
+from django.db import transaction
+
+from institutions.names import recompute_names
 
 
 class Command(BaseCommand):
     help = 'Set instiution name sort.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('INSTITUTION', nargs='*', type=int,
+                            help='ID(s) of the institution(s) to update (default: all).')
+
     def handle(self, *args, **options):
-        institutions = Institution.objects.all()
-        for institution in institutions:
-            institution.save()
+        with transaction.atomic():
+            changed = recompute_names(options['INSTITUTION'] or None)
+        if options['verbosity'] > 1:
+            for institution_id in changed:
+                self.stdout.write(f'Institution {institution_id} updated')
+        self.stdout.write(f'{len(changed)} institution(s) updated.')
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:29
+
+from django.db import migrations, models
+
+from institutions.models import parse_orgreg_source_id
+
+# model and note field from which the OrgReg ID is parsed
+SOURCE_NOTES = (
+    ('InstitutionName', 'name_source_note'),
+    ('InstitutionCountry', 'country_source_note'),
+    ('InstitutionHierarchicalRelationship', 'relationship_note'),
+    ('InstitutionHistoricalRelationship', 'relationship_note'),
+)
+
+
+def backfill_orgreg_source_ids(apps, schema_editor):
+    for model_name, note_field in SOURCE_NOTES:
+        model = apps.get_model('institutions', model_name)
+        records = []
+        for record in model.objects.filter(**{ f'{note_field}__iregex': r'^\s*OrgReg-' }).only('id', note_field):
+            record.orgreg_source_id = parse_orgreg_source_id(getattr(record, note_field))
+            records.append(record)
+        model.objects.bulk_update(records, ['orgreg_source_id'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0042_meili_sort_by_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='institutioncountry',
+            name='orgreg_source_id',
+            field=models.CharField(blank=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='institutionhierarchicalrelationship',
+            name='orgreg_source_id',
+            field=models.CharField(blank=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='institutionhistoricalrelationship',
+            name='orgreg_source_id',
+            field=models.CharField(blank=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='institutionname',
+            name='orgreg_source_id',
+            field=models.CharField(blank=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='institutioncountry',
+            index=models.Index(fields=['orgreg_source_id'], name='deqar_insti_orgreg__90b8c8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='institutionhierarchicalrelationship',
+            index=models.Index(fields=['orgreg_source_id'], name='deqar_insti_orgreg__b75d5c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='institutionhistoricalrelationship',
+            index=models.Index(fields=['orgreg_source_id'], name='deqar_insti_orgreg__caf4bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='institutionname',
+            index=models.Index(fields=['orgreg_source_id'], name='deqar_insti_orgreg__b2a413_idx'),
+        ),
+        migrations.RunPython(backfill_orgreg_source_ids, reverse_code=migrations.RunPython.noop),
+    ]
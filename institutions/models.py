@@ -1,11 +1,12 @@
 import datetime
+import re
 
-from datedelta import datedelta
 from django.contrib.auth.models import User
 from django.db import models
 from django.db.models import Q
 
 from lists.models import Flag
+from outbox.models import OutboxEvent
 
 
 # OrgReg CHARTYPE value marking single institutions and European Universities alliances
@@ -21,6 +22,18 @@ HIERARCHICAL_TYPE_ALLIANCE = 7  # European Universities alliance
 HISTORICAL_TYPE_SUCCEEDED = 2
 HISTORICAL_TYPE_ABSORBED = 3
 
+# source notes of records synchronised from OrgReg start with "OrgReg-<year>-<OrgReg ID>"
+ORGREG_SOURCE_NOTE = re.compile(r'^\s*OrgReg-[0-9]{4}-(\S+)(?:\s|$)', re.IGNORECASE)
+
+
+def parse_orgreg_source_id(note):
+    """
+    OrgReg ID from a source note written by the OrgReg synchroniser (upper case, as IDs are matched
+    case-insensitively), or None
+    """
+    match = ORGREG_SOURCE_NOTE.match(note or '')
+    return match.group(1).upper() if match else None
+
 
 class Institution(models.Model):
     """
@@ -71,38 +84,55 @@ class Institution(models.Model):
         self.flag = Flag.objects.get(pk=3)
         self.save()
 
-    def set_primary_name(self):
-        if self.closure_date:
-            inst_name_primary = self.institutionname_set.all().order_by('-name_valid_to').first()
+    @staticmethod
+    def choose_primary_name(names, closed):
+        """
+        Pick the name record determining name_primary from the institution's names (in default ordering):
+        the first current name, or - for closed institutions - the one valid longest
+        """
+        if closed:
+            # same as ordering by -name_valid_to, where names without end date come first
+            names = sorted(names, key=lambda name: name.name_valid_to or datetime.date.max, reverse=True)
         else:
-            inst_name_primary = self.institutionname_set.filter(name_valid_to__isnull=True).first()
-
-        if inst_name_primary is not None:
-            if inst_name_primary.name_english != "":
-                self.name_primary = inst_name_primary.name_english
-            else:
-                self.name_primary = inst_name_primary.name_official
+            names = [ name for name in names if name.name_valid_to is None ]
+        if names:
+            return names[0].name_english if names[0].name_english != "" else names[0].name_official
+
+    @staticmethod
+    def format_name_sort(name_primary, parent_name=None):
+        if parent_name is not None:
+            return "%s / %s" % (parent_name, name_primary)
+        else:
+            return name_primary
 
-            children = InstitutionHierarchicalRelationship.objects\
-                .filter(relationship_type_id=HIERARCHICAL_TYPE_FACULTY)\
-                .filter(institution_parent=self)
-            if children.count() > 0:
-                for child in children:
-                    child.institution_child.name_sort = "%s / %s" % (self.name_primary,
-                                                                     child.institution_child.name_primary)
-                    child.save()
+    def set_primary_name(self):
+        name_primary = self.choose_primary_name(self.institutionname_set.all(), self.closure_date)
+
+        if name_primary is not None:
+            self.name_primary = name_primary
+
+            # faculties are sorted under their parent institution
+            children = Institution.objects.filter(relationship_child__institution_parent=self,
+                                                  relationship_child__relationship_type_id=HIERARCHICAL_TYPE_FACULTY)
+            changed = []
+            for child in children:
+                name_sort = self.format_name_sort(child.name_primary, self.name_primary)
+                if child.name_sort != name_sort:
+                    child.name_sort = name_sort
+                    changed.append(child)
+            if changed:
+                Institution.objects.bulk_update(changed, ['name_sort'])
+                OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, [ child.id for child in changed ])
 
     def set_name_sort(self):
-        parents = InstitutionHierarchicalRelationship.objects\
+        parent_name = InstitutionHierarchicalRelationship.objects\
             .filter(relationship_type_id=HIERARCHICAL_TYPE_FACULTY)\
-            .filter(institution_child=self)
-        if parents.count() > 0:
-            parent_name = parents.first().institution_parent.name_primary
-            self.name_sort = "%s / %s" % (parent_name, self.name_primary)
-        else:
-            self.name_sort = self.name_primary
+            .filter(institution_child=self)\
+            .values_list('institution_parent__name_primary', flat=True)\
+            .first()
+        self.name_sort = self.format_name_sort(self.name_primary, parent_name)
 
-    def get_report_contributors(self):
+    def get_report_contributors(self, graph=None):
         """
         Canonical enumeration of the institutions whose reports are considered to belong to this
         institution in the public report/programme views (see webapi.v2.views.report_views).
@@ -114,51 +144,22 @@ class Institution(models.Model):
         (compared against report.valid_to_calculated / report.valid_from respectively).
 
         This is the single source of truth shared by calculate_has_report() and the view filters.
+        Relationships are read from the cached relationship graph (see institutions.graph); pass
+        graph to reuse one that is already loaded.
         """
-        contributors = [(self.id, True, None, None)]  # self: direct or platform, unbounded
-        # sub-units (non-platform hierarchical children); alliances are excluded here because their
-        # report flow is reversed (see below) - an alliance does not inherit its members' reports
-        for rel in self.relationship_parent.exclude(
-                relationship_type_id__in=[HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM, HIERARCHICAL_TYPE_ALLIANCE]):
-            contributors.append((rel.institution_child_id, True, rel.valid_from, rel.valid_to))
-        # European Universities alliance: this institution is a member (child) -> it inherits its
-        # alliance parent's reports (reverse of the ordinary parent-pulls-children direction)
-        for rel in self.relationship_child.filter(relationship_type_id=HIERARCHICAL_TYPE_ALLIANCE):
-            contributors.append((rel.institution_parent_id, True, rel.valid_from, rel.valid_to))
-        # historical: this institution succeeded another (it is the target of a 'succeeded' row) ->
-        # it inherits the predecessor's (source's) reports from the succession date on
-        for rel in self.relationship_target.filter(relationship_type_id=HISTORICAL_TYPE_SUCCEEDED):
-            contributors.append((rel.institution_source_id, False, rel.relationship_date, None))
-        # historical: this institution absorbed another (it is the source of an 'absorbed' row) ->
-        # it inherits the absorbed institution's (target's) reports from the absorption date on
-        for rel in self.relationship_source.filter(relationship_type_id=HISTORICAL_TYPE_ABSORBED):
-            contributors.append((rel.institution_target_id, False, rel.relationship_date, None))
-        return contributors
-
-    def get_report_dependents(self):
+        from institutions.graph import get_graph
+        return (graph or get_graph()).report_contributors(self.id)
+
+    def get_report_dependents(self, graph=None):
         """
         Inverse of get_report_contributors(): the set of institution ids (including this one) whose
         has_report value can change when this institution's report links change. Used to propagate
         recomputation when reports are added to / removed from an institution.
         """
-        ids = {self.id}
-        # institutions for which this one is a non-platform, non-alliance child (its parents)
-        for rel in self.relationship_child.exclude(
-                relationship_type_id__in=[HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM, HIERARCHICAL_TYPE_ALLIANCE]):
-            ids.add(rel.institution_parent_id)
-        # European Universities alliance: this institution is the alliance (parent) -> each member
-        # (child) inherits its reports, so their has_report must be recomputed when this one's change
-        for rel in self.relationship_parent.filter(relationship_type_id=HIERARCHICAL_TYPE_ALLIANCE):
-            ids.add(rel.institution_child_id)
-        # this institution is a predecessor (source of a 'succeeded' row) -> the successor (target) inherits
-        for rel in self.relationship_source.filter(relationship_type_id=HISTORICAL_TYPE_SUCCEEDED):
-            ids.add(rel.institution_target_id)
-        # this institution was absorbed (target of an 'absorbed' row) -> the absorber (source) inherits
-        for rel in self.relationship_target.filter(relationship_type_id=HISTORICAL_TYPE_ABSORBED):
-            ids.add(rel.institution_source_id)
-        return ids
-
-    def calculate_has_report(self):
+        from institutions.graph import get_graph
+        return (graph or get_graph()).report_dependents(self.id)
+
+    def calculate_has_report(self, graph=None):
         """
         Whether this institution has at least one report shown for it in the public views, across
         all contributor paths and honouring the validity-date windows. Does not apply the
@@ -169,31 +170,27 @@ class Institution(models.Model):
         def window_q(window_from, window_to):
             q = Q()
             if window_from:
-                # report.valid_to_calculated >= window_from
-                # valid_to_calculated = valid_to, or valid_from + VALIDITY_YEARS when valid_to unset
-                q &= (Q(valid_to__gte=window_from)
-                      | Q(valid_to__isnull=True,
-                          valid_from__gte=window_from - datedelta(years=Report.VALIDITY_YEARS)))
+                q &= Q(valid_to_calculated__gte=window_from)
             if window_to:
                 # report.valid_from <= window_to
                 q &= Q(valid_from__lte=window_to)
             return q
 
         overall = Q()
-        for iid, include_platforms, window_from, window_to in self.get_report_contributors():
+        for iid, include_platforms, window_from, window_to in self.get_report_contributors(graph):
             member = Q(institutions=iid)
             if include_platforms:
                 member |= Q(platforms=iid)
             overall |= (member & window_q(window_from, window_to))
         return Report.objects.filter(overall).exists()
 
-    def update_has_report(self):
+    def update_has_report(self, graph=None):
         """
         Recompute has_report and persist it if changed. Returns True if the value changed.
         Uses .update() to avoid re-triggering the Institution post_save reindex; callers are
         responsible for reindexing the institutions whose flag changed.
         """
-        new_value = self.calculate_has_report()
+        new_value = self.calculate_has_report(graph)
         if self.has_report != new_value:
             Institution.objects.filter(pk=self.pk).update(has_report=new_value)
             self.has_report = new_value
@@ -261,6 +258,8 @@ class InstitutionName(models.Model):
     # Raw OrgReg CHARTYPE value(s) for this CHAR record (multi-valued, e.g. [1, 10]);
     # 10 marks a European Universities alliance. See Institution.is_orgreg_alliance().
     orgreg_char_type = models.JSONField(default=list, blank=True)
+    # OrgReg CHAR ID, parsed from name_source_note on save
+    orgreg_source_id = models.CharField(max_length=50, blank=True, null=True, editable=False)
 
     def add_source_note(self, flag_msg):
         if flag_msg not in self.name_source_note:
@@ -273,6 +272,7 @@ class InstitutionName(models.Model):
             self.save()
 
     def save(self, *args, **kwargs):
+        self.orgreg_source_id = parse_orgreg_source_id(self.name_source_note)
         super(InstitutionName, self).save(*args, **kwargs)
         self.institution.set_primary_name()
         self.institution.set_name_sort()
@@ -289,6 +289,7 @@ class InstitutionName(models.Model):
             models.Index(fields=['name_english']),
             models.Index(fields=['acronym']),
             models.Index(fields=['name_valid_to']),
+            models.Index(fields=['orgreg_source_id']),
         ]
 
 
@@ -337,6 +338,8 @@ class InstitutionCountry(models.Model):
     country_valid_from = models.DateField(default=datetime.date.today)
     country_valid_to = models.DateField(blank=True, null=True)
     country_verified = models.BooleanField(default=True)
+    # OrgReg LOCAT ID, parsed from country_source_note on save
+    orgreg_source_id = models.CharField(max_length=50, blank=True, null=True, editable=False)
 
     def add_source_note(self, flag_msg):
         if flag_msg not in self.country_source_note:
@@ -347,6 +350,10 @@ class InstitutionCountry(models.Model):
                 self.country_source_note = flag_msg
             self.save()
 
+    def save(self, *args, **kwargs):
+        self.orgreg_source_id = parse_orgreg_source_id(self.country_source_note)
+        super(InstitutionCountry, self).save(*args, **kwargs)
+
     class Meta:
         db_table = 'deqar_institution_countries'
         verbose_name = 'Institution Country'
@@ -354,6 +361,7 @@ class InstitutionCountry(models.Model):
         indexes = [
             models.Index(fields=['city']),
             models.Index(fields=['country_valid_to']),
+            models.Index(fields=['orgreg_source_id']),
         ]
 
 
@@ -450,11 +458,20 @@ class InstitutionHistoricalRelationship(models.Model):
     relationship_type = models.ForeignKey('InstitutionHistoricalRelationshipType', on_delete=models.CASCADE)
     relationship_note = models.TextField(blank=True, null=True)
     relationship_date = models.DateField(default=datetime.date.today)
+    # OrgReg DEMO event ID, parsed from relationship_note on save
+    orgreg_source_id = models.CharField(max_length=50, blank=True, null=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.orgreg_source_id = parse_orgreg_source_id(self.relationship_note)
+        super(InstitutionHistoricalRelationship, self).save(*args, **kwargs)
 
     class Meta:
         db_table = 'deqar_institution_historical_relationships'
         verbose_name = 'Institution Historical Relationship'
         verbose_name_plural = 'Institution Historical Relationships'
+        indexes = [
+            models.Index(fields=['orgreg_source_id']),
+        ]
 
 
 class InstitutionHierarchicalRelationshipType(models.Model):
@@ -485,8 +502,11 @@ class InstitutionHierarchicalRelationship(models.Model):
     relationship_note = models.TextField(blank=True, null=True)
     valid_from = models.DateField(blank=True, null=True)
     valid_to = models.DateField(blank=True, null=True)
+    # OrgReg LINK ID, parsed from relationship_note on save
+    orgreg_source_id = models.CharField(max_length=50, blank=True, null=True, editable=False)
 
     def save(self, *args, **kwargs):
+        self.orgreg_source_id = parse_orgreg_source_id(self.relationship_note)
         super(InstitutionHierarchicalRelationship, self).save(*args, **kwargs)
         self.institution_parent.set_name_sort()
         self.institution_parent.save()
@@ -498,6 +518,9 @@ class InstitutionHierarchicalRelationship(models.Model):
         verbose_name = 'Institution Hierarchical Relationship'
         verbose_name_plural = 'Institution Hierarchical Relationships'
         ordering = ('id',)
+        indexes = [
+            models.Index(fields=['orgreg_source_id']),
+        ]
 
 
 class InstitutionOrganizationType(models.Model):
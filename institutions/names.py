@@ -0,0 +1,65 @@
+from collections import defaultdict
+
+from institutions.models import Institution, InstitutionName, InstitutionHierarchicalRelationship, \
+    HIERARCHICAL_TYPE_FACULTY
+from outbox.models import OutboxEvent
+
+# number of institutions written per UPDATE statement
+BATCH_SIZE = 500
+
+
+def recompute_names(institution_ids=None):
+    """
+    Recompute name_primary and name_sort of institutions (default: all) in memory, from one pass over their
+    names and faculty relationships, and save the changed ones with bulk_update. Faculties of the given
+    institutions are included, as their name_sort contains the parent's name. Signals are not sent; the changed
+    institutions are recorded in the search index outbox instead.
+
+    Returns the IDs of the institutions changed.
+    """
+    faculties = InstitutionHierarchicalRelationship.objects \
+        .filter(relationship_type_id=HIERARCHICAL_TYPE_FACULTY) \
+        .order_by('id') \
+        .values_list('institution_child_id', 'institution_parent_id')
+    if institution_ids is not None:
+        institution_ids = set(institution_ids)
+        faculties = faculties.filter(institution_child_id__in=institution_ids) \
+            | faculties.filter(institution_parent_id__in=institution_ids)
+    parent_of = {}
+    for child_id, parent_id in faculties:
+        parent_of.setdefault(child_id, parent_id)
+
+    institutions = Institution.objects.only('id', 'name_primary', 'name_sort', 'closure_date').order_by('id')
+    names = InstitutionName.objects.only('institution_id', 'name_official', 'name_english', 'name_valid_to')
+    if institution_ids is not None:
+        selected_ids = institution_ids | set(parent_of.keys()) | set(parent_of.values())
+        institutions = institutions.filter(id__in=selected_ids)
+        names = names.filter(institution_id__in=selected_ids)
+    names_of = defaultdict(list)
+    for name in names:
+        names_of[name.institution_id].append(name)
+
+    institutions = { institution.id: institution for institution in institutions }
+    for institution in institutions.values():
+        name_primary = Institution.choose_primary_name(names_of[institution.id], institution.closure_date)
+        if name_primary is not None:
+            institution._new_name_primary = name_primary
+        else:
+            institution._new_name_primary = institution.name_primary
+
+    changed = []
+    for institution in institutions.values():
+        if institution_ids is not None and institution.id not in institution_ids \
+                and parent_of.get(institution.id) not in institution_ids:
+            continue
+        parent = institutions.get(parent_of.get(institution.id))
+        name_sort = Institution.format_name_sort(institution._new_name_primary,
+                                                 parent._new_name_primary if parent else None)
+        if (institution.name_primary, institution.name_sort) != (institution._new_name_primary, name_sort):
+            institution.name_primary = institution._new_name_primary
+            institution.name_sort = name_sort
+            changed.append(institution)
+
+    Institution.objects.bulk_update(changed, ['name_primary', 'name_sort'], batch_size=BATCH_SIZE)
+    OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, [ institution.id for institution in changed ])
+    return [ institution.id for institution in changed ]
@@ -169,15 +169,7 @@ class InstitutionIndexerSerializer(serializers.ModelSerializer):
         return [ iqf.qf_ehea_level.level for iqf in obj.institutionqfehealevel_set.all() ]
 
     def get_crossborder(self, obj):
-        crossborder = False
-        for report in obj.reports.iterator():
-            for ic in obj.institutioncountry_set.filter(country_verified=True):
-                if not report.agency.agencyfocuscountry_set.filter(Q(country__id=ic.country.id) & Q(country_is_crossborder=False)):
-                    crossborder = True
-                    break
-            if crossborder:
-                break
-        return crossborder
+        return obj.reports.filter(crossborder=True).exists()
 
     def get_agencies(self, obj):
         return AgencySerializer(Agency.objects.filter(Q(report__institutions=obj) | Q(co_authored_reports__institutions=obj)).distinct().order_by('acronym_primary'), many=True).data
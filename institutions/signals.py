@@ -1,27 +1,28 @@
-import sys
-
-from django.db import transaction
 from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
 from django.dispatch import receiver
 
-from institutions.models import Institution, InstitutionHierarchicalRelationship, InstitutionHistoricalRelationship
-from institutions.tasks import index_institution, delete_institution, meili_index_institution, meili_delete_institution
+from institutions import graph
+from institutions.models import Institution, InstitutionHierarchicalRelationship, InstitutionHistoricalRelationship, \
+    InstitutionHierarchicalRelationshipType
+from outbox.models import OutboxEvent
 
 
 @receiver([post_save], sender=Institution)
 def do_index_institutions_upon_institution_save(sender, instance, **kwargs):
     if not instance.deqar_id:
         instance.create_deqar_id()
-    if 'test' not in sys.argv:
-        transaction.on_commit(lambda: index_institution.delay(instance.id))
-        transaction.on_commit(lambda: meili_index_institution.delay(instance.id))
+    OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, instance.id)
 
 @receiver([pre_delete], sender=Institution)
 def do_remove_institutions_upon_institution_delete(sender, instance, **kwargs):
-    institution_id = instance.id
-    if 'test' not in sys.argv:
-        transaction.on_commit(lambda: delete_institution.delay(institution_id))
-        transaction.on_commit(lambda: meili_delete_institution.delay(institution_id))
+    OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, instance.id, op=OutboxEvent.OP_DELETE)
+
+@receiver([post_save, post_delete], sender=InstitutionHierarchicalRelationship)
+@receiver([post_save, post_delete], sender=InstitutionHistoricalRelationship)
+@receiver([post_save, post_delete], sender=InstitutionHierarchicalRelationshipType)
+def do_invalidate_relationship_graph(sender, raw=False, **kwargs):
+    # registered before the receivers below, which already need the changed graph
+    graph.mark_changed(loaddata=raw)
 
 @receiver([post_save, post_delete], sender=InstitutionHierarchicalRelationship)
 def do_index_institutions_upon_hierarchical_relationship_save(sender, instance, **kwargs):
@@ -30,11 +31,7 @@ def do_index_institutions_upon_hierarchical_relationship_save(sender, instance,
     # a (non-platform) parent inherits its child's reports, so its has_report may change
     institution_parent.update_has_report()
     institution_child.update_has_report()
-    if 'test' not in sys.argv:
-        transaction.on_commit(lambda: index_institution.delay(institution_parent.id))
-        transaction.on_commit(lambda: meili_index_institution.delay(institution_parent.id))
-        transaction.on_commit(lambda: index_institution.delay(institution_child.id))
-        transaction.on_commit(lambda: meili_index_institution.delay(institution_child.id))
+    OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, [institution_parent.id, institution_child.id])
 
 
 @receiver([post_save, post_delete], sender=InstitutionHistoricalRelationship)
@@ -44,8 +41,4 @@ def do_index_institutions_upon_historical_relationship_save(sender, instance, **
     # succeeded/absorbed relationships let one side inherit the other's reports; recompute both
     institution_source.update_has_report()
     institution_target.update_has_report()
-    if 'test' not in sys.argv:
-        transaction.on_commit(lambda: index_institution.delay(institution_source.id))
-        transaction.on_commit(lambda: meili_index_institution.delay(institution_source.id))
-        transaction.on_commit(lambda: index_institution.delay(institution_target.id))
-        transaction.on_commit(lambda: meili_index_institution.delay(institution_target.id))
+    OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, [institution_source.id, institution_target.id])
@@ -0,0 +1,80 @@
+import csv
+import datetime
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from institutions.models import Institution, InstitutionIdentifier
+
+
+class AmbiguousIdentifiersTest(TestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'flag', 'permission_type',
+        'qf_ehea_level', 'institution_historical_field',
+        'agency_activity_type', 'agency_focus', 'identifier_resource',
+        'agency_historical_field', 'eqar_decision_type',
+        'agency_demo_01', 'agency_demo_02', 'association', 'submitting_agency_demo',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+    ]
+
+    def make_groups(self, n):
+        """
+        Synthetic dataset: n global identifiers shared by two open institutions, n shared by an open and a closed
+        one, and n local identifiers of agency 5 shared by two institutions
+        """
+        identifiers = []
+        for i in range(n):
+            institutions = [
+                Institution.objects.create(name_primary=f'Institution {i}-{j}', website_link='http://example.com',
+                                           closure_date=datetime.date(2020, 1, 1) if j == 3 else None)
+                for j in range(4)
+            ]
+            for institution in institutions[:2]:
+                identifiers.append(InstitutionIdentifier(institution=institution, identifier=f'PIC{i}', resource_id='EU-PIC'))
+                identifiers.append(InstitutionIdentifier(institution=institution, identifier=f'L{i}', agency_id=5,
+                                                         resource_id='local identifier'))
+            for institution in institutions[2:]:
+                identifiers.append(InstitutionIdentifier(institution=institution, identifier=f'VAT{i}', resource_id='EU-VAT'))
+        InstitutionIdentifier.objects.bulk_create(identifiers)
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('ambiguous_institution_identifiers', *args, stdout=out)
+        return out.getvalue()
+
+    def test_queries(self):
+        # one query, regardless of the number of duplicate groups
+        self.make_groups(2)
+        with self.assertNumQueries(1):
+            self.run_command()
+        self.make_groups(20)
+        with self.assertNumQueries(1):
+            self.run_command()
+
+    def test_json(self):
+        self.make_groups(1)
+        groups = json.loads(self.run_command('--format', 'json'))
+        summary = { (group['agency'], group['identifier'], group['resource']): group for group in groups }
+        self.assertTrue(summary[(None, 'PIC0', 'EU-PIC')]['ambiguous'])
+        self.assertFalse(summary[(None, 'VAT0', 'EU-VAT')]['ambiguous'])
+        self.assertFalse(summary[('ACQUIN', 'L0', 'local identifier')]['ambiguous'])
+        self.assertEqual([ institution['closure_date'] for institution in summary[(None, 'VAT0', 'EU-VAT')]['institutions'] ],
+                         [ None, '2020-01-01' ])
+        for group in groups:
+            self.assertEqual(len(group['institutions']), 2)
+
+    def test_csv(self):
+        self.make_groups(1)
+        rows = list(csv.DictReader(StringIO(self.run_command('--format', 'csv'))))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({ row['identifier'] for row in rows if row['ambiguous'] == 'True' }, { 'PIC0' })
+
+    def test_text(self):
+        self.make_groups(1)
+        out = self.run_command()
+        self.assertIn("global identifier 'PIC0' (EU-PIC) is not unique", out)
+        self.assertIn("it points to these institutions (but only one existing one):", out)
+        self.assertIn("ACQUIN's identifier 'L0' is not unique", out)
+        self.assertIn(" - closed 2020-01-01", out)
@@ -0,0 +1,120 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+
+from institutions import graph
+from institutions.graph import RelationshipGraph, get_graph
+from institutions.tests.test_has_report import HasReportTestBase, TYPE_FACULTY, TYPE_EDUCATIONAL_PLATFORM, \
+    TYPE_ALLIANCE
+
+
+class RelationshipGraphTest(HasReportTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.university = self.make_institution('University')
+        self.faculty = self.make_institution('Faculty')
+        self.platform = self.make_institution('Platform')
+        self.alliance = self.make_institution('Alliance')
+        self.predecessor = self.make_institution('Predecessor')
+        self.absorbed = self.make_institution('Absorbed')
+        self.make_hierarchical(self.university, self.faculty, valid_from=datetime.date(2010, 1, 1))
+        self.make_hierarchical(self.university, self.platform, type_id=TYPE_EDUCATIONAL_PLATFORM)
+        self.make_hierarchical(self.alliance, self.university, type_id=TYPE_ALLIANCE)
+        self.make_succeeded(self.university, self.predecessor, datetime.date(2012, 1, 1))
+        self.make_absorbed(self.university, self.absorbed, datetime.date(2014, 1, 1))
+
+    def test_load(self):
+        with self.assertNumQueries(2):
+            relationships = RelationshipGraph.load()
+        children = relationships.children[self.university.id]
+        self.assertEqual([ edge.institution for edge in children ], [ self.faculty.id, self.platform.id ])
+        self.assertEqual(children[0].type_id, TYPE_FACULTY)
+        self.assertEqual(children[0].valid_from, datetime.date(2010, 1, 1))
+        self.assertEqual(children[0].type, self.faculty.relationship_child.get().relationship_type.type)
+        self.assertEqual(relationships.parents[self.faculty.id][0].institution, self.university.id)
+        self.assertEqual(relationships.sources[self.university.id][0].date, datetime.date(2012, 1, 1))
+
+    def test_report_contributors(self):
+        relationships = RelationshipGraph.load()
+        with self.assertNumQueries(0):
+            contributors = self.university.get_report_contributors(relationships)
+        self.assertEqual(contributors, [
+            (self.university.id, True, None, None),
+            (self.faculty.id, True, datetime.date(2010, 1, 1), None),
+            (self.alliance.id, True, None, None),
+            (self.predecessor.id, False, datetime.date(2012, 1, 1), None),
+            (self.absorbed.id, False, datetime.date(2014, 1, 1), None),
+        ])
+
+    def test_report_dependents(self):
+        relationships = RelationshipGraph.load()
+        self.assertEqual(self.faculty.get_report_dependents(relationships), { self.faculty.id, self.university.id })
+        self.assertEqual(self.platform.get_report_dependents(relationships), { self.platform.id })
+        self.assertEqual(self.alliance.get_report_dependents(relationships), { self.alliance.id, self.university.id })
+        self.assertEqual(self.predecessor.get_report_dependents(relationships),
+                         { self.predecessor.id, self.university.id })
+        self.assertEqual(self.absorbed.get_report_dependents(relationships), { self.absorbed.id, self.university.id })
+
+    def test_hierarchy_component(self):
+        relationships = RelationshipGraph.load()
+        self.assertEqual(relationships.hierarchy_component(self.faculty.id),
+                         { self.faculty.id, self.university.id, self.platform.id, self.alliance.id })
+        self.assertEqual(relationships.hierarchy_component(self.faculty.id, exclude_types=(TYPE_ALLIANCE,)),
+                         { self.faculty.id, self.university.id, self.platform.id })
+        # institutions already seen are not walked again
+        self.assertEqual(relationships.hierarchy_component(self.faculty.id, seen={ self.university.id }),
+                         { self.faculty.id, self.university.id })
+
+
+class RelationshipGraphCacheTest(HasReportTestBase):
+
+    def setUp(self):
+        super().setUp()
+        cache.delete(graph.CACHE_KEY)
+        self.addCleanup(cache.delete, graph.CACHE_KEY)
+        self.parent = self.make_institution('Parent')
+        self.child = self.make_institution('Child')
+
+    def test_cached(self):
+        get_graph()
+        with self.assertNumQueries(0):
+            get_graph()
+
+    def test_invalidated_by_signals(self):
+        self.assertNotIn(self.parent.id, get_graph().children)
+        relationship = self.make_hierarchical(self.parent, self.child)
+        self.assertEqual(get_graph().children[self.parent.id][0].institution, self.child.id)
+        relationship.delete()
+        self.assertNotIn(self.parent.id, get_graph().children)
+        self.make_succeeded(self.child, self.parent, datetime.date(2020, 1, 1))
+        self.assertEqual(get_graph().sources[self.child.id][0].institution, self.parent.id)
+
+    def test_not_cached_once_changed_in_transaction(self):
+        self.assertFalse(graph.changed_in_transaction())
+        self.make_hierarchical(self.parent, self.child)
+        self.assertTrue(graph.changed_in_transaction())
+        get_graph()
+        self.assertIsNone(cache.get(graph.CACHE_KEY))
+
+    def test_changed_in_rolled_back_savepoint(self):
+        try:
+            with transaction.atomic():
+                self.make_hierarchical(self.parent, self.child)
+                self.assertTrue(graph.changed_in_transaction())
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(graph.changed_in_transaction())
+
+    def test_cached_upon_report_change(self):
+        # m2m_changed is sent within a transaction, which has not changed any relationship
+        report = self.make_report()
+        get_graph()
+        with mock.patch.object(RelationshipGraph, 'load') as load:
+            report.institutions.add(self.child)
+            report.platforms.add(self.parent)
+            report.institutions.clear()
+        load.assert_not_called()
@@ -3,11 +3,14 @@ from io import StringIO
 from unittest.mock import patch, MagicMock
 
 import pysolr
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from countries.models import Country
 from institutions.indexers.institution_indexer import InstitutionIndexer
 from institutions.models import Institution
+from reports.models import Report
 
 class TestInstitutionIndexer(TestCase):
     fixtures = [
@@ -64,3 +67,78 @@ class TestInstitutionIndexer(TestCase):
         self.indexer._get_institution()
         mock_get.assert_called_once_with(pk=self.institution.id)
         self.assertEqual(self.indexer.institution, self.institution)
+
+
+class TestInstitutionIndexerReports(TestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'qf_ehea_level', 'eqar_decision_type', 'language',
+        'agency_activity_type', 'agency_focus', 'identifier_resource', 'flag', 'permission_type',
+        'agency_historical_field',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'institution_historical_field',
+        'institution_hierarchical_relationship_type',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+        'report_decision', 'report_status',
+        'users', 'report_demo_01'
+    ]
+
+    def expected_facets(self, institution):
+        facets = {
+            'reports_agencies': set(),
+            'status_facet': set(),
+            'activity_facet': set(),
+            'activity_type_facet': set(),
+            'crossborder_facet': set(),
+        }
+        for report in Report.objects.filter(institutions=institution):
+            facets['reports_agencies'].add(report.agency.acronym_primary)
+            facets['status_facet'].add(report.status.status)
+            facets['crossborder_facet'].update({ False, report.crossborder })
+            for activity in report.agency_esg_activities.all():
+                facets['activity_facet'].add(activity.activity_display)
+                facets['activity_type_facet'].add(activity.activity_type.type)
+        return facets
+
+    def test_report_facets(self):
+        institution_ids = list(Institution.objects.values_list('id', flat=True))
+        with self.assertNumQueries(2):
+            facets = InstitutionIndexer.get_report_facets(institution_ids)
+        self.assertTrue(facets)
+        for institution in Institution.objects.all():
+            expected = self.expected_facets(institution)
+            actual = { key: set(values) for key, values in facets.get(institution.id, {}).items() }
+            self.assertEqual(actual, { key: values for key, values in expected.items() if values })
+
+    @patch('institutions.indexers.institution_indexer.pysolr.Solr.commit')
+    @patch('institutions.indexers.institution_indexer.pysolr.Solr.add')
+    def test_index_many(self, mock_solr_add, mock_solr_commit):
+        institution_ids = list(Institution.objects.order_by('id').values_list('id', flat=True))
+        with patch('sys.stdout', new=StringIO()):
+            InstitutionIndexer.index_many(institution_ids, chunk_size=2)
+        self.assertEqual(mock_solr_add.call_count, (len(institution_ids) + 1) // 2)
+        mock_solr_commit.assert_called_once()
+        docs = { doc['id']: doc for call in mock_solr_add.call_args_list for doc in call.args[0] }
+        self.assertEqual(sorted(docs), institution_ids)
+
+        # documents are the same as when indexing one by one
+        for institution_id in institution_ids:
+            indexer = InstitutionIndexer(institution_id)
+            with patch('sys.stdout', new=StringIO()):
+                indexer.index()
+            self.assertEqual(
+                { key: sorted(value) if isinstance(value, list) else value for key, value in indexer.doc.items() },
+                { key: sorted(value) if isinstance(value, list) else value for key, value in docs[institution_id].items() }
+            )
+
+    @patch('institutions.indexers.institution_indexer.pysolr.Solr.commit')
+    @patch('institutions.indexers.institution_indexer.pysolr.Solr.add')
+    def test_index_many_queries(self, mock_solr_add, mock_solr_commit):
+        institution_ids = list(Institution.objects.values_list('id', flat=True))
+        # two aggregate queries, the relationship graph, the institutions and related institutions, and at most
+        # one query per prefetched relation
+        max_queries = 2 + 2 + 1 + 1 + sum(len(lookup.split('__'))
+                                          for lookup in InstitutionIndexer.PREFETCH + InstitutionIndexer.RELATED_PREFETCH)
+        with patch('sys.stdout', new=StringIO()):
+            with CaptureQueriesContext(connection) as queries:
+                InstitutionIndexer.index_many(institution_ids)
+        self.assertLessEqual(len(queries), max_queries)
@@ -0,0 +1,74 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from institutions.models import Institution, InstitutionHierarchicalRelationship
+from institutions.names import recompute_names
+from outbox.models import OutboxEvent
+
+
+class RecomputeNamesTest(TestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'flag', 'permission_type',
+        'qf_ehea_level', 'institution_historical_field',
+        'agency_activity_type', 'agency_focus', 'identifier_resource',
+        'agency_historical_field',
+        'eqar_decision_type',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'submitting_agency_demo',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03', 'institution_demo_closed',
+        'institution_relationship_type', 'institution_hierarchical_relationship_type'
+    ]
+
+    def setUp(self):
+        # institution 3 is a faculty of institution 1; clear computed names, bypassing signals
+        InstitutionHierarchicalRelationship.objects.bulk_create([
+            InstitutionHierarchicalRelationship(institution_parent_id=1, institution_child_id=3, relationship_type_id=2)
+        ])
+        Institution.objects.update(name_primary='', name_sort='')
+        OutboxEvent.objects.all().delete()
+
+    def expected(self):
+        expected = {}
+        for institution in Institution.objects.all():
+            institution.set_primary_name()
+            expected[institution.id] = institution.name_primary
+        return expected
+
+    def test_recompute_names(self):
+        # relationships, institutions, names, one UPDATE and the outbox INSERT
+        with self.assertNumQueries(5):
+            changed = recompute_names()
+        self.assertEqual(sorted(changed), sorted(Institution.objects.values_list('id', flat=True)))
+        names = dict(Institution.objects.values_list('id', 'name_primary'))
+        self.assertEqual(names[3], 'Hessische Hochschule für Polizei und Verwaltung')
+        self.assertEqual(names[4], 'Sibelius Academy')
+        self.assertEqual(Institution.objects.get(id=3).name_sort, f'{names[1]} / {names[3]}')
+        self.assertEqual(Institution.objects.get(id=2).name_sort, names[2])
+        self.assertEqual(names, self.expected())
+        # changed institutions are reindexed once
+        self.assertEqual(sorted(OutboxEvent.objects.values_list('object_id', flat=True)), sorted(changed))
+
+        # nothing left to change
+        self.assertEqual(recompute_names(), [])
+
+    def test_recompute_names_parent(self):
+        recompute_names()
+        Institution.objects.filter(id=3).update(name_sort='')
+        # recomputing a parent includes its faculties
+        self.assertEqual(recompute_names([1]), [3])
+
+    def test_set_primary_name_faculty(self):
+        recompute_names()
+        parent = Institution.objects.get(id=1)
+        parent.institutionname_set.update(name_english='Renamed University')
+        parent.set_primary_name()
+        self.assertEqual(parent.name_primary, 'Renamed University')
+        self.assertEqual(Institution.objects.get(id=3).name_sort,
+                         'Renamed University / Hessische Hochschule für Polizei und Verwaltung')
+
+    def test_command(self):
+        out = StringIO()
+        call_command('set_institutions_name_sort', stdout=out)
+        self.assertEqual(out.getvalue(), f'{Institution.objects.count()} institution(s) updated.\n')
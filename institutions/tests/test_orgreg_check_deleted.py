@@ -0,0 +1,80 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from institutions.models import Institution, InstitutionName, InstitutionCountry, \
+    InstitutionHierarchicalRelationship, InstitutionHistoricalRelationship, parse_orgreg_source_id
+
+
+class OrgRegCheckDeletedTest(TestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'flag', 'permission_type',
+        'qf_ehea_level', 'institution_historical_field',
+        'agency_activity_type', 'agency_focus', 'identifier_resource',
+        'agency_historical_field', 'eqar_decision_type',
+        'agency_demo_01', 'agency_demo_02', 'association', 'submitting_agency_demo',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+        'institution_relationship_type', 'institution_hierarchical_relationship_type'
+    ]
+
+    def setUp(self):
+        Institution.objects.filter(id=2).update(eter_id='DE0002')
+        InstitutionName.objects.filter(id=1).update(name_source_note='')
+        self.name = InstitutionName.objects.get(id=1)
+        self.name.name_source_note = 'OrgReg-2024-CHARDE0001-1 renamed'
+        self.name.save()
+        self.location = InstitutionCountry.objects.get(id=1)
+        self.location.country_source_note = ' OrgReg-2023-locatde0001-1'
+        self.location.save()
+        self.link = InstitutionHierarchicalRelationship.objects.create(
+            institution_parent_id=1, institution_child_id=3, relationship_type_id=2,
+            relationship_note='OrgReg-2024-LINKDE0003-1'
+        )
+        self.event = InstitutionHistoricalRelationship.objects.create(
+            institution_source_id=1, institution_target_id=2, relationship_type_id=2,
+            relationship_note='OrgReg-2024-DEMODE0002 merger', relationship_date=datetime.date(2020, 1, 1)
+        )
+
+    def run_command(self, items):
+        response = mock.Mock()
+        response.json.return_value = items
+        out = StringIO()
+        with mock.patch('institutions.management.commands.orgreg_check_deleted.requests.get',
+                        return_value=response):
+            call_command('orgreg_check_deleted', stdout=out)
+        return out.getvalue().splitlines()
+
+    def test_parse_orgreg_source_id(self):
+        self.assertEqual(parse_orgreg_source_id('OrgReg-2024-CHARDE0001-1 renamed'), 'CHARDE0001-1')
+        self.assertEqual(parse_orgreg_source_id(' orgreg-2024-linkde0001'), 'LINKDE0001')
+        self.assertIsNone(parse_orgreg_source_id('imported from OrgReg-2024-CHARDE0001-1'))
+        self.assertIsNone(parse_orgreg_source_id(None))
+        self.assertEqual(self.name.orgreg_source_id, 'CHARDE0001-1')
+        self.assertEqual(self.location.orgreg_source_id, 'LOCATDE0001-1')
+        self.assertEqual(self.link.orgreg_source_id, 'LINKDE0003-1')
+        self.assertEqual(self.event.orgreg_source_id, 'DEMODE0002')
+
+    def test_check_deleted(self):
+        items = [
+            { 'collection': 'entities', 'deleted': True, 'BAS.ENTITYID.v': 'DE0002' },
+            { 'collection': 'characteristics', 'deleted': True, 'CHAR.CHARID.v': 'CHARDE0001-1' },
+            { 'collection': 'characteristics', 'deleted': True, 'CHAR.CHARID.v': 'CHARDE0001' },
+            { 'collection': 'locations', 'deleted': True, 'LOCAT.LOCATID.v': 'LOCATDE0001-1' },
+            { 'collection': 'linkages', 'deleted': False, 'LINK.ID.v': 'LINKDE0003-1' },
+            { 'collection': 'demographics', 'deleted': True, 'DEMO.EVENTID.v': 'DEMODE0002' },
+            { 'collection': 'unknown', 'deleted': True },
+        ]
+        # one query per collection, regardless of the number of deleted IDs
+        with self.assertNumQueries(4):
+            lines = self.run_command(items)
+        self.assertIn('No corresponding DEQAR model for collection: "unknown"', lines)
+        self.assertIn(f'Entity DE0002 was deleted, but still exists as {Institution.objects.get(id=2).deqar_id} '
+                      f'{Institution.objects.get(id=2).name_primary}', lines)
+        name_primary = Institution.objects.get(id=1).name_primary
+        self.assertIn(f'Name CHARDE0001-1 was deleted, but still exists for {name_primary}', lines)
+        self.assertIn(f'Location LOCATDE0001-1 was deleted, but still exists for {name_primary}', lines)
+        self.assertTrue(any(line.startswith('Demographic event DEMODE0002 was deleted') for line in lines))
+        self.assertFalse(any('CHARDE0001 ' in line or 'LINKDE0003-1' in line for line in lines))
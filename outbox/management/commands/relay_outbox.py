@@ -0,0 +1,59 @@
+import logging
+import time
+
+from django.core.management import BaseCommand
+
+from outbox.relay import relay, relay_batch, retry_failed, get_stats
+
+logger = logging.getLogger(__name__)
+
+# longest wait, in seconds, after repeated failures
+MAX_BACKOFF = 300
+
+
+class Command(BaseCommand):
+    help = 'Pass changes recorded in the outbox on to the Solr and Meilisearch indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Relay pending events and exit, instead of running continuously.')
+        parser.add_argument('--interval', '-i', type=float, default=2,
+                            help='Seconds to wait when the outbox is empty (default: 2).')
+        parser.add_argument('--batch-size', '-b', type=int, default=None,
+                            help='Number of events passed on at once.')
+        parser.add_argument('--stats', '-s', action='store_true',
+                            help='Only print the number of pending events and the lag.')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Retry failed events right away, including those no longer retried, and exit.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            stats = get_stats()
+            self.stdout.write(f"pending={stats['pending']} failed={stats['failed']} oldest={stats['oldest']} "
+                              f"lag={stats['lag']:.1f}s")
+        elif options['retry_failed']:
+            self.stdout.write(f"reset={retry_failed()}")
+        elif options['once']:
+            result = relay(batch_size=options['batch_size'])
+            self.stdout.write(f"relayed={result['events']} failed={result['failed']} lag={result['lag']:.1f}s")
+        else:
+            self.run(options['interval'], options['batch_size'], options['verbosity'])
+
+    def run(self, interval, batch_size, verbosity):
+        # wait longer after each consecutive failure, e.g. while the indexes are unavailable
+        backoff = interval
+        while True:
+            try:
+                result = relay_batch(batch_size=batch_size)
+            except Exception:
+                logger.exception('relaying outbox events failed')
+                result = None
+            if result and result['events'] and verbosity > 1:
+                self.stdout.write(f"relayed={result['events']} failed={result['failed']} lag={result['lag']:.1f}s")
+            if result is None or (result['events'] and result['failed'] == result['events']):
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+            else:
+                backoff = interval
+                if not result['events']:
+                    time.sleep(interval)
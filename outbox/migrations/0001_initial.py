@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:15
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('report', 'Report'), ('institution', 'Institution'), ('programme', 'Programme'), ('agency', 'Agency')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('op', models.CharField(choices=[('upsert', 'Index'), ('delete', 'Delete')], default='upsert', max_length=10)),
+                ('ts', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Search Index Outbox Event',
+                'db_table': 'deqar_search_outbox',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import models
+from django.utils import timezone
+
+_local = threading.local()
+
+
+class OutboxEvent(models.Model):
+    """
+    Change to a record that is kept in the search indexes. Events are written in the same transaction as the
+    change itself and removed by the relay once they were passed on to Solr and Meilisearch.
+    """
+    ENTITY_REPORT = 'report'
+    ENTITY_INSTITUTION = 'institution'
+    ENTITY_PROGRAMME = 'programme'
+    ENTITY_AGENCY = 'agency'
+    ENTITY_CHOICES = (
+        (ENTITY_REPORT, 'Report'),
+        (ENTITY_INSTITUTION, 'Institution'),
+        (ENTITY_PROGRAMME, 'Programme'),
+        (ENTITY_AGENCY, 'Agency'),
+    )
+
+    OP_UPSERT = 'upsert'
+    OP_DELETE = 'delete'
+    OP_CHOICES = (
+        (OP_UPSERT, 'Index'),
+        (OP_DELETE, 'Delete'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.IntegerField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES, default=OP_UPSERT)
+    ts = models.DateTimeField(default=timezone.now)
+    # failed attempts to pass on the event; it is retried from retry_after on, until it has failed MAX_ATTEMPTS times
+    attempts = models.PositiveSmallIntegerField(default=0)
+    retry_after = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    @classmethod
+    def record(cls, entity, object_ids, op=OP_UPSERT):
+        """
+        Record a change to one or several records of an entity (unless recording is suppressed)
+        """
+        if cls.is_suppressed():
+            return
+        if isinstance(object_ids, int):
+            object_ids = [object_ids]
+        ts = timezone.now()
+        cls.objects.bulk_create([
+            cls(entity=entity, object_id=object_id, op=op, ts=ts) for object_id in set(object_ids) if object_id
+        ])
+
+    @staticmethod
+    @contextmanager
+    def suppressed():
+        """
+        Do not record events in this thread, e.g. from the signals fired for each record of a bulk deletion, when
+        the caller records the changes for all records at once
+        """
+        previous = OutboxEvent.is_suppressed()
+        _local.suppressed = True
+        try:
+            yield
+        finally:
+            _local.suppressed = previous
+
+    @staticmethod
+    def is_suppressed():
+        return getattr(_local, 'suppressed', False)
+
+    def __str__(self):
+        return f'{self.op} {self.entity} {self.object_id}'
+
+    class Meta:
+        db_table = 'deqar_search_outbox'
+        verbose_name = 'Search Index Outbox Event'
+        ordering = ('id',)
@@ -0,0 +1,231 @@
+import datetime
+import logging
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from agencies.indexers.agency_indexer import AgencyIndexer
+from agencies.models import Agency
+from institutions.indexers.institution_indexer import InstitutionIndexer
+from institutions.indexers.institution_meili_indexer import InstitutionIndexer as MeiliInstitutionIndexer
+from institutions.models import Institution
+from outbox.models import OutboxEvent
+from programmes.indexers.programme_indexer import ProgrammeIndexer
+from programmes.models import Programme
+from reports.indexers.report_meili_indexer import ReportIndexer as MeiliReportIndexer
+from reports.indexers.reports_indexer import ReportsIndexer
+from reports.models import Report
+
+logger = logging.getLogger(__name__)
+
+# number of outbox events passed on at once
+BATCH_SIZE = 500
+
+# PostgreSQL advisory lock held by the relay passing on a batch
+RELAY_LOCK_ID = 0x6f7574626f78
+
+# events that failed this often are no longer retried (until reset with `relay_outbox --retry-failed`)
+MAX_ATTEMPTS = 10
+# seconds to wait before retrying a failed event, doubled with each attempt (i.e. about 17 hours in total)
+RETRY_DELAY = 60
+
+MODELS = {
+    OutboxEvent.ENTITY_REPORT: Report,
+    OutboxEvent.ENTITY_INSTITUTION: Institution,
+    OutboxEvent.ENTITY_PROGRAMME: Programme,
+    OutboxEvent.ENTITY_AGENCY: Agency,
+}
+
+
+def collapse(events):
+    """
+    Reduce ordered events to the sets of records to index and to delete, per entity; the latest event for a record
+    wins. Records to index that no longer exist are deleted instead.
+    """
+    latest = {}
+    for event in events:
+        latest[(event.entity, event.object_id)] = event.op
+    changes = defaultdict(lambda: { OutboxEvent.OP_UPSERT: set(), OutboxEvent.OP_DELETE: set() })
+    for (entity, object_id), op in latest.items():
+        changes[entity][op].add(object_id)
+
+    # reports are part of the programme and institution documents
+    report_ids = changes[OutboxEvent.ENTITY_REPORT][OutboxEvent.OP_UPSERT]
+    if report_ids:
+        changes[OutboxEvent.ENTITY_PROGRAMME][OutboxEvent.OP_UPSERT] |= \
+            set(Programme.objects.filter(report_id__in=report_ids).values_list('id', flat=True))
+        changes[OutboxEvent.ENTITY_INSTITUTION][OutboxEvent.OP_UPSERT] |= \
+            set(Report.institutions.through.objects.filter(report_id__in=report_ids)
+                                           .values_list('institution_id', flat=True))
+
+    for entity, model in MODELS.items():
+        upsert = changes[entity][OutboxEvent.OP_UPSERT] - changes[entity][OutboxEvent.OP_DELETE]
+        existing = set(model.objects.filter(id__in=upsert).values_list('id', flat=True)) if upsert else set()
+        changes[entity][OutboxEvent.OP_UPSERT] = existing
+        changes[entity][OutboxEvent.OP_DELETE] |= upsert - existing
+    return changes
+
+
+def apply_reports(upsert, delete):
+    if upsert:
+        ReportsIndexer.index_many(sorted(upsert), fail_silently=False)
+        MeiliReportIndexer().index_many(upsert)
+    if delete:
+        ReportsIndexer.delete_many(delete)
+        MeiliReportIndexer().delete_many(delete)
+
+
+def apply_institutions(upsert, delete):
+    if upsert:
+        InstitutionIndexer.index_many(sorted(upsert), fail_silently=False)
+        MeiliInstitutionIndexer().index_many(upsert)
+    if delete:
+        InstitutionIndexer.delete_many(delete)
+        MeiliInstitutionIndexer().delete_many(delete)
+
+
+def apply_programmes(upsert, delete):
+    if upsert:
+        ProgrammeIndexer().index_many(upsert)
+    if delete:
+        ProgrammeIndexer().delete_many(delete)
+
+
+def apply_agencies(upsert, delete):
+    for agency in Agency.objects.filter(id__in=upsert):
+        AgencyIndexer(agency).index(fail_silently=False)
+    if delete:
+        AgencyIndexer.delete_many(delete)
+
+
+SINKS = {
+    OutboxEvent.ENTITY_REPORT: apply_reports,
+    OutboxEvent.ENTITY_INSTITUTION: apply_institutions,
+    OutboxEvent.ENTITY_PROGRAMME: apply_programmes,
+    OutboxEvent.ENTITY_AGENCY: apply_agencies,
+}
+
+
+def apply(events):
+    changes = collapse(events)
+    for entity, sink in SINKS.items():
+        sink(changes[entity][OutboxEvent.OP_UPSERT], changes[entity][OutboxEvent.OP_DELETE])
+
+
+def apply_separately(events):
+    """
+    Pass on the events record by record, so that one record that cannot be indexed does not hold up the others.
+    Events of records that failed are scheduled for a later retry; returns the failed events.
+    """
+    records = defaultdict(list)
+    for event in events:
+        records[(event.entity, event.object_id)].append(event)
+    failed = []
+    for (entity, object_id), record_events in records.items():
+        try:
+            with transaction.atomic():
+                apply(record_events)
+        except Exception as exc:
+            logger.warning(f'failed to relay {entity} {object_id}: {exc!r}')
+            now = timezone.now()
+            for event in record_events:
+                event.attempts += 1
+                event.retry_after = now + datetime.timedelta(seconds=RETRY_DELAY * 2 ** (event.attempts - 1))
+                event.last_error = repr(exc)
+            OutboxEvent.objects.bulk_update(record_events, ('attempts', 'retry_after', 'last_error'))
+            failed.extend(record_events)
+    return failed
+
+
+def pending_events():
+    """
+    Events to pass on now: not waiting for a retry, and not failed too often
+    """
+    return OutboxEvent.objects.filter(attempts__lt=MAX_ATTEMPTS) \
+                              .filter(Q(retry_after__isnull=True) | Q(retry_after__lte=timezone.now()))
+
+
+def acquire_relay_lock():
+    """
+    Take the relay lock until the end of the current transaction; returns False if another relay holds it
+    """
+    if connection.vendor != 'postgresql':
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_xact_lock(%s)', [RELAY_LOCK_ID])
+        return cursor.fetchone()[0]
+
+
+def relay_batch(batch_size=None):
+    """
+    Pass the oldest batch of outbox events on to the Solr and Meilisearch indexers.
+
+    Only one relay passes on events at a time, so that an older document never overwrites a newer one; several
+    relays (e.g. the relay process and the scheduled task) can run side by side, but all but one will find nothing
+    to do. Events are deleted once the indexers succeeded. If the batch fails, its events are passed on record by
+    record; events of records that still fail are kept and retried later, with increasing delays, until they failed
+    MAX_ATTEMPTS times. Records may therefore be indexed more than once, but no change is lost.
+
+    Returns a dict with the number of events processed, how many of them failed, and the lag of the oldest one,
+    in seconds.
+    """
+    with transaction.atomic():
+        if not acquire_relay_lock():
+            return dict(events=0, failed=0, lag=0)
+        events = list(pending_events().select_for_update().order_by('id')[:batch_size or BATCH_SIZE])
+        if not events:
+            return dict(events=0, failed=0, lag=0)
+        lag = (timezone.now() - events[0].ts).total_seconds()
+        try:
+            with transaction.atomic():
+                apply(events)
+            failed = []
+        except Exception as exc:
+            logger.warning(f'failed to relay a batch of {len(events)} outbox events, retrying one by one: {exc!r}')
+            failed = apply_separately(events)
+        failed_ids = { event.id for event in failed }
+        OutboxEvent.objects.filter(id__in=[ event.id for event in events if event.id not in failed_ids ]).delete()
+    logger.info(f'relayed {len(events)} outbox events ({len(failed)} failed), lag {lag:.1f}s')
+    return dict(events=len(events), failed=len(failed), lag=lag)
+
+
+def relay(batch_size=None, max_batches=None):
+    """
+    Relay outbox events in batches until the outbox is empty (or max_batches were processed). Stops early when a
+    whole batch failed, as the indexes are probably unavailable.
+    Returns the total number of events, how many of them failed, and the maximum lag observed.
+    """
+    total = dict(events=0, failed=0, lag=0)
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        result = relay_batch(batch_size)
+        if not result['events']:
+            break
+        batches += 1
+        total['events'] += result['events']
+        total['failed'] += result['failed']
+        total['lag'] = max(total['lag'], result['lag'])
+        if result['failed'] == result['events']:
+            break
+    return total
+
+
+def retry_failed():
+    """
+    Retry all failed events at once, also those that are no longer retried; returns their number
+    """
+    return OutboxEvent.objects.filter(attempts__gt=0).update(attempts=0, retry_after=None)
+
+
+def get_stats():
+    """
+    Lag metrics: number of pending events, timestamp of the oldest one and its age in seconds, and the number of
+    events that failed and are no longer retried
+    """
+    stats = OutboxEvent.objects.aggregate(oldest=Min('ts'))
+    stats['pending'] = OutboxEvent.objects.count()
+    stats['failed'] = OutboxEvent.objects.filter(attempts__gte=MAX_ATTEMPTS).count()
+    stats['lag'] = (timezone.now() - stats['oldest']).total_seconds() if stats['oldest'] else 0
+    return stats
@@ -0,0 +1,8 @@
+from celery.task import task
+
+from outbox.relay import relay
+
+
+@task(name="relay_outbox")
+def relay_outbox():
+    return relay()
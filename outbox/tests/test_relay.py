@@ -0,0 +1,183 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TestCase
+
+from institutions.models import Institution
+from outbox import relay
+from outbox.models import OutboxEvent
+from programmes.models import Programme
+from reports.models import Report
+
+
+class OutboxRelayTest(TestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'qf_ehea_level', 'eqar_decision_type', 'language',
+        'agency_activity_type', 'agency_focus', 'identifier_resource', 'flag', 'permission_type',
+        'agency_historical_field',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'institution_historical_field',
+        'institution_hierarchical_relationship_type',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+        'report_decision', 'report_status',
+        'users', 'report_demo_01'
+    ]
+
+    def setUp(self):
+        OutboxEvent.objects.all().delete()
+        self.sinks = { entity: mock.Mock() for entity in relay.SINKS }
+        patcher = mock.patch.dict(relay.SINKS, self.sinks)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # failures are logged as warnings
+        patcher = mock.patch.object(relay, 'logger')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sink_args(self, entity):
+        upsert, delete = self.sinks[entity].call_args.args
+        return upsert, delete
+
+    def test_record_in_transaction(self):
+        report = Report.objects.get(id=1)
+        report.save()
+        self.assertTrue(OutboxEvent.objects.filter(entity=OutboxEvent.ENTITY_REPORT, object_id=1,
+                                                   op=OutboxEvent.OP_UPSERT).exists())
+        # events are rolled back together with the change
+        OutboxEvent.objects.all().delete()
+        try:
+            with transaction.atomic():
+                Institution.objects.get(id=1).save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_relay_report(self):
+        report = Report.objects.get(id=1)
+        report.save()
+        result = relay.relay_batch()
+        self.assertEqual(result['events'], 1)
+        self.assertFalse(OutboxEvent.objects.exists())
+        upsert, delete = self.sink_args(OutboxEvent.ENTITY_REPORT)
+        self.assertEqual(upsert, { 1 })
+        # institutions and programmes of the report are reindexed along with it
+        upsert, delete = self.sink_args(OutboxEvent.ENTITY_INSTITUTION)
+        self.assertEqual(upsert, set(report.institutions.values_list('id', flat=True)))
+        upsert, delete = self.sink_args(OutboxEvent.ENTITY_PROGRAMME)
+        self.assertEqual(upsert, set(Programme.objects.filter(report=report).values_list('id', flat=True)))
+
+    def test_relay_delete(self):
+        report = Report.objects.get(id=1)
+        institution_ids = set(report.institutions.values_list('id', flat=True))
+        report.save()
+        report.delete()
+        # upsert of a record that no longer exists is turned into a delete
+        OutboxEvent.record(OutboxEvent.ENTITY_REPORT, 9999)
+        relay.relay_batch()
+        upsert, delete = self.sink_args(OutboxEvent.ENTITY_REPORT)
+        self.assertEqual(upsert, set())
+        self.assertEqual(delete, { 1, 9999 })
+        upsert, delete = self.sink_args(OutboxEvent.ENTITY_INSTITUTION)
+        self.assertEqual(upsert, institution_ids)
+
+    def test_relay_failure(self):
+        OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, [1, 2])
+        self.sinks[OutboxEvent.ENTITY_INSTITUTION].side_effect = RuntimeError('Solr unavailable')
+        result = relay.relay_batch()
+        self.assertEqual((result['events'], result['failed']), (2, 2))
+        # events are kept and retried later
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+        event = OutboxEvent.objects.first()
+        self.assertEqual(event.attempts, 1)
+        self.assertIn('Solr unavailable', event.last_error)
+        self.assertEqual(relay.relay_batch()['events'], 0)
+        OutboxEvent.objects.update(retry_after=None)
+        self.sinks[OutboxEvent.ENTITY_INSTITUTION].side_effect = None
+        self.assertEqual(relay.relay()['events'], 2)
+        self.assertEqual(self.sink_args(OutboxEvent.ENTITY_INSTITUTION), ({ 1, 2 }, set()))
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_relay_failure_isolated(self):
+        OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, [1, 2])
+
+        def fail_on_2(upsert, delete):
+            if 2 in upsert:
+                raise ValueError('invalid document')
+        self.sinks[OutboxEvent.ENTITY_INSTITUTION].side_effect = fail_on_2
+        result = relay.relay_batch()
+        self.assertEqual((result['events'], result['failed']), (2, 1))
+        self.assertEqual(list(OutboxEvent.objects.values_list('object_id', flat=True)), [2])
+        # the failed record no longer holds up newer events
+        OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, 3)
+        self.assertEqual(relay.relay(), dict(events=1, failed=0, lag=mock.ANY))
+        self.assertEqual(self.sink_args(OutboxEvent.ENTITY_INSTITUTION), ({ 3 }, set()))
+
+    def test_relay_failed_too_often(self):
+        OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, 1)
+        self.sinks[OutboxEvent.ENTITY_INSTITUTION].side_effect = ValueError('invalid document')
+        for _ in range(relay.MAX_ATTEMPTS):
+            OutboxEvent.objects.update(retry_after=None)
+            self.assertEqual(relay.relay_batch()['failed'], 1)
+        OutboxEvent.objects.update(retry_after=None)
+        self.assertEqual(relay.relay_batch()['events'], 0)
+        self.assertEqual(relay.get_stats()['failed'], 1)
+        self.sinks[OutboxEvent.ENTITY_INSTITUTION].side_effect = None
+        with mock.patch('sys.stdout'):
+            call_command('relay_outbox', '--retry-failed')
+        self.assertEqual(relay.relay_batch(), dict(events=1, failed=0, lag=mock.ANY))
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_command_backoff(self):
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 4:
+                raise KeyboardInterrupt
+        with mock.patch('outbox.management.commands.relay_outbox.relay_batch',
+                        side_effect=[RuntimeError, RuntimeError, RuntimeError, dict(events=0, failed=0, lag=0)]), \
+                mock.patch('time.sleep', sleep), mock.patch('outbox.management.commands.relay_outbox.logger'):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('relay_outbox', '--interval', '1')
+        # the relay keeps running, waiting longer after each failure
+        self.assertEqual(sleeps, [1, 2, 4, 1])
+
+    def test_relay_batches(self):
+        OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, [1, 2, 3])
+        result = relay.relay(batch_size=2)
+        self.assertEqual(result['events'], 3)
+        self.assertEqual(self.sinks[OutboxEvent.ENTITY_INSTITUTION].call_count, 2)
+
+    def test_relay_serialized(self):
+        OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, [1, 2])
+        # another relay (in another database session) is passing on a batch
+        other = connections.create_connection('default')
+        try:
+            with other.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_lock(%s)', [relay.RELAY_LOCK_ID])
+            self.assertEqual(relay.relay_batch()['events'], 0)
+            self.assertEqual(OutboxEvent.objects.count(), 2)
+            with other.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [relay.RELAY_LOCK_ID])
+        finally:
+            other.close()
+        self.assertEqual(relay.relay_batch()['events'], 2)
+
+    def test_stats(self):
+        self.assertEqual(relay.get_stats()['pending'], 0)
+        OutboxEvent.record(OutboxEvent.ENTITY_AGENCY, 5)
+        stats = relay.get_stats()
+        self.assertEqual(stats['pending'], 1)
+        self.assertIsNotNone(stats['oldest'])
+        self.assertGreaterEqual(stats['lag'], 0)
+
+    def test_command(self):
+        OutboxEvent.record(OutboxEvent.ENTITY_AGENCY, 5)
+        with mock.patch('sys.stdout'):
+            call_command('relay_outbox', '--stats')
+            call_command('relay_outbox', '--once')
+        self.assertFalse(OutboxEvent.objects.exists())
+        upsert, delete = self.sink_args(OutboxEvent.ENTITY_AGENCY)
+        self.assertEqual(upsert, { 5 })
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ProgrammesConfig(AppConfig):
     name = 'programmes'
+
+    def ready(self):
+        super(ProgrammesConfig, self).ready()
+        from programmes.signals import do_index_programme
+        from programmes.signals import do_delete_programme
@@ -1,9 +1,5 @@
-from django.db.models import Q
-
 from rest_framework import serializers
 
-from datedelta import datedelta
-
 from eqar_backend.serializer_fields.date_unix_timestamp import UnixTimestampDateField
 
 from programmes.models import Programme
@@ -22,34 +18,17 @@ class ReportSerializer(serializers.ModelSerializer):
     agency = AgencySerializer()
     contributing_agencies = AgencySerializer(read_only=True, many=True)
     agency_esg_activities = EsgActivitySerializer(read_only=True, many=True)
-    crossborder = serializers.SerializerMethodField()
     flag = serializers.StringRelatedField()
     status = serializers.StringRelatedField()
     decision = serializers.StringRelatedField()
     valid_from = UnixTimestampDateField()
     valid_to = UnixTimestampDateField()
-    valid_to_calculated = serializers.SerializerMethodField()
+    valid_to_calculated = UnixTimestampDateField()
     created_at = UnixTimestampDateField()
     updated_at = UnixTimestampDateField()
     report_files = ReportFileSerializer(source='reportfile_set', read_only=True, many=True)
     report_links = ReportLinkSerializer(source='reportlink_set', read_only=True, many=True)
 
-    def get_crossborder(self, obj):
-        crossborder = False
-        focus_countries = obj.agency.agencyfocuscountry_set
-        for inst in obj.institutions.all():
-            for ic in inst.institutioncountry_set.filter(country_verified=True):
-                if not focus_countries.filter(Q(country__id=ic.country.id) & Q(country_is_crossborder=False)):
-                    crossborder = True
-        return crossborder
-
-    def get_valid_to_calculated(self, obj):
-        field = UnixTimestampDateField()
-        if obj.valid_to:
-            return field.to_representation(obj.valid_to)
-        else:
-            return field.to_representation(obj.valid_from + datedelta(years=6))
-
     class Meta:
         model = Report
         ref_name = 'Report (Meili Programmes)'
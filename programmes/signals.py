@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from outbox.models import OutboxEvent
+from programmes.models import Programme
+
+
+@receiver([post_save], sender=Programme)
+def do_index_programme(sender, instance, **kwargs):
+    OutboxEvent.record(OutboxEvent.ENTITY_PROGRAMME, instance.id)
+
+
+@receiver([post_delete], sender=Programme)
+def do_delete_programme(sender, instance, **kwargs):
+    OutboxEvent.record(OutboxEvent.ENTITY_PROGRAMME, instance.id, op=OutboxEvent.OP_DELETE)
@@ -0,0 +1,96 @@
+from urllib.parse import urljoin
+
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from institutions.graph import get_graph
+from institutions.models import Institution
+from outbox.models import OutboxEvent
+from programmes.models import Programme
+from reports.models import Report
+from webapi.v2.serializers.report_detail_serializers import ReportDetailSerializer
+
+# reports deleted in one transaction
+CHUNK_SIZE = 100
+
+
+class FakeRequest:
+    """
+    This class allows the serializer to create URIs correctly.
+    """
+
+    GET = {}
+    query_params = {}
+
+    def __init__(self, root):
+        self.root = root
+
+    def build_absolute_uri(self, rel_uri):
+        return urljoin(self.root, rel_uri)
+
+
+def backup_reports(reports, stream, root='/'):
+    """
+    Write reports to a binary stream (e.g. a gzip file) as newline-delimited JSON, one report per line, with
+    links prefixed by the root URL
+    """
+    renderer = JSONRenderer()
+    context = {'request': FakeRequest(root)}
+    for report in reports:
+        stream.write(renderer.render(ReportDetailSerializer(report, context=context).data))
+        stream.write(b'\n')
+
+
+def delete_reports(report_ids, backup=None, root='/', chunk_size=None, dry_run=False):
+    """
+    Delete reports in chunks, each in one transaction, after writing them to the backup stream (if given).
+
+    The per-record signals are not used to update the search indexes: for each chunk, the deletion of the reports
+    and their programmes and the reindexing of their institutions are recorded in the search index outbox at once,
+    so that the relay removes them with one bulk request. has_report is recomputed once at the end, for all
+    institutions that depended on the deleted reports.
+
+    Returns the IDs of the reports deleted (or, on a dry run, backed up only).
+    """
+    report_ids = list(dict.fromkeys(report_ids))
+    chunk_size = chunk_size or CHUNK_SIZE
+    deleted = []
+    affected_ids = set()
+    for start in range(0, len(report_ids), chunk_size):
+        with transaction.atomic():
+            reports = list(Report.objects.filter(id__in=report_ids[start:start + chunk_size])
+                                         .select_related('agency', 'status', 'decision', 'flag')
+                                         .order_by('id'))
+            if not reports:
+                continue
+            ids = [ report.id for report in reports ]
+            if backup:
+                backup_reports(reports, backup, root)
+                backup.flush()
+            if not dry_run:
+                institution_ids = set(Report.institutions.through.objects.filter(report_id__in=ids)
+                                                                   .values_list('institution_id', flat=True))
+                platform_ids = set(Report.platforms.through.objects.filter(report_id__in=ids)
+                                                               .values_list('institution_id', flat=True))
+                programme_ids = list(Programme.objects.filter(report_id__in=ids).values_list('id', flat=True))
+                with OutboxEvent.suppressed():
+                    Report.objects.filter(id__in=ids).delete()
+                OutboxEvent.record(OutboxEvent.ENTITY_REPORT, ids, op=OutboxEvent.OP_DELETE)
+                OutboxEvent.record(OutboxEvent.ENTITY_PROGRAMME, programme_ids, op=OutboxEvent.OP_DELETE)
+                OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, institution_ids)
+                affected_ids |= institution_ids | platform_ids
+        deleted.extend(ids)
+
+    if affected_ids:
+        with transaction.atomic():
+            graph = get_graph()
+            recompute_ids = set()
+            for institution_id in affected_ids:
+                recompute_ids |= graph.report_dependents(institution_id)
+            changed_ids = {
+                institution.pk
+                for institution in Institution.objects.filter(pk__in=recompute_ids)
+                if institution.update_has_report(graph)
+            }
+            OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, changed_ids)
+    return deleted
@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+from django.db.models import Exists, OuterRef
+
+from agencies.models import AgencyFocusCountry
+from institutions.models import InstitutionCountry
+from reports.models import Report
+
+# reports recomputed and updated at once
+CHUNK_SIZE = 500
+
+DENORMALIZED_FIELDS = ('valid_to_calculated', 'activity_type', 'crossborder')
+
+
+def crossborder_exists():
+    """
+    Expression telling whether a report is cross-border: one of its institutions is located (verified) in a country
+    that is not a focus country of the agency, or a focus country marked as cross-border
+    """
+    home_countries = AgencyFocusCountry.objects.filter(
+        agency=OuterRef(OuterRef('agency')),
+        country_is_crossborder=False
+    ).values('country')
+    return Exists(InstitutionCountry.objects.filter(
+        institution__reports=OuterRef('pk'),
+        country_verified=True
+    ).exclude(country__in=home_countries))
+
+
+def refresh_denormalized(report_ids, chunk_size=None):
+    """
+    Recompute valid_to_calculated, activity_type and crossborder of the given reports, with two queries per chunk,
+    and store the changed values with one bulk update. No signals are sent.
+
+    Returns the IDs of the reports that changed.
+    """
+    report_ids = list(dict.fromkeys(report_ids))
+    chunk_size = chunk_size or CHUNK_SIZE
+    changed = []
+    for start in range(0, len(report_ids), chunk_size):
+        chunk = report_ids[start:start + chunk_size]
+
+        # activity types in the order of Report.agency_esg_activities.all()
+        activity_types = defaultdict(list)
+        for report_id, activity_type_id in Report.agency_esg_activities.through.objects \
+                .filter(report_id__in=chunk) \
+                .order_by('agencyesgactivity__agency', 'agencyesgactivity__activity') \
+                .values_list('report_id', 'agencyesgactivity__activity_group__activity_type_id'):
+            activity_types[report_id].append(activity_type_id)
+
+        updates = []
+        reports = Report.objects.filter(id__in=chunk) \
+                                .only('id', 'valid_from', 'valid_to', *DENORMALIZED_FIELDS) \
+                                .annotate(crossborder_calculated=crossborder_exists())
+        for report in reports:
+            values = {
+                'valid_to_calculated': report.calculate_valid_to(),
+                'activity_type_id': Report.calculate_activity_type(activity_types[report.id]),
+                'crossborder': report.crossborder_calculated,
+            }
+            if any(getattr(report, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(report, field, value)
+                updates.append(report)
+        if updates:
+            Report.objects.bulk_update(updates, DENORMALIZED_FIELDS)
+            changed.extend(report.id for report in updates)
+    return changed
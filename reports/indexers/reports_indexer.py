@@ -4,8 +4,9 @@ from datetime import datetime, date
 import pysolr
 from datedelta import datedelta
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import Prefetch
 
+from programmes.models import Programme
 from reports.models import Report
 
 
@@ -13,6 +14,26 @@ class ReportsIndexer:
     """
     Class to index Reports to Solr.
     """
+    # reports indexed and posted to Solr at once by index_many
+    CHUNK_SIZE = 500
+
+    # related records used to build the documents, fetched by index_many for a whole chunk
+    SELECT_RELATED = ('agency', 'status', 'decision', 'flag', 'created_by')
+    PREFETCH = (
+        'agency_esg_activities__activity_group__activity_type',
+        'contributing_agencies',
+        'reportfile_set__languages',
+        'reportlink_set',
+        'institutions__institutionname_set__institutionnameversion_set',
+        'institutions__institutioncountry_set__country',
+        'institutions__relationship_parent',
+        'institutions__relationship_child',
+        'institutions__relationship_source',
+        'institutions__relationship_target',
+        Prefetch('programme_set', queryset=Programme.objects.select_related('qf_ehea_level')),
+        'programme_set__programmename_set',
+        'programme_set__countries',
+    )
 
     def __init__(self, report_id):
         self.report_id = report_id
@@ -94,22 +115,67 @@ class ReportsIndexer:
 
     def index(self):
         self._get_report()
-        self._index_report()
-        self._store_json()
-        self._remove_duplicates()
-        self._remove_empty_keys()
+        self._build_doc()
         try:
             self.solr.add([self.doc])
             print("Indexing Report No. %s!" % (self.doc['id']))
         except pysolr.SolrError as e:
             print('Error with Report No. %s! Error: %s' % (self.doc['id'], e))
 
+    @classmethod
+    def index_many(cls, report_ids, chunk_size=None, fail_silently=True):
+        """
+        Index several reports: related records are fetched for a chunk of reports at once, and the documents of
+        each chunk are posted to Solr in one request, committing once at the end.
+        Solr errors are printed, or raised if fail_silently is False.
+        """
+        report_ids = list(report_ids)
+        chunk_size = chunk_size or cls.CHUNK_SIZE
+        solr = None
+        for start in range(0, len(report_ids), chunk_size):
+            chunk = report_ids[start:start + chunk_size]
+            docs = []
+            reports = Report.objects.filter(id__in=chunk) \
+                .select_related(*cls.SELECT_RELATED) \
+                .prefetch_related(*cls.PREFETCH)
+            for report in reports:
+                indexer = cls(report.id)
+                indexer.report = report
+                indexer._build_doc()
+                docs.append(indexer.doc)
+                solr = indexer.solr
+            if docs:
+                try:
+                    solr.add(docs, commit=False)
+                    print("Indexing Reports No. %s-%s (%d records)!" % (chunk[0], chunk[-1], len(docs)))
+                except pysolr.SolrError as e:
+                    print('Error with Reports No. %s-%s! Error: %s' % (chunk[0], chunk[-1], e))
+                    if not fail_silently:
+                        raise
+        if solr:
+            solr.commit()
+
+    @classmethod
+    def delete_many(cls, report_ids):
+        """
+        Delete several reports from Solr with one request
+        """
+        report_ids = [ str(report_id) for report_id in report_ids ]
+        if report_ids:
+            cls(None).solr.delete(id=report_ids, commit=True)
+
     def delete(self):
         self.solr.delete(id=str(self.report_id), commit=True)
 
     def _get_report(self):
         self.report = Report.objects.get(pk=self.report_id)
 
+    def _build_doc(self):
+        self._index_report()
+        self._store_json()
+        self._remove_duplicates()
+        self._remove_empty_keys()
+
     def _index_report(self):
         self.doc['id'] = self.report.id
         self.doc['id_sort'] = self.report.id
@@ -117,13 +183,16 @@ class ReportsIndexer:
         self.doc['local_id'] = self.report.local_identifier
         self.doc['local_identifier'] = self.report.local_identifier
 
-        self.doc['agency_esg_activity'] = self.report.get_activity_names()
-        self.doc['activity_facet'] = self.report.get_activity_names()
-        self.doc['activity_id'] = [activity.id for activity in self.report.agency_esg_activities.all()]
+        activities = list(self.report.agency_esg_activities.all())
+        activity_names = [activity.activity_display or activity.activity for activity in activities]
+        activity_types = [activity.activity_group.activity_type for activity in activities]
+        self.doc['agency_esg_activity'] = activity_names
+        self.doc['activity_facet'] = activity_names
+        self.doc['activity_id'] = [activity.id for activity in activities]
 
-        self.doc['agency_esg_activity_type'] = [activity.activity_type.type for activity in self.report.agency_esg_activities.all()]
-        self.doc['activity_type_facet'] = [activity.activity_type.type for activity in self.report.agency_esg_activities.all()]
-        self.doc['activity_type_id'] = [activity.activity_type.id for activity in self.report.agency_esg_activities.all()]
+        self.doc['agency_esg_activity_type'] = [activity_type.type for activity_type in activity_types]
+        self.doc['activity_type_facet'] = [activity_type.type for activity_type in activity_types]
+        self.doc['activity_type_id'] = [activity_type.id for activity_type in activity_types]
 
         self.doc['agency_name'] = self.report.agency.name_primary
         self.doc['agency_acronym'] = self.report.agency.acronym_primary
@@ -153,7 +222,7 @@ class ReportsIndexer:
             self.doc['agency_id'].append(contributing_agency.id)
 
         # Index Report Files
-        for report_file in self.report.reportfile_set.iterator():
+        for report_file in self.report.reportfile_set.all():
             self.doc['report_files'].append({
                 'file_display_name': report_file.file_display_name,
                 'file': report_file.file.url if report_file.file else None,
@@ -164,7 +233,7 @@ class ReportsIndexer:
                 self.doc['language_id'].append(lang.id)
 
         # Index Report Links
-        for report_link in self.report.reportlink_set.iterator():
+        for report_link in self.report.reportlink_set.all():
             self.doc['report_links'].append({
                 'link_display_name': report_link.link_display_name,
                 'link': report_link.link
@@ -172,12 +241,10 @@ class ReportsIndexer:
 
         # Crossborder filter
         self.doc['crossborder_facet'].append(False)
-        focus_countries = self.report.agency.agencyfocuscountry_set
-        for inst in self.report.institutions.iterator():
-            for ic in inst.institutioncountry_set.iterator():
-                if focus_countries.filter(Q(country__id=ic.country.id) & Q(country_is_crossborder=True)):
-                    self.doc['crossborder_facet'].append(True)
-                    self.doc['crossborder'] = True
+        if self.report.crossborder:
+            self.doc['crossborder_facet'].append(True)
+            self.doc['crossborder'] = True
+        institutions = list(self.report.institutions.all())
 
         self.doc['other_comment'] = self.report.other_comment
 
@@ -190,17 +257,13 @@ class ReportsIndexer:
 
         self.doc['valid_from'] = "%sZ" % datetime.combine(self.report.valid_from, datetime.min.time()).isoformat()
         if self.report.valid_to:
-            valid_to = "%sZ" % datetime.combine(self.report.valid_to, datetime.min.time()).isoformat()
-            self.doc['valid_to'] = valid_to
-            self.doc['valid_to_calculated'] = valid_to
-        else:
-            valid_to = self._add_years(self.report.valid_from, 5)
-            valid_to = "%sZ" % datetime.combine(valid_to, datetime.min.time()).isoformat()
-            self.doc['valid_to_calculated'] = valid_to
+            self.doc['valid_to'] = "%sZ" % datetime.combine(self.report.valid_to, datetime.min.time()).isoformat()
+        self.doc['valid_to_calculated'] = "%sZ" % datetime.combine(self.report.valid_to_calculated,
+                                                                   datetime.min.time()).isoformat()
 
         # Institutions indexing
-        institutions = []
-        for inst in self.report.institutions.iterator():
+        institution_names = []
+        for inst in institutions:
             self.doc['institutions'].append({
                 'id': inst.id,
                 'deqar_id': inst.deqar_id,
@@ -211,7 +274,7 @@ class ReportsIndexer:
 
             self.doc['institution_id'].append(inst.id)
 
-            institutions.append(inst.name_primary)
+            institution_names.append(inst.name_primary)
             for iname in inst.institutionname_set.all():
                 self.doc['institution_name_official'].append(iname.name_official.strip())
                 self.doc['institution_name_official_transliterated'].append(iname.name_official_transliterated.strip())
@@ -221,7 +284,11 @@ class ReportsIndexer:
                     self.doc['institution_name_version'].append(iname_version.name.strip())
                     self.doc['institution_name_version_transliterated'].append(iname_version.transliteration.strip())
 
-            for c in inst.institutioncountry_set.order_by('country__id').distinct('country__id'):
+            # one location per country
+            locations = {}
+            for ic in sorted(inst.institutioncountry_set.all(), key=lambda ic: (ic.country_id, ic.id)):
+                locations.setdefault(ic.country_id, ic)
+            for c in locations.values():
                 self.doc['country'].append(c.country.name_english)
                 self.doc['countries'].append({
                     'id': c.country.id,
@@ -238,23 +305,23 @@ class ReportsIndexer:
 
             # Add children
             for i in inst.relationship_parent.all():
-                self.doc['institutions_additional'].append(i.institution_child.id)
-                self.doc['institution_id'].append(i.institution_child.id)
+                self.doc['institutions_additional'].append(i.institution_child_id)
+                self.doc['institution_id'].append(i.institution_child_id)
 
             # Add parents
             for i in inst.relationship_child.all():
-                self.doc['institutions_additional'].append(i.institution_parent.id)
-                self.doc['institution_id'].append(i.institution_parent.id)
+                self.doc['institutions_additional'].append(i.institution_parent_id)
+                self.doc['institution_id'].append(i.institution_parent_id)
 
             # Add target
             for i in inst.relationship_source.all():
-                self.doc['institutions_additional'].append(i.institution_target.id)
-                self.doc['institution_id'].append(i.institution_target.id)
+                self.doc['institutions_additional'].append(i.institution_target_id)
+                self.doc['institution_id'].append(i.institution_target_id)
 
             # Add source
             for i in inst.relationship_target.all():
-                self.doc['institutions_additional'].append(i.institution_source.id)
-                self.doc['institution_id'].append(i.institution_source.id)
+                self.doc['institutions_additional'].append(i.institution_source_id)
+                self.doc['institution_id'].append(i.institution_source_id)
 
         self.doc['institution_name_official'] = list(
             filter(None, self.doc['institution_name_official']))
@@ -271,24 +338,25 @@ class ReportsIndexer:
         programmes = []
         programme_types = []
 
-        for programme in self.report.programme_set.iterator():
+        report_programmes = list(self.report.programme_set.all())
+        for programme in report_programmes:
             self.doc['programmes'].append({
                 'id': programme.id,
                 'name_primary': programme.name_primary,
                 'nqf_level': programme.nqf_level,
                 'qf_ehea_level': programme.qf_ehea_level.level if programme.qf_ehea_level else None,
-                'degree_outcome': programme.degree_outcome.id == 1,
+                'degree_outcome': programme.degree_outcome_id == 1,
                 'programme_type': programme.get_programme_type(),
                 'workload_ects': programme.workload_ects
             })
 
             programmes.append(programme.name_primary)
 
-            for pname in programme.programmename_set.iterator():
+            for pname in programme.programmename_set.all():
                 if pname.name:
                     self.doc['programme_name'].append(pname.name.strip())
 
-            for c in programme.countries.iterator():
+            for c in programme.countries.all():
                 self.doc['country'].append(c.name_english)
                 self.doc['country_facet'].append(c.name_english)
                 self.doc['countries'].append({
@@ -304,7 +372,7 @@ class ReportsIndexer:
             # Programme type facet
             programme_types.append(programme.get_programme_type())
 
-        institutions = "; ".join(institutions)
+        institutions = "; ".join(institution_names)
         programmes = " / ".join(programmes)
 
         self.doc['programme_type_facet'] = list(set(programme_types))
@@ -319,13 +387,11 @@ class ReportsIndexer:
         self.doc['programme_name'] = list(filter(None, self.doc['programme_name']))
 
         # AP Related filters
-        ap_count = self.report.institutions.filter(is_other_provider=True).count()
-        if ap_count > 0:
+        if any(inst.is_other_provider for inst in self.report.institutions.all()):
             self.doc['other_provider_covered_facet'] = True
 
         if len(programmes) > 0:
-            degree_outcome_true = self.report.programme_set.filter(degree_outcome__id=1).count()
-            if degree_outcome_true > 0:
+            if any(programme.degree_outcome_id == 1 for programme in report_programmes):
                 self.doc['degree_outcome_facet'] = True
             else:
                 self.doc['degree_outcome_facet'] = False
@@ -363,10 +429,3 @@ class ReportsIndexer:
                 valid = False
 
         return valid
-
-    @staticmethod
-    def _add_years(d, years):
-        try:
-            return d.replace(year=d.year + years)
-        except ValueError:
-            return d + (date(d.year + years, 1, 1) - date(d.year, 1, 1))
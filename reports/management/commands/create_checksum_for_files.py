@@ -1,9 +1,26 @@
-import hashlib
+import datetime
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from django.core.management import BaseCommand, CommandError
-from django.conf import settings
-from reports.models import Report
+from django.db.models import Q
+from django.utils import timezone
+
+from reports.models import Report, ReportFile, file_checksum
+
+MISSING = object()
+
+def _checksum_worker(path, checksum_date, since):
+    """
+    Calculate checksum of a file on disk; runs in a worker thread and does not touch the DB.
+    Returns None if the file was skipped (not modified since checksum date).
+    """
+    if since and checksum_date:
+        if datetime.datetime.fromtimestamp(os.path.getmtime(path)) <= checksum_date:
+            return None
+    with open(path, 'rb') as f:
+        return file_checksum(f)
+
 
 class Command(BaseCommand):
     help = 'Create checksum for the existing files and save it to the DB.'
@@ -21,8 +38,17 @@ class Command(BaseCommand):
         parser.add_argument('--force', '-f',
                             action='store_true',
                             help='Overwrite checksums saved in database in case of mismatch.')
+        parser.add_argument('--since', '-s',
+                            action='store_true',
+                            help='Only process files modified after their checksum was last calculated.')
+        parser.add_argument('--jobs', '-j',
+                            default=4, type=int,
+                            help='Number of files to read and hash in parallel (default: 4).')
+        parser.add_argument('--batch-size',
+                            default=500, type=int,
+                            help='Number of files to process and save to the database per batch (default: 500).')
 
-    def handle(self, *args, report=None, all=False, check=False, force=False, verbosity=1, **options):
+    def handle(self, *args, report=None, all=False, check=False, force=False, since=False, jobs=4, batch_size=500, verbosity=1, **options):
         # Calculate checksum of a single report
         if report:
             reports = Report.objects.filter(id=report)
@@ -37,48 +63,83 @@ class Command(BaseCommand):
         stats = {
             'total': reports.count(),
             'checked': 0,
+            'skipped': 0,
             'missing': 0,
             'done': 0,
             'mismatch': 0,
         }
 
-        for report in reports.exclude(reportfile__file='').distinct().iterator():
-            for report_file in report.reportfile_set.exclude(file=''):
-                if check or report_file.file_checksum is None or report_file.file_checksum == '':
-                    stats['checked'] += 1
-                    try:
-                        checksum = report_file.generate_checksum()
-
-                    except FileNotFoundError:
-                        stats['missing'] += 1
-                        if verbosity > 1:
-                            if report_file.file.name:
-                                self.stderr.write(self.style.WARNING(f"File {report_file.file.name} could not be found"))
-                            else:
-                                self.stderr.write(self.style.WARNING(f"ReportFile {report_file.id} ({report_file.file_display_name} from {report_file.file_original_location}) has no local file path"))
+        report_files = ReportFile.objects.filter(report__in=reports).exclude(file='').order_by('id')
+        if not check:
+            report_files = report_files.filter(Q(file_checksum__isnull=True) | Q(file_checksum=''))
+        report_files = report_files.only('id', 'report_id', 'file', 'file_display_name', 'file_original_location', 'file_checksum', 'file_checksum_date')
 
-                    else:
-                        stats['done'] += 1
-                        if check and report_file.file_checksum:
-                            if report_file.file_checksum == checksum:
-                                self.stdout.write(self.style.SUCCESS(f"Correct checksum in database for {report_file.file.name}"))
-                            else:
-                                stats['mismatch'] += 1
-                                self.stdout.write(self.style.ERROR(f"Checksum mismatch for {report_file.file.name}: database={report_file.file_checksum} file={checksum}"))
-                                if force:
-                                    report_file.file_checksum = checksum
-                                    report_file.save()
-                                    self.stdout.write(self.style.WARNING(f" -> value in database overwritten by {checksum}"))
-                        else:
-                            report_file.file_checksum = checksum
-                            report_file.save()
-                            self.stdout.write(self.style.SUCCESS(f"Calculated checksum for {report_file.file.name} to {checksum}"))
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            batch = []
+            for report_file in report_files.iterator(chunk_size=batch_size):
+                batch.append(report_file)
+                if len(batch) >= batch_size:
+                    self._process_batch(executor, batch, stats, check, force, since, verbosity)
+                    batch = []
+            if batch:
+                self._process_batch(executor, batch, stats, check, force, since, verbosity)
 
         self.stdout.write("""
             {total} reports checked
             {checked} file checksums were missing
+            {skipped} files were not modified since last checksum
             {missing} files were not found
             {done} checksums were calculated
             {mismatch} mismatches identified
         """.format(**stats))
 
+    def _process_batch(self, executor, batch, stats, check, force, since, verbosity):
+        """
+        Hash a batch of files in parallel, then write changed checksums back in one bulk update
+        """
+        def hash_file(report_file):
+            try:
+                return _checksum_worker(report_file.file.path, report_file.file_checksum_date, since)
+            except FileNotFoundError:
+                return MISSING
+
+        updated = []
+        now = timezone.now()
+
+        for report_file, checksum in zip(batch, executor.map(hash_file, batch)):
+            if checksum is None:
+                stats['skipped'] += 1
+                continue
+
+            stats['checked'] += 1
+            if checksum is MISSING:
+                stats['missing'] += 1
+                if verbosity > 1:
+                    if report_file.file.name:
+                        self.stderr.write(self.style.WARNING(f"File {report_file.file.name} could not be found"))
+                    else:
+                        self.stderr.write(self.style.WARNING(f"ReportFile {report_file.id} ({report_file.file_display_name} from {report_file.file_original_location}) has no local file path"))
+                continue
+
+            stats['done'] += 1
+            if check and report_file.file_checksum:
+                if report_file.file_checksum == checksum:
+                    self.stdout.write(self.style.SUCCESS(f"Correct checksum in database for {report_file.file.name}"))
+                    report_file.file_checksum_date = now
+                    updated.append(report_file)
+                else:
+                    stats['mismatch'] += 1
+                    self.stdout.write(self.style.ERROR(f"Checksum mismatch for {report_file.file.name}: database={report_file.file_checksum} file={checksum}"))
+                    if force:
+                        report_file.file_checksum = checksum
+                        report_file.file_checksum_date = now
+                        updated.append(report_file)
+                        self.stdout.write(self.style.WARNING(f" -> value in database overwritten by {checksum}"))
+            else:
+                report_file.file_checksum = checksum
+                report_file.file_checksum_date = now
+                updated.append(report_file)
+                self.stdout.write(self.style.SUCCESS(f"Calculated checksum for {report_file.file.name} to {checksum}"))
+
+        if updated:
+            ReportFile.objects.bulk_update(updated, ['file_checksum', 'file_checksum_date'])
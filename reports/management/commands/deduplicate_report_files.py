@@ -0,0 +1,79 @@
+import os
+
+from django.core.management import BaseCommand, CommandError
+
+from eqar_backend.storage import ContentAddressedFileSystemStorage
+from reports.models import Report, ReportFile
+
+
+class Command(BaseCommand):
+    help = 'Move existing report files to content-addressed storage, storing identical files only once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all',
+                            action='store_true',
+                            help='Deduplicate files of all reports.')
+        parser.add_argument('--report',
+                            help='Deduplicate files of a specific report', type=int)
+        parser.add_argument('--dry-run', '-n',
+                            action='store_true',
+                            help='Only report how many files are duplicates, do not change anything.')
+        parser.add_argument('--no-gc',
+                            action='store_true',
+                            help='Do not remove unreferenced blobs after deduplication.')
+
+    def handle(self, *args, report=None, all=False, dry_run=False, no_gc=False, verbosity=1, **options):
+        if report:
+            report_files = ReportFile.objects.filter(report_id=report)
+            if not Report.objects.filter(id=report).exists():
+                raise CommandError('Report ID "%s" does not exist' % report)
+        elif all:
+            report_files = ReportFile.objects.all()
+        else:
+            raise CommandError('Specify either Report ID or --all.')
+
+        # work on the same location as the storage of ReportFile.file, whichever backend is configured
+        storage = ContentAddressedFileSystemStorage(location=ReportFile._meta.get_field('file').storage.location)
+
+        stats = {
+            'total': 0,
+            'missing': 0,
+            'duplicates': 0,
+            'saved': 0,
+        }
+        seen = set()
+
+        for name in report_files.exclude(file='').values_list('file', flat=True).distinct().iterator():
+            stats['total'] += 1
+            if not storage.exists(name):
+                stats['missing'] += 1
+                if verbosity > 1:
+                    self.stderr.write(self.style.WARNING(f"File {name} could not be found"))
+                continue
+
+            path = storage.path(name)
+            size = os.path.getsize(path)
+            if dry_run:
+                digest = storage.file_digest(name)
+                if digest in seen or os.path.exists(storage.blob_path(digest)) and not os.path.samefile(path, storage.blob_path(digest)):
+                    stats['duplicates'] += 1
+                    stats['saved'] += size
+                seen.add(digest)
+            elif os.stat(path).st_nlink == 1 and storage.deduplicate(name):
+                stats['duplicates'] += 1
+                stats['saved'] += size
+                if verbosity > 1:
+                    self.stdout.write(self.style.SUCCESS(f"Deduplicated {name}"))
+
+        self.stdout.write("""
+            {total} files checked
+            {missing} files were not found
+            {duplicates} duplicates {verb}
+            {saved} bytes {saved_verb}
+        """.format(verb='found' if dry_run else 'replaced by links',
+                   saved_verb='can be saved' if dry_run else 'saved',
+                   **stats))
+
+        if not dry_run and not no_gc:
+            removed = storage.collect_garbage()
+            self.stdout.write(f"{removed} unreferenced blobs removed")
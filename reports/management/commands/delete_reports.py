@@ -1,31 +1,14 @@
 import argparse
 import csv
-import json
+import gzip
 import os
+from datetime import datetime
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.core.management import BaseCommand, CommandError
+from django.core.management import BaseCommand
 from django.conf import settings
 
+from reports import deletion
 from reports.models import Report
-from webapi.v2.serializers.report_detail_serializers import ReportDetailSerializer
-from rest_framework.renderers import JSONRenderer
-
-from urllib.parse import urljoin
-
-class FakeRequest:
-    """
-    This class allows the serializer to create URIs correctly.
-    """
-
-    GET = {}
-    query_params = {}
-
-    def __init__(self, root):
-        self.root = root
-
-    def build_absolute_uri(self, rel_uri):
-        return urljoin(self.root, rel_uri)
 
 
 class Command(BaseCommand):
@@ -40,36 +23,46 @@ class Command(BaseCommand):
                             help='Check whether reports belong to specified agency.')
         parser.add_argument('--backup', '-b',
                             default='deleted-reports',
-                            help='The directory (relative to MEDIA_ROOT) where to place exported files.')
+                            help='The directory (relative to MEDIA_ROOT) where to place the backup file.')
         parser.add_argument('--dry-run', '-n',
                             action='store_true',
-                            help='Dry-run: only save backup files but do not delete from database.')
+                            help='Dry-run: only save backup file but do not delete from database.')
         parser.add_argument('--root', '-r',
                             default='/',
                             help='The root URL to prefix links to report files with.')
-
-    def handle(self, LIST, check, backup, root, dry_run, *args, **options):
-
-        base_dir = os.path.join(settings.MEDIA_ROOT, backup)
-        os.makedirs(base_dir, exist_ok=True)
-
-        request = FakeRequest(root)
-        renderer = JSONRenderer()
-
-        reader = csv.DictReader(LIST)
-        for row in reader:
+        parser.add_argument('--chunk-size',
+                            type=int,
+                            default=deletion.CHUNK_SIZE,
+                            help=f'Number of reports deleted in one transaction (default: {deletion.CHUNK_SIZE}).')
+
+    def resolve_reports(self, rows, check):
+        """
+        Look up the listed reports, by ID or by agency and local identifier, with one query each.
+        Returns the list of report IDs.
+        """
+        by_id = Report.objects.select_related('agency').in_bulk([ row['report_id'] for row in rows if 'report_id' in row ])
+        by_local_id = {}
+        local_ids = [ row['local_identifier'] for row in rows if 'report_id' not in row and 'local_identifier' in row ]
+        if local_ids:
+            for report in Report.objects.select_related('agency').filter(local_identifier__in=local_ids):
+                by_local_id.setdefault((report.agency.acronym_primary, report.local_identifier), []).append(report)
+
+        report_ids = []
+        for row in rows:
             if 'report_id' in row:
-                try:
-                    report = Report.objects.get(id=row['report_id'])
-                except ObjectDoesNotExist:
+                report = by_id.get(int(row['report_id']))
+                if report is None:
                     self.stdout.write(self.style.WARNING(f"Report with ID {row['report_id']} does not exist."))
                     continue
             elif 'agency' in row and 'local_identifier' in row:
-                try:
-                    report = Report.objects.get(agency__acronym_primary=row['agency'], local_identifier=row['local_identifier'])
-                except ObjectDoesNotExist:
+                reports = by_local_id.get((row['agency'], row['local_identifier']), [])
+                if not reports:
                     self.stdout.write(self.style.WARNING(f"Report with Local ID {row['local_identifier']} ({row['agency']}) does not exist."))
                     continue
+                if len(reports) > 1:
+                    self.stdout.write(self.style.ERROR(f"Local ID {row['local_identifier']} ({row['agency']}) is not unique."))
+                    continue
+                report = reports[0]
             else:
                 self.stdout.write(self.style.WARNING(f"You must specify the report ID in a column name 'report_id', or a combination of 'agency' and 'local_identifier'."))
                 continue
@@ -79,8 +72,24 @@ class Command(BaseCommand):
                 continue
 
             self.stdout.write(f"Deleting report {report.id} by {report.agency.acronym_primary}")
-            with open(os.path.join(base_dir, f'{report.id}.json'), 'wb') as bkupfile:
-                bkupfile.write(renderer.render(ReportDetailSerializer(report, context={'request': request}).data))
-            if not dry_run:
-                report.delete()
+            report_ids.append(report.id)
+        return report_ids
+
+    def handle(self, LIST, check, backup, root, dry_run, chunk_size, *args, **options):
+
+        base_dir = os.path.join(settings.MEDIA_ROOT, backup)
+        os.makedirs(base_dir, exist_ok=True)
+        backup_file = os.path.join(base_dir, f"deleted-reports-{datetime.now().strftime('%Y%m%d-%H%M%S')}.ndjson.gz")
+
+        report_ids = self.resolve_reports(list(csv.DictReader(LIST)), check)
+
+        with gzip.open(backup_file, 'wb') as stream:
+            deleted = deletion.delete_reports(report_ids,
+                                              backup=stream,
+                                              root=root,
+                                              chunk_size=chunk_size,
+                                              dry_run=dry_run)
 
+        self.stdout.write(f"Backup of {len(deleted)} report(s) saved to {backup_file}")
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS(f"{len(deleted)} report(s) deleted."))
@@ -16,6 +16,8 @@ class Command(BaseCommand):
                             help='The acronym of the agency.', default=None)
         parser.add_argument('--report', dest='report',
                             help='The ID of the report.', default=None)
+        parser.add_argument('--chunk-size', '-c', type=int, default=ReportsIndexer.CHUNK_SIZE,
+                            help=f'Number of reports posted to Solr at once (default: {ReportsIndexer.CHUNK_SIZE}).')
 
     def handle(self, *args, **options):
         solr_core = getattr(settings, "SOLR_CORE_REPORTS", "deqar-reports")
@@ -39,6 +41,5 @@ class Command(BaseCommand):
             reports = Report.objects.all()
             solr.delete(q='*:*', commit=True)
 
-        for report in reports.iterator():
-            indexer = ReportsIndexer(report.id)
-            indexer.index()
+        report_ids = reports.order_by('id').values_list('id', flat=True)
+        ReportsIndexer.index_many(report_ids, chunk_size=options['chunk_size'])
@@ -1,44 +1,44 @@
-from django.core.exceptions import ObjectDoesNotExist
 from django.core.management import BaseCommand, CommandError
-from reports.tasks import index_report
+from django.db import transaction
+
 from institutions.models import Institution
-from reports.models import Report
+from reports.reassignment import reassign_reports, RELATIONS
 
 
 class Command(BaseCommand):
-    help = 'Reharvest files for report.'
-    force = False
+    help = 'Move reports from one or several institutions to another institution.'
 
     def add_arguments(self, parser):
-        parser.add_argument('--from', dest='institution_from',
-                            help='ID of the institution that has to be changed.', default=None)
-        parser.add_argument('--to', dest='institution_to',
-                            help='ID of the institution that has to be newly assigned.', default=False)
+        parser.add_argument('--from', dest='institution_from', action='append', type=int, required=True,
+                            help='ID of the institution that has to be changed (can be given several times).')
+        parser.add_argument('--to', dest='institution_to', type=int, required=True,
+                            help='ID of the institution that has to be newly assigned.')
+        parser.add_argument('--relation', choices=RELATIONS.keys(), action='append',
+                            help='Only move links of this kind (default: institutions and platforms).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Show what would be changed, without saving it.')
 
     def handle(self, *args, **options):
-        institution_from_id = options['institution_from']
-        institution_to_id = options['institution_to']
-
-        try:
-            institution_from = Institution.objects.get(pk=institution_from_id)
-        except ObjectDoesNotExist:
+        institutions_from = Institution.objects.filter(pk__in=options['institution_from'])
+        if institutions_from.count() != len(set(options['institution_from'])):
             raise CommandError('Institution (from) cannot be found .')
 
         try:
-            institution_to = Institution.objects.get(pk=institution_to_id)
-        except ObjectDoesNotExist:
+            institution_to = Institution.objects.get(pk=options['institution_to'])
+        except Institution.DoesNotExist:
             raise CommandError('Institution (to) cannot be found .')
 
-        print("Changing %s to %s" % (institution_from.name_primary, institution_to.name_primary))
-
-        reports = Report.objects.filter(institutions__id=institution_from_id)
-        for report in reports.iterator():
-            report.institutions.remove(institution_from)
-            report.institutions.add(institution_to)
-
-            # Saving report instance which triggers reports indexing.
-            report.save()
-
-            print("Modifying report %s" % report.id)
-
-        print("Total %s report was modified!" % reports.count())
+        for institution_from in institutions_from:
+            self.stdout.write("Changing %s to %s" % (institution_from.name_primary, institution_to.name_primary))
+
+        with transaction.atomic():
+            changed = reassign_reports(options['institution_from'], institution_to.id,
+                                       relations=options['relation'] or tuple(RELATIONS))
+            for relation, report_ids in changed.items():
+                if options['verbosity'] > 1:
+                    for report_id in report_ids:
+                        self.stdout.write("Modifying report %s (%s)" % (report_id, relation))
+                self.stdout.write("Total %s report(s) modified via %s!" % (len(report_ids), relation))
+            if options['dry_run']:
+                transaction.set_rollback(True)
+                self.stdout.write(self.style.WARNING('Dry run - changes were rolled back.'))
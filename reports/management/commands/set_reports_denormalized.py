@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from outbox.models import OutboxEvent
+from reports.denormalized import refresh_denormalized
+from reports.models import Report
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized valid_to_calculated, activity_type and crossborder columns of reports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', type=int, action='append',
+                            help='Recompute a specific report (can be given several times; default: all reports).')
+        parser.add_argument('--chunk-size', type=int,
+                            help='Number of reports recomputed and updated at once (default: 500).')
+        parser.add_argument('--no-index', action='store_true',
+                            help='Do not record the changed reports for reindexing.')
+
+    def handle(self, *args, report=None, chunk_size=None, no_index=False, **options):
+        report_ids = report or list(Report.objects.order_by('id').values_list('id', flat=True))
+        with transaction.atomic():
+            changed = refresh_denormalized(report_ids, chunk_size=chunk_size)
+            if not no_index:
+                OutboxEvent.record(OutboxEvent.ENTITY_REPORT, changed)
+        self.stdout.write(f'{len(report_ids)} reports checked, {len(changed)} updated.')
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0041_alter_reportlink_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportfile',
+            name='file_checksum_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.19 on 2026-10-19 11:05
+
+from django.db import migrations
+from django.conf import settings
+
+from eqar_backend.meilisearch import MeiliClient
+
+def configure_index(apps, schema_editor):
+    if hasattr(settings, "MEILI_API_URL"):
+        meili = MeiliClient()
+        meili.wait_for(meili.update_settings(meili.INDEX_REPORTS, {
+            'sortableAttributes': [
+                'id',
+                'created_at',
+                'updated_at',
+                'valid_from',
+                'valid_to_calculated',
+                'institutions.name_sort',
+                'institutions.locations.country.name_english',
+                'platforms.name_sort',
+                'platforms.locations.country.name_english',
+                'agency.acronym_primary',
+                'agency_esg_activities.type',
+                'flag',
+            ],
+        }))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0043_meili_admin_filters'),
+    ]
+
+    operations = [
+        migrations.RunPython(configure_index, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:38
+
+from collections import defaultdict
+
+from datedelta import datedelta
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+import django.db.models.deletion
+
+from reports.models import Report as CurrentReport
+
+
+def backfill_denormalized(apps, schema_editor):
+    # same computation as reports.denormalized.refresh_denormalized, on the historical models
+    Report = apps.get_model('reports', 'Report')
+    AgencyFocusCountry = apps.get_model('agencies', 'AgencyFocusCountry')
+    InstitutionCountry = apps.get_model('institutions', 'InstitutionCountry')
+
+    activity_types = defaultdict(list)
+    for report_id, activity_type_id in Report.agency_esg_activities.through.objects \
+            .order_by('agencyesgactivity__agency', 'agencyesgactivity__activity') \
+            .values_list('report_id', 'agencyesgactivity__activity_group__activity_type_id'):
+        activity_types[report_id].append(activity_type_id)
+
+    home_countries = AgencyFocusCountry.objects.filter(
+        agency=OuterRef(OuterRef('agency')),
+        country_is_crossborder=False
+    ).values('country')
+    foreign_countries = InstitutionCountry.objects.filter(
+        institution__reports=OuterRef('pk'),
+        country_verified=True
+    ).exclude(country__in=home_countries)
+
+    reports = []
+    for report in Report.objects.only('id', 'valid_from', 'valid_to').annotate(foreign=Exists(foreign_countries)):
+        report.valid_to_calculated = report.valid_to or (report.valid_from + datedelta(years=CurrentReport.VALIDITY_YEARS))
+        report.activity_type_id = CurrentReport.calculate_activity_type(activity_types[report.id])
+        report.crossborder = report.foreign
+        reports.append(report)
+    Report.objects.bulk_update(reports, ['valid_to_calculated', 'activity_type', 'crossborder'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0020_reindexjob'),
+        ('reports', '0044_meili_sort_by_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='activity_type',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='agencies.agencyactivitytype'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='crossborder',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='valid_to_calculated',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['valid_to_calculated'], name='deqar_repor_valid_t_670b66_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['crossborder'], name='deqar_repor_crossbo_813634_idx'),
+        ),
+        migrations.RunPython(backfill_denormalized, migrations.RunPython.noop),
+    ]
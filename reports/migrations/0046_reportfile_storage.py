@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:55
+
+from django.db import migrations, models
+import eqar_backend.storage
+import reports.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0045_report_denormalized'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportfile',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, storage=eqar_backend.storage.get_report_file_storage, upload_to=reports.models.set_directory_path),
+        ),
+    ]
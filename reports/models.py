@@ -4,10 +4,12 @@ import hashlib
 from datedelta import datedelta
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.files import File
 from django.db import models
 from django.utils import timezone
 
 from eqar_backend.fields.char_null_field import CharNullField
+from eqar_backend.storage import ContentAddressedFileSystemStorage, get_report_file_storage
 from institutions.models import InstitutionHierarchicalRelationshipType, InstitutionHierarchicalRelationship, \
     HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM
 
@@ -43,26 +45,35 @@ class Report(models.Model):
     updated_by = models.ForeignKey(User, related_name='reports_updated_by',
                                    on_delete=models.CASCADE, blank=True, null=True)
 
-    @property
-    def valid_to_calculated(self):
+    # denormalized values, maintained by reports.denormalized (see reports.signals)
+    valid_to_calculated = models.DateField(blank=True, null=True, editable=False)
+    activity_type = models.ForeignKey('agencies.AgencyActivityType', related_name='+', on_delete=models.PROTECT,
+                                      blank=True, null=True, editable=False)
+    crossborder = models.BooleanField(default=False, editable=False)
+
+    def calculate_valid_to(self):
         """
         Effective end of validity: the explicit valid_to, or VALIDITY_YEARS after valid_from.
         Single source of truth for the "valid_to or valid_from + N years" rule.
         """
         return self.valid_to or (self.valid_from + datedelta(years=self.VALIDITY_YEARS))
 
-    def get_activity_type(self):
+    @staticmethod
+    def calculate_activity_type(activity_type_ids):
+        """
+        Activity type of a report, from the types of its ESG activities (in their default order)
+        """
         # Default = institutional
         activity_type_id = 2
-        for activity in self.agency_esg_activities.all():
+        for type_id in activity_type_ids:
             # If there is a programme or institutional/programme activity, set the activity type to programme
             # if there was no joint/programme activity before
-            if activity.activity_type_id == 1 or activity.activity_type_id == 4:
+            if type_id == 1 or type_id == 4:
                 if activity_type_id == 2:
-                    activity_type_id = activity.activity_type_id
+                    activity_type_id = type_id
             # If there is a joint/programme activity, set the activity type to joint programme
             # all the time
-            elif activity.activity_type_id == 3:
+            elif type_id == 3:
                 activity_type_id = 3
         return activity_type_id
 
@@ -116,6 +127,8 @@ class Report(models.Model):
         indexes = [
             models.Index(fields=['valid_from']),
             models.Index(fields=['valid_to']),
+            models.Index(fields=['valid_to_calculated']),
+            models.Index(fields=['crossborder']),
         ]
 
 
@@ -164,6 +177,9 @@ class ReportLink(models.Model):
         ordering = ('id',)
 
 
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+
 def set_directory_path(instance, filename):
     valid_from = instance.report.valid_from
     if isinstance(valid_from, str):
@@ -177,6 +193,33 @@ def set_directory_path(instance, filename):
     )
 
 
+def file_checksum(f, chunk_size=CHECKSUM_CHUNK_SIZE):
+    """
+    MD5 checksum of an open (binary) file, read in chunks of bounded size
+    """
+    md5 = hashlib.md5()
+    for chunk in iter(lambda: f.read(chunk_size), b''):
+        md5.update(chunk)
+    return md5.hexdigest()
+
+
+class HashingFile(File):
+    """
+    File wrapper computing the MD5 checksum while the content is read in chunks, e.g. by the storage backend
+    """
+    def __init__(self, file, name=None):
+        super().__init__(file, name or getattr(file, 'name', None))
+        self.md5 = hashlib.md5()
+
+    def chunks(self, chunk_size=None):
+        for chunk in super().chunks(chunk_size or CHECKSUM_CHUNK_SIZE):
+            self.md5.update(chunk)
+            yield chunk
+
+    def hexdigest(self):
+        return self.md5.hexdigest()
+
+
 class ReportFile(models.Model):
     """
     PDF versions of reports and evaluations.
@@ -194,8 +237,9 @@ class ReportFile(models.Model):
     report = models.ForeignKey('Report', on_delete=models.CASCADE)
     file_display_name = models.CharField(max_length=255, blank=True)
     file_original_location = models.CharField(max_length=500, blank=True)
-    file = models.FileField(max_length=255, blank=True, upload_to=set_directory_path)
+    file = models.FileField(max_length=255, blank=True, upload_to=set_directory_path, storage=get_report_file_storage)
     file_checksum = models.CharField(max_length=32, blank=True, null=True)
+    file_checksum_date = models.DateTimeField(blank=True, null=True)
     download_status = models.CharField(
         max_length=20,
         choices=DOWNLOAD_STATUS_CHOICES,
@@ -207,15 +251,38 @@ class ReportFile(models.Model):
     def generate_checksum(self):
         if self.file:
             with self.file.open('rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+                return file_checksum(f)
         else:
             raise FileNotFoundError
 
-    def save(self, *args, **kwargs):
-        try:
-            self.file_checksum = self.generate_checksum()
-        except FileNotFoundError:
-            self.file_checksum = None
+    def delete_stored_file(self, name, checksum):
+        """
+        Remove a file of this report file from storage, passing on its known checksum to content-addressed storage
+        """
+        storage = self.file.storage
+        if isinstance(storage, ContentAddressedFileSystemStorage):
+            storage.delete(name, digest=checksum)
+        else:
+            storage.delete(name)
+
+    def store_file(self, name, content):
+        """
+        Write content to storage and save, computing the checksum while the file is written
+        """
+        hashing_file = HashingFile(content, name)
+        self.file.save(name, hashing_file, save=False)
+        self.file_checksum = hashing_file.hexdigest()
+        self.file_checksum_date = timezone.now()
+        self.save(checksum=False)
+
+    def save(self, *args, checksum=True, **kwargs):
+        if checksum:
+            try:
+                self.file_checksum = self.generate_checksum()
+                self.file_checksum_date = timezone.now()
+            except FileNotFoundError:
+                self.file_checksum = None
+                self.file_checksum_date = None
         if self.file:
             self.download_status = self.DOWNLOAD_STATUS_SUCCESS
         elif self.download_status is None:
@@ -0,0 +1,99 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from institutions import graph as relationship_graph
+from institutions.graph import get_graph
+from institutions.models import Institution, InstitutionHierarchicalRelationship, \
+    HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM
+from outbox.models import OutboxEvent
+from reports.denormalized import refresh_denormalized
+from reports.models import Report
+
+# through tables linking reports to institutions
+RELATIONS = {
+    'institutions': Report.institutions.through,
+    'platforms': Report.platforms.through,
+}
+
+
+def create_platform_relationships(report_ids):
+    """
+    Create the educational platform relationships between the platforms and the institutions of the reports that
+    do not exist yet, as Report.set_platform_relationships() would upon saving each report, with one bulk insert.
+
+    Returns the IDs of the institutions on either side of the relationships created.
+    """
+    institutions = defaultdict(set)
+    for report_id, institution_id in RELATIONS['institutions'].objects.filter(report_id__in=report_ids) \
+                                                                    .values_list('report_id', 'institution_id'):
+        institutions[report_id].add(institution_id)
+    pairs = set()
+    for report_id, platform_id in RELATIONS['platforms'].objects.filter(report_id__in=report_ids) \
+                                                             .values_list('report_id', 'institution_id'):
+        pairs |= { (platform_id, institution_id) for institution_id in institutions[report_id]
+                   if institution_id != platform_id }
+    if pairs:
+        pairs -= set(InstitutionHierarchicalRelationship.objects.filter(
+            relationship_type_id=HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM,
+            institution_parent_id__in={ parent_id for parent_id, _ in pairs },
+        ).values_list('institution_parent_id', 'institution_child_id'))
+    if not pairs:
+        return set()
+    InstitutionHierarchicalRelationship.objects.bulk_create([
+        InstitutionHierarchicalRelationship(institution_parent_id=parent_id, institution_child_id=child_id,
+                                            relationship_type_id=HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM)
+        for parent_id, child_id in sorted(pairs)
+    ])
+    # bulk_create sends no signals
+    relationship_graph.mark_changed()
+    return set().union(*pairs)
+
+
+def reassign_reports(institution_from_ids, institution_to_id, relations=tuple(RELATIONS)):
+    """
+    Move the reports of one or several institutions to another institution (e.g. when merging duplicates).
+
+    The through tables are rewritten with a few set-based queries in one transaction, bypassing the m2m signals:
+    links that would become duplicates are dropped, all others are pointed to the new institution. The denormalized
+    fields of the reports and has_report of the affected institutions are then recomputed once, the educational
+    platform relationships that saving the reports would create are added, and one reindex of the changed reports
+    and institutions is recorded in the search index outbox.
+
+    Returns a dict mapping relation name to the IDs of the reports changed.
+    """
+    institution_from_ids = set(institution_from_ids) - { institution_to_id }
+    changed = {}
+    with transaction.atomic():
+        for relation in relations:
+            through = RELATIONS[relation]
+            links = through.objects.filter(institution_id__in=institution_from_ids)
+            report_ids = set(links.values_list('report_id', flat=True))
+            # reports linked to several of the institutions, or already to the new one, keep a single link
+            existing = through.objects.filter(institution_id=institution_to_id, report_id__in=links.values('report_id'))
+            links.filter(report_id__in=existing.values('report_id')).delete()
+            links.filter(Exists(through.objects.filter(report_id=OuterRef('report_id'),
+                                                       institution_id__in=institution_from_ids,
+                                                       id__lt=OuterRef('id')))).delete()
+            links.update(institution_id=institution_to_id)
+            changed[relation] = sorted(report_ids)
+
+        report_ids = set().union(*changed.values())
+        if report_ids:
+            # crossborder depends on the institutions' countries
+            refresh_denormalized(report_ids)
+            related_ids = create_platform_relationships(report_ids)
+            graph = get_graph()
+            recompute_ids = set()
+            for institution_id in institution_from_ids | { institution_to_id }:
+                recompute_ids |= graph.report_dependents(institution_id)
+            changed_ids = {
+                institution.pk
+                for institution in Institution.objects.filter(pk__in=recompute_ids)
+                if institution.update_has_report(graph)
+            }
+            OutboxEvent.record(OutboxEvent.ENTITY_REPORT, report_ids)
+            OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION,
+                               institution_from_ids | { institution_to_id } | changed_ids | related_ids)
+    return changed
@@ -1,5 +1,3 @@
-from django.db.models import Q
-
 from rest_framework import serializers
 
 from rest_framework.utils.representation import manager_repr
@@ -149,31 +147,18 @@ class ReportIndexerSerializer(serializers.ModelSerializer):
     institutions = InstitutionSerializer(read_only=True, many=True)
     platforms = InstitutionSerializer(read_only=True, many=True)
     programmes = ProgrammeSerializer(source='programme_set', read_only=True, many=True)
-    crossborder = serializers.SerializerMethodField()
     flag = serializers.StringRelatedField()
     status = serializers.StringRelatedField()
     decision = serializers.StringRelatedField()
     valid_from = UnixTimestampDateField()
     valid_to = UnixTimestampDateField()
-    valid_to_calculated = serializers.SerializerMethodField()
+    valid_to_calculated = UnixTimestampDateField()
     created_at = UnixTimestampDateField()
     updated_at = UnixTimestampDateField()
     report_files = ReportFileSerializer(source='reportfile_set', read_only=True, many=True)
     report_links = ReportLinkSerializer(source='reportlink_set', read_only=True, many=True)
     other_provider_covered = serializers.SerializerMethodField()
-
-    def get_crossborder(self, obj):
-        crossborder = False
-        focus_countries = obj.agency.agencyfocuscountry_set
-        for inst in obj.institutions.all():
-            for ic in inst.institutioncountry_set.filter(country_verified=True):
-                if not focus_countries.filter(Q(country__id=ic.country.id) & Q(country_is_crossborder=False)):
-                    crossborder = True
-        return crossborder
-
-    def get_valid_to_calculated(self, obj):
-        field = UnixTimestampDateField()
-        return field.to_representation(obj.valid_to_calculated)
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
 
     def get_other_provider_covered(self, obj):
         return any(obj.institutions.values_list('is_other_provider', flat=True))
@@ -192,6 +177,7 @@ class ReportIndexerSerializer(serializers.ModelSerializer):
             'decision', 'status',
             'valid_from', 'valid_to', 'valid_to_calculated',
             'created_at', 'updated_at',
+            'created_by',
             'crossborder',
             'report_files',
             'report_links',
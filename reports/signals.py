@@ -1,13 +1,15 @@
 import sys
 
-from django.db import transaction
+from django.db import models
 from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save, pre_delete
 from django.dispatch import receiver
 
+from agencies.models import AgencyActivityGroup, AgencyESGActivity, AgencyFocusCountry
+from reports.denormalized import refresh_denormalized
 from reports.models import Report, ReportFile
-from institutions.models import Institution
-from reports.tasks import index_report, meili_index_report, index_delete_report, meili_delete_report
-from institutions.tasks import index_institution, meili_index_institution
+from institutions.graph import get_graph
+from institutions.models import Institution, InstitutionCountry
+from outbox.models import OutboxEvent
 from submissionapi.tasks import download_file
 
 
@@ -21,8 +23,8 @@ def set_institution_has_reports(sender, instance, action, pk_set, **kwargs):
     directly affected institutions but also for their dependents - i.e. parents/predecessors that
     inherit their reports through hierarchical/historical relationships.
 
-    Institutions whose flag changed are reindexed, except the report's own (direct) institutions,
-    which meili_index_report already reindexes on report save - avoiding double reindexing.
+    The report, the directly affected institutions and institutions whose flag changed are recorded
+    in the search index outbox.
     """
     # Only handle the forward direction (report.institutions / report.platforms), where pk_set holds
     # institution ids and `instance` is the Report. The reverse direction is not used here.
@@ -44,40 +46,98 @@ def set_institution_has_reports(sender, instance, action, pk_set, **kwargs):
         return
 
     # collect the affected institutions plus everyone whose flag depends on them
+    graph = get_graph()
     recompute_ids = set()
-    for institution in Institution.objects.filter(pk__in=affected_ids):
-        recompute_ids |= institution.get_report_dependents()
+    for institution_id in affected_ids:
+        recompute_ids |= graph.report_dependents(institution_id)
 
     changed_ids = [
         institution.pk
         for institution in Institution.objects.filter(pk__in=recompute_ids)
-        if institution.update_has_report()
+        if institution.update_has_report(graph)
     ]
 
-    # meili_index_report already reindexes the report's direct institutions on save
-    direct_ids = set(instance.institutions.values_list('pk', flat=True))
-    reindex_ids = [pk for pk in changed_ids if pk not in direct_ids]
+    OutboxEvent.record(OutboxEvent.ENTITY_REPORT, instance.pk)
+    OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, affected_ids | set(changed_ids))
 
-    if reindex_ids and 'test' not in sys.argv:
-        for institution_id in reindex_ids:
-            transaction.on_commit(lambda i=institution_id: index_institution.delay(i))
-            transaction.on_commit(lambda i=institution_id: meili_index_institution.delay(i))
+
+@receiver(m2m_changed, sender=Report.institutions.through)
+@receiver(m2m_changed, sender=Report.agency_esg_activities.through)
+def do_refresh_denormalized_upon_relation_change(sender, instance, action, **kwargs):
+    # crossborder depends on the institutions, activity_type on the activities
+    if isinstance(instance, Report) and action in ('post_add', 'post_remove', 'post_clear'):
+        refresh_denormalized([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=InstitutionCountry)
+def do_refresh_denormalized_upon_institution_country_change(sender, instance, **kwargs):
+    report_ids = refresh_denormalized(
+        Report.objects.filter(institutions=instance.institution_id).values_list('id', flat=True)
+    )
+    OutboxEvent.record(OutboxEvent.ENTITY_REPORT, report_ids)
+    if report_ids:
+        # the cross-border facet of an institution is taken from its reports
+        OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, instance.institution_id)
+
+
+@receiver([post_save, post_delete], sender=AgencyFocusCountry)
+def do_refresh_denormalized_upon_focus_country_change(sender, instance, **kwargs):
+    report_ids = refresh_denormalized(
+        Report.objects.filter(agency_id=instance.agency_id).values_list('id', flat=True)
+    )
+    OutboxEvent.record(OutboxEvent.ENTITY_REPORT, report_ids)
+    if report_ids:
+        OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION,
+                           Report.institutions.through.objects.filter(report_id__in=report_ids)
+                                                              .values_list('institution_id', flat=True).distinct())
+
+
+@receiver([pre_save], sender=AgencyESGActivity)
+def do_check_activity_group_change(sender, instance, **kwargs):
+    # the activity type of a report is taken from the groups of its activities; compared against the values
+    # loaded from the database, without a query
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    instance._activity_group_changed = instance.indexed_fields_changed() and \
+        loaded.get('activity_group_id', models.DEFERRED) != instance.activity_group_id
+
+
+@receiver([post_save], sender=AgencyESGActivity)
+def do_refresh_denormalized_upon_activity_group_change(sender, instance, **kwargs):
+    if getattr(instance, '_activity_group_changed', False):
+        OutboxEvent.record(OutboxEvent.ENTITY_REPORT,
+                           refresh_denormalized(instance.reports.values_list('id', flat=True)))
+
+
+@receiver([post_save], sender=AgencyActivityGroup)
+def do_refresh_denormalized_upon_activity_type_change(sender, instance, **kwargs):
+    report_ids = Report.agency_esg_activities.through.objects \
+        .filter(agencyesgactivity__activity_group=instance) \
+        .values_list('report_id', flat=True).distinct()
+    OutboxEvent.record(OutboxEvent.ENTITY_REPORT, refresh_denormalized(report_ids))
+
+
+@receiver(m2m_changed, sender=Report.agency_esg_activities.through)
+@receiver(m2m_changed, sender=Report.contributing_agencies.through)
+def do_index_report_upon_relation_change(sender, instance, action, **kwargs):
+    if isinstance(instance, Report) and action in ('post_add', 'post_remove', 'post_clear'):
+        OutboxEvent.record(OutboxEvent.ENTITY_REPORT, instance.pk)
 
 
 @receiver([post_save], sender=Report)
 def do_index_report(sender, instance, **kwargs):
-    if 'test' not in sys.argv:
-        transaction.on_commit(lambda: index_report.delay(instance.id))
-        transaction.on_commit(lambda: meili_index_report.delay(instance.id))
+    # from the stored values, also on raw saves (fixtures)
+    refresh_denormalized([instance.id])
+    OutboxEvent.record(OutboxEvent.ENTITY_REPORT, instance.id)
 
 
 @receiver([pre_delete], sender=Report)
 def do_delete_report(sender, instance, **kwargs):
-    report_id = instance.id
-    programme_ids = [ p.id for p in instance.programme_set.iterator() ]
-    institution_ids = [ i.id for i in instance.institutions.iterator() ]
-    transaction.on_commit(lambda: index_delete_report.delay(report_id))
-    transaction.on_commit(lambda: meili_delete_report.delay(report_id, programme_ids, institution_ids))
+    # bulk deletions (see reports.deletion) record their changes once per chunk
+    if OutboxEvent.is_suppressed():
+        return
+    # programmes are deleted along with the report and recorded by their own signal
+    OutboxEvent.record(OutboxEvent.ENTITY_REPORT, instance.id, op=OutboxEvent.OP_DELETE)
+    OutboxEvent.record(OutboxEvent.ENTITY_INSTITUTION, instance.institutions.values_list('id', flat=True))
 
 
 @receiver([pre_save], sender=ReportFile)
@@ -1,7 +1,14 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
 from django.core.management import call_command, CommandError
 from django.test import TestCase
+from django.test.utils import override_settings
 from io import StringIO
 
+from reports.models import Report, ReportFile
+
 
 class ReportCommandsTest(TestCase):
     """
@@ -38,3 +45,27 @@ class ReportCommandsTest(TestCase):
     def test_reharvest_report_without_report_id_or_agency(self):
         with self.assertRaisesRegex(CommandError, 'Specify Agency, Report ID or --all.'):
             call_command('reharvest_reports')
+
+    def test_create_checksum_without_report_id_or_all(self):
+        with self.assertRaisesRegex(CommandError, 'Specify either Report ID or --all.'):
+            call_command('create_checksum_for_files')
+
+    def test_create_checksum_parallel(self):
+        media_root = tempfile.mkdtemp(prefix='test_media_')
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                report_file = ReportFile(report=Report.objects.get(id=1), file_display_name='Test File')
+                report_file.file.save('test.pdf', ContentFile(b'%PDF-1.4 test'), save=True)
+                checksum = report_file.file_checksum
+                ReportFile.objects.filter(id=report_file.id).update(file_checksum=None, file_checksum_date=None)
+
+                out = StringIO()
+                call_command('create_checksum_for_files', '--all', '--jobs=2', stdout=out)
+                self.assertIn('1 checksums were calculated', out.getvalue())
+                self.assertEqual(ReportFile.objects.get(id=report_file.id).file_checksum, checksum)
+
+                out = StringIO()
+                call_command('create_checksum_for_files', '--all', '--check', '--since', stdout=out)
+                self.assertIn('1 files were not modified since last checksum', out.getvalue())
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from institutions.models import Institution
+from outbox.models import OutboxEvent
+from programmes.models import Programme
+from reports.deletion import delete_reports
+from reports.models import Report
+
+
+class DeleteReportsTest(TestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'qf_ehea_level', 'eqar_decision_type', 'language',
+        'agency_activity_type', 'agency_focus', 'identifier_resource', 'flag', 'permission_type',
+        'agency_historical_field',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'institution_historical_field',
+        'institution_hierarchical_relationship_type',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+        'report_decision', 'report_status',
+        'users', 'report_demo_01'
+    ]
+
+    def setUp(self):
+        Report.objects.get(id=5).platforms.add(1)
+        for institution in Institution.objects.all():
+            institution.update_has_report()
+        OutboxEvent.objects.all().delete()
+
+    def events(self, entity, op=OutboxEvent.OP_UPSERT):
+        return set(OutboxEvent.objects.filter(entity=entity, op=op).values_list('object_id', flat=True))
+
+    def test_delete(self):
+        report_ids = list(Report.objects.filter(institutions__in=[1, 3]).values_list('id', flat=True).distinct())
+        programme_ids = set(Programme.objects.filter(report_id__in=report_ids).values_list('id', flat=True))
+        backup = BytesIO()
+        deleted = delete_reports(report_ids + [9999], backup=backup, chunk_size=3)
+        self.assertEqual(sorted(deleted), sorted(report_ids))
+        self.assertFalse(Report.objects.filter(id__in=report_ids).exists())
+
+        # one JSON line per report
+        lines = backup.getvalue().decode().splitlines()
+        self.assertEqual(sorted(json.loads(line)['id'] for line in lines), sorted(report_ids))
+
+        # index changes are recorded once per chunk
+        self.assertEqual(self.events(OutboxEvent.ENTITY_REPORT, OutboxEvent.OP_DELETE), set(report_ids))
+        self.assertEqual(self.events(OutboxEvent.ENTITY_PROGRAMME, OutboxEvent.OP_DELETE), programme_ids)
+        self.assertFalse(self.events(OutboxEvent.ENTITY_REPORT))
+        self.assertTrue({ 1, 2, 3 } <= self.events(OutboxEvent.ENTITY_INSTITUTION))
+
+        # has_report is recomputed, including for platforms
+        self.assertFalse(Institution.objects.get(id=1).has_report)
+        self.assertTrue(Institution.objects.get(id=2).has_report)
+        self.assertFalse(Institution.objects.get(id=3).has_report)
+
+    def test_dry_run(self):
+        backup = BytesIO()
+        self.assertEqual(delete_reports([1, 2], backup=backup, dry_run=True), [1, 2])
+        self.assertEqual(Report.objects.filter(id__in=[1, 2]).count(), 2)
+        self.assertEqual(len(backup.getvalue().splitlines()), 2)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_queries(self):
+        # the number of queries does not depend on the number of reports (all of institution 3, which keeps others)
+        with CaptureQueriesContext(connection) as few:
+            delete_reports([6], chunk_size=10)
+        with CaptureQueriesContext(connection) as many:
+            delete_reports([7, 8, 9], chunk_size=10)
+        self.assertEqual(len(many), len(few))
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            listing = os.path.join(media_root, 'list.csv')
+            with open(listing, 'w') as f:
+                f.write('agency,local_identifier\nACQUIN,EQARAG0021-EQARIN0002-01\nACQUIN,unknown\n')
+            out = StringIO()
+            call_command('delete_reports', listing, '--check', stdout=out)
+            self.assertIn('Report with Local ID unknown (ACQUIN) does not exist.', out.getvalue())
+            self.assertFalse(Report.objects.filter(id=2).exists())
+            backups = os.listdir(os.path.join(media_root, 'deleted-reports'))
+            self.assertEqual(len(backups), 1)
+            with gzip.open(os.path.join(media_root, 'deleted-reports', backups[0]), 'rt') as f:
+                self.assertEqual([ json.loads(line)['id'] for line in f ], [2])
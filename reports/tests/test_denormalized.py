@@ -0,0 +1,126 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from agencies.models import AgencyActivityGroup, AgencyESGActivity, AgencyFocusCountry
+from institutions.models import InstitutionCountry
+from outbox.models import OutboxEvent
+from reports.denormalized import refresh_denormalized
+from reports.reassignment import reassign_reports
+from reports.models import Report
+from reports.signals import do_check_activity_group_change
+
+
+class DenormalizedFieldsTest(TestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'qf_ehea_level', 'eqar_decision_type', 'language',
+        'agency_activity_type', 'agency_focus', 'identifier_resource', 'flag', 'permission_type',
+        'agency_historical_field',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'institution_historical_field',
+        'institution_hierarchical_relationship_type',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+        'report_decision', 'report_status',
+        'users', 'report_demo_01'
+    ]
+
+    def expected(self, report):
+        crossborder = False
+        for institution in report.institutions.all():
+            for ic in institution.institutioncountry_set.filter(country_verified=True):
+                if not report.agency.agencyfocuscountry_set.filter(country=ic.country, country_is_crossborder=False).exists():
+                    crossborder = True
+        return {
+            'valid_to_calculated': report.calculate_valid_to(),
+            'activity_type_id': Report.calculate_activity_type(a.activity_type_id for a in report.agency_esg_activities.all()),
+            'crossborder': crossborder,
+        }
+
+    def actual(self, report):
+        report.refresh_from_db()
+        return { field: getattr(report, field) for field in ('valid_to_calculated', 'activity_type_id', 'crossborder') }
+
+    def test_fixtures(self):
+        for report in Report.objects.all():
+            self.assertEqual(self.actual(report), self.expected(report))
+        self.assertTrue(Report.objects.filter(crossborder=True).exists())
+        self.assertTrue(Report.objects.filter(crossborder=False).exists())
+
+    def test_calculate_activity_type(self):
+        self.assertEqual(Report.calculate_activity_type([]), 2)
+        self.assertEqual(Report.calculate_activity_type([2, 4, 1]), 4)
+        self.assertEqual(Report.calculate_activity_type([1, 3, 4]), 3)
+
+    def test_report_save(self):
+        report = Report.objects.get(id=1)
+        report.valid_from = datetime.date(2020, 2, 29)
+        report.valid_to = None
+        report.save()
+        self.assertEqual(self.actual(report)['valid_to_calculated'], datetime.date(2026, 3, 1))
+        report.agency_esg_activities.set([3])
+        self.assertEqual(self.actual(report)['activity_type_id'], AgencyESGActivity.objects.get(id=3).activity_type_id)
+
+    def test_institution_country(self):
+        report = Report.objects.get(id=1)
+        self.assertFalse(report.crossborder)
+        OutboxEvent.objects.all().delete()
+        location = InstitutionCountry.objects.create(institution_id=1, country_id=74, country_verified=True)
+        self.assertTrue(self.actual(report)['crossborder'])
+        self.assertIn(1, OutboxEvent.objects.filter(entity=OutboxEvent.ENTITY_REPORT).values_list('object_id', flat=True))
+        location.delete()
+        self.assertFalse(self.actual(report)['crossborder'])
+
+    def test_focus_country(self):
+        report = Report.objects.get(id=5)
+        self.assertTrue(report.crossborder)
+        focus = AgencyFocusCountry.objects.get(agency_id=5, country_id=74)
+        focus.country_is_crossborder = False
+        focus.save()
+        self.assertFalse(self.actual(report)['crossborder'])
+        focus.delete()
+        self.assertTrue(self.actual(report)['crossborder'])
+
+    def test_reassign_reports(self):
+        report = Report.objects.get(id=1)
+        self.assertFalse(report.crossborder)
+        reassign_reports([1], 3)
+        self.assertTrue(self.actual(report)['crossborder'])
+
+    def test_activity_group(self):
+        report = Report.objects.get(id=2)
+        activity = report.agency_esg_activities.get()
+        group = AgencyActivityGroup.objects.exclude(activity_type_id=activity.activity_type_id).first()
+        activity.activity_group = group
+        # compared against the loaded values, without a query
+        with self.assertNumQueries(0):
+            do_check_activity_group_change(AgencyESGActivity, activity)
+        self.assertTrue(activity._activity_group_changed)
+        activity.save()
+        self.assertEqual(self.actual(report)['activity_type_id'], group.activity_type_id)
+        # unchanged since saved
+        activity.activity_description = 'not indexed'
+        do_check_activity_group_change(AgencyESGActivity, activity)
+        self.assertFalse(activity._activity_group_changed)
+        group.activity_type_id = 3
+        group.save()
+        self.assertEqual(self.actual(report)['activity_type_id'], 3)
+
+    def test_refresh_queries(self):
+        Report.objects.update(valid_to_calculated=None, activity_type=None, crossborder=False)
+        report_ids = list(Report.objects.values_list('id', flat=True))
+        # two queries and one bulk update per chunk
+        with self.assertNumQueries(3):
+            self.assertEqual(sorted(refresh_denormalized(report_ids)), sorted(report_ids))
+        with self.assertNumQueries(2):
+            self.assertEqual(refresh_denormalized(report_ids), [])
+
+    def test_command(self):
+        Report.objects.update(valid_to_calculated=None, activity_type=None, crossborder=False)
+        OutboxEvent.objects.all().delete()
+        out = StringIO()
+        call_command('set_reports_denormalized', stdout=out)
+        for report in Report.objects.all():
+            self.assertEqual(self.actual(report), self.expected(report))
+        self.assertEqual(OutboxEvent.objects.filter(entity=OutboxEvent.ENTITY_REPORT).count(), Report.objects.count())
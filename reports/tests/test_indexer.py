@@ -0,0 +1,86 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+import pysolr
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from reports.indexers.reports_indexer import ReportsIndexer
+from reports.models import Report
+
+
+class TestReportsIndexer(TestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'qf_ehea_level', 'eqar_decision_type', 'language',
+        'agency_activity_type', 'agency_focus', 'identifier_resource', 'flag', 'permission_type',
+        'agency_historical_field',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'institution_historical_field',
+        'institution_hierarchical_relationship_type',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+        'report_decision', 'report_status',
+        'users', 'report_demo_01'
+    ]
+
+    @staticmethod
+    def normalize(doc):
+        normalized = {}
+        for key, value in doc.items():
+            if key in ('contributing_agencies', 'institutions', 'programmes', 'report_files', 'report_links', 'countries'):
+                value = sorted(json.dumps(item, sort_keys=True) for item in json.loads(value))
+            elif isinstance(value, list):
+                value = sorted(value, key=str)
+            normalized[key] = value
+        return normalized
+
+    @patch('reports.indexers.reports_indexer.pysolr.Solr.add')
+    def test_index(self, mock_solr_add):
+        indexer = ReportsIndexer(1)
+        with patch('sys.stdout', new=StringIO()):
+            indexer.index()
+        mock_solr_add.assert_called_once_with([indexer.doc])
+        self.assertEqual(indexer.doc['id'], 1)
+        self.assertIn(Report.objects.get(id=1).agency_id, indexer.doc['agency_id'])
+
+    @patch('reports.indexers.reports_indexer.pysolr.Solr.commit')
+    @patch('reports.indexers.reports_indexer.pysolr.Solr.add')
+    def test_index_many(self, mock_solr_add, mock_solr_commit):
+        report_ids = list(Report.objects.order_by('id').values_list('id', flat=True))
+        with patch('sys.stdout', new=StringIO()):
+            ReportsIndexer.index_many(report_ids, chunk_size=2)
+        self.assertEqual(mock_solr_add.call_count, (len(report_ids) + 1) // 2)
+        for call in mock_solr_add.call_args_list:
+            self.assertEqual(call.kwargs, { 'commit': False })
+        mock_solr_commit.assert_called_once()
+        docs = { doc['id']: doc for call in mock_solr_add.call_args_list for doc in call.args[0] }
+        self.assertEqual(sorted(docs), report_ids)
+
+        # documents are the same as when indexing one by one
+        for report_id in report_ids:
+            indexer = ReportsIndexer(report_id)
+            with patch('sys.stdout', new=StringIO()):
+                indexer.index()
+            self.assertEqual(self.normalize(indexer.doc), self.normalize(docs[report_id]))
+
+    @patch('reports.indexers.reports_indexer.pysolr.Solr.commit')
+    @patch('reports.indexers.reports_indexer.pysolr.Solr.add')
+    def test_index_many_queries(self, mock_solr_add, mock_solr_commit):
+        report_ids = list(Report.objects.values_list('id', flat=True))
+        # the reports and at most one query per prefetched relation
+        max_queries = 1 + sum(len(getattr(lookup, 'prefetch_through', lookup).split('__'))
+                              for lookup in ReportsIndexer.PREFETCH)
+        with patch('sys.stdout', new=StringIO()):
+            with CaptureQueriesContext(connection) as queries:
+                ReportsIndexer.index_many(report_ids)
+        self.assertLessEqual(len(queries), max_queries)
+
+    @patch('reports.indexers.reports_indexer.pysolr.Solr.commit')
+    @patch('reports.indexers.reports_indexer.pysolr.Solr.add')
+    def test_index_many_solr_error(self, mock_solr_add, mock_solr_commit):
+        mock_solr_add.side_effect = pysolr.SolrError("Solr error")
+        out = StringIO()
+        with patch('sys.stdout', new=out):
+            ReportsIndexer.index_many([1, 2])
+        self.assertEqual(out.getvalue(), "Error with Reports No. 1-2! Error: Solr error\n")
@@ -1,3 +1,7 @@
+import csv
+import io
+import json
+
 from django.conf import settings
 from django.core.management import call_command
 from django.contrib.auth.models import User
@@ -9,6 +13,8 @@ from urllib.parse import urljoin
 import requests
 from freezegun import freeze_time
 
+from accounts.models import DEQARProfile
+from agencies.models import SubmittingAgency
 from reports.models import Report
 from reports.indexers.report_meili_indexer import ReportIndexer
 
@@ -31,7 +37,7 @@ class ReportMeiliTest(APITestCase):
         'programme_demo_10', 'programme_demo_11', 'programme_demo_12',
         'report_decision', 'report_status',
         'users', 'report_demo_01',
-        'report_demo_ap_01',
+        'report_demo_ap_01', 'submitting_agency_demo',
     ]
 
     def setUp(self):
@@ -47,6 +53,7 @@ class ReportMeiliTest(APITestCase):
                                              email='testuser@eqar.eu',
                                              password='testpassword')
         user.save()
+        self.user = user
         token = Token.objects.get(user__username='testuser')
         self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token.key)
 
@@ -171,3 +178,82 @@ class ReportMeiliTest(APITestCase):
         response = self.requests.get(urljoin(settings.MEILI_API_URL, f'indexes/{self.indexer.meili.INDEX_REPORTS}/documents/{report.id}'))
         self.assertEqual(response.status_code, 404)
 
+
+    def test_cursor_pagination(self):
+        """
+        page through all reports using cursors, by id and by a sort key
+        """
+        for ordering in [ '', '-valid_from' ]:
+            ids = []
+            params = { 'cursor': '*', 'limit': 5, 'ordering': ordering }
+            while params['cursor']:
+                response = self.client.get('/webapi/v2/browse/reports/', params)
+                self.assertEqual(response.status_code, 200)
+                ids += [ r['id'] for r in response.data['results'] ]
+                params['cursor'] = response.data['next_cursor']
+            self.assertEqual(len(ids), 13)
+            self.assertEqual(len(set(ids)), 13)
+
+        response = self.client.get('/webapi/v2/browse/reports/', { 'offset': 3, 'limit': 5, 'ordering': 'valid_from' })
+        by_offset = [ r['id'] for r in response.data['results'] ]
+        response = self.client.get('/webapi/v2/browse/reports/', { 'offset': 0, 'limit': 8, 'ordering': 'valid_from' })
+        self.assertEqual(by_offset, [ r['id'] for r in response.data['results'] ][3:])
+
+        response = self.client.get('/webapi/v2/browse/reports/', { 'cursor': '*', 'ordering': 'flag' })
+        self.assertEqual(response.status_code, 400)
+
+    def test_export(self):
+        """
+        export all reports matching filters as NDJSON and CSV
+        """
+        response = self.client.get('/webapi/v2/browse/reports/', { 'export': 'ndjson' })
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 13)
+        self.assertEqual(len({ json.loads(line)['id'] for line in lines }), 13)
+
+        response = self.client.get('/webapi/v2/browse/reports/', { 'export': 'csv', 'country_id': '74' })
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 6)
+        self.assertIn('agency_acronym', rows[0])
+
+    def test_admin_report_search(self):
+        """
+        run queries through the Meilisearch-based Admin API report search
+        """
+        url = '/adminapi/v1/browse/%s/reports/meili/'
+        response = self.client.get(url % 'all', {})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 13)
+        self.assertEqual(response.data['facets']['facet_fields']['agency_facet'], [ "ACQUIN", 13 ])
+        result = response.data['results'][0]
+        for field in [ 'id', 'local_id', 'agency_acronym', 'country', 'agency_esg_activity', 'agency_esg_activity_type',
+                       'institution_programme_primary', 'valid_from', 'valid_to', 'flag_level',
+                       'date_created', 'date_updated' ]:
+            self.assertIn(field, result)
+
+        response = self.client.get(url % 'all', { 'agency': 'ACQUIN', 'country': 'Germany' })
+        self.assertEqual(response.data['count'], 12)
+        response = self.client.get(url % 'all', { 'id': Report.objects.first().id })
+        self.assertEqual(response.data['count'], 1)
+        response = self.client.get(url % 'all', { 'ordering': 'valid_from', 'limit': 1 })
+        self.assertEqual(response.data['results'][0]['valid_from'], '2010-03-23T00:00:00Z')
+
+        # submitting for an agency without reports, not the creator of any report
+        DEQARProfile.objects.create(user=self.user, submitting_agency=SubmittingAgency.objects.get(pk=2))
+        response = self.client.get(url % 'my', {})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+
+        # reports created by the user
+        Report.objects.filter(pk=Report.objects.first().id).update(created_by=self.user)
+        call_command('index_reports_meili', '--sync')
+        response = self.client.get(url % 'my', {})
+        self.assertEqual(response.data['count'], 1)
+
+        # reports of the submitting agency
+        self.user.deqarprofile.submitting_agency = SubmittingAgency.objects.get(pk=1)
+        self.user.deqarprofile.save()
+        response = self.client.get(url % 'my', {})
+        self.assertEqual(response.data['count'], 13)
@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from institutions.models import Institution, InstitutionHierarchicalRelationship, \
+    HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM
+from outbox.models import OutboxEvent
+from reports.models import Report
+from reports.reassignment import reassign_reports
+
+
+class ReassignReportsTest(TestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'qf_ehea_level', 'eqar_decision_type', 'language',
+        'agency_activity_type', 'agency_focus', 'identifier_resource', 'flag', 'permission_type',
+        'agency_historical_field',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'institution_historical_field',
+        'institution_hierarchical_relationship_type',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+        'report_decision', 'report_status',
+        'users', 'report_demo_01'
+    ]
+
+    def setUp(self):
+        # one report linked to both the old and the new institution, one as platform of the old institution
+        Report.objects.get(id=2).institutions.add(3)
+        Report.objects.get(id=1).platforms.add(2)
+        for institution in Institution.objects.all():
+            institution.update_has_report()
+        OutboxEvent.objects.all().delete()
+        self.report_ids = set(Report.objects.filter(institutions=2).values_list('id', flat=True))
+
+    def test_reassign(self):
+        changed = reassign_reports([2], 3)
+        self.assertEqual(set(changed['institutions']), self.report_ids)
+        self.assertEqual(changed['platforms'], [1])
+        self.assertFalse(Report.objects.filter(institutions=2).exists())
+        self.assertFalse(Report.objects.filter(platforms=2).exists())
+        for report_id in self.report_ids:
+            self.assertEqual(Report.institutions.through.objects.filter(report_id=report_id, institution_id=3).count(), 1)
+        self.assertTrue(Report.objects.filter(id=1, platforms=3).exists())
+        self.assertFalse(Institution.objects.get(id=2).has_report)
+        self.assertTrue(Institution.objects.get(id=3).has_report)
+        # one reindex recorded for all changed reports and both institutions
+        self.assertEqual(set(OutboxEvent.objects.filter(entity=OutboxEvent.ENTITY_REPORT)
+                                                .values_list('object_id', flat=True)), self.report_ids | { 1 })
+        self.assertTrue({ 2, 3 } <= set(OutboxEvent.objects.filter(entity=OutboxEvent.ENTITY_INSTITUTION)
+                                                           .values_list('object_id', flat=True)))
+
+    def test_platform_relationships(self):
+        # report 1 has institution 1, and its platform is moved from institution 2 to 3
+        relationships = InstitutionHierarchicalRelationship.objects.filter(
+            relationship_type_id=HIERARCHICAL_TYPE_EDUCATIONAL_PLATFORM)
+        self.assertFalse(relationships.filter(institution_parent_id=3, institution_child_id=1).exists())
+        reassign_reports([2], 3)
+        self.assertEqual(relationships.filter(institution_parent_id=3, institution_child_id=1).count(), 1)
+        self.assertTrue({ 1, 3 } <= set(OutboxEvent.objects.filter(entity=OutboxEvent.ENTITY_INSTITUTION)
+                                                           .values_list('object_id', flat=True)))
+        # existing relationships are not duplicated
+        Report.objects.get(id=1).platforms.add(2)
+        reassign_reports([2], 3)
+        self.assertEqual(relationships.filter(institution_parent_id=3, institution_child_id=1).count(), 1)
+
+    def test_reassign_queries(self):
+        # the number of queries does not depend on the number of reports moved
+        with CaptureQueriesContext(connection) as few:
+            reassign_reports([2], 3, relations=['institutions'])
+        self.assertGreater(Report.objects.filter(institutions=3).count(), len(self.report_ids))
+        with CaptureQueriesContext(connection) as many:
+            reassign_reports([3], 2, relations=['institutions'])
+        # apart from updating has_report of the institutions whose flag changed
+        count = lambda context: len([ q for q in context if not q['sql'].startswith('UPDATE "deqar_institutions"') ])
+        self.assertEqual(count(few), count(many))
+
+    def test_command_dry_run(self):
+        out = StringIO()
+        call_command('reports_institution_change', '--from=2', '--to=3', '--dry-run', stdout=out)
+        self.assertIn(f'Total {len(self.report_ids)} report(s) modified via institutions!', out.getvalue())
+        self.assertEqual(set(Report.objects.filter(institutions=2).values_list('id', flat=True)), self.report_ids)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command('reports_institution_change', '--from=2', '--to=3', stdout=out)
+        self.assertFalse(Report.objects.filter(institutions=2).exists())
+        with self.assertRaisesRegex(CommandError, r'Institution \(to\) cannot be found'):
+            call_command('reports_institution_change', '--from=2', '--to=9999', stdout=out)
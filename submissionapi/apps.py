@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class SubmissionapiConfig(AppConfig):
     name = 'submissionapi'
+
+    def ready(self):
+        super(SubmissionapiConfig, self).ready()
+        from submissionapi.signals import do_remove_partial_file
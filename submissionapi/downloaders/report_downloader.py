@@ -1,4 +1,3 @@
-import hashlib
 import filetype
 import tempfile
 
@@ -9,7 +8,7 @@ from django.conf import settings
 from django.core.files import File
 from django.core.management import color_style
 
-from reports.models import ReportFile
+from reports.models import ReportFile, file_checksum
 from urllib.parse import unquote, urlparse
 from email.message import Message
 
@@ -99,7 +98,7 @@ class ReportDownloader:
 
             # Check if the downloaded file is different from the old file
             tmp.seek(0)
-            checksum = hashlib.md5(tmp.read()).hexdigest()
+            checksum = file_checksum(tmp)
 
             # If the two checksums are different, update the file and remove the old one,
             # if they are identical discard the temp file
@@ -116,7 +115,7 @@ class ReportDownloader:
 
     def _remove_old_file(self):
         if self.old_file_path:
-            self.report_file.file.storage.delete(self.old_file_path)
+            self.report_file.delete_stored_file(self.old_file_path, self.old_checksum)
 
     def _get_filename(self, response):
         """
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from submissionapi.models import ReportFileUpload
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable report file uploads that were not continued for ' \
+           'REPORT_FILE_UPLOAD_EXPIRY_HOURS, together with their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", "-n", action='store_true',
+                            help="Only show how many uploads would be deleted, but do not actually delete")
+
+    def handle(self, *args, dry_run, **options):
+        if dry_run:
+            expired = ReportFileUpload.objects.filter(updated_at__lt=ReportFileUpload.expiry_date())
+            self.stdout.write(f'{expired.count()} uploads older than {settings.REPORT_FILE_UPLOAD_EXPIRY_HOURS} hours')
+            self.stdout.write('--- dry run, nothing deleted ---')
+            return
+        uploads, files = ReportFileUpload.delete_expired()
+        self.stdout.write(f'deleted {uploads} uploads and {files} orphaned partial files')
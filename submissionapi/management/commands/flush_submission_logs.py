@@ -1,15 +1,23 @@
+import gzip
+import json
+import os
+import time
+
 from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Min, Max
 
 from django.conf import settings
 
 from datetime import datetime, timedelta
 
-from submissionapi.models import SubmissionPackageLog
+from submissionapi.models import SubmissionPackageLog, SubmissionReportLog
 
 class Command(BaseCommand):
     help = 'Flush old submission log entries'
 
     PAGESIZE = 5000
+    ARCHIVE_FIELDS = ('id', 'user_id', 'user_ip_address', 'origin', 'submission_date', 'submission_errors', 'submitted_data')
 
     def add_arguments(self, parser):
         parser.add_argument("--dry-run", "-n", action='store_true',
@@ -18,8 +26,14 @@ class Command(BaseCommand):
                             help="Delete the whole log")
         parser.add_argument("--days-ago", "-d", type=int,
                             help="Delete log entries older than the specified number of days")
+        parser.add_argument("--batch-size", "-b", type=int, default=self.PAGESIZE,
+                            help=f"Number of IDs to delete per batch/transaction (default: {self.PAGESIZE})")
+        parser.add_argument("--pause", "-p", type=float, default=0,
+                            help="Seconds to wait between batches, to let other transactions proceed")
+        parser.add_argument("--archive", metavar="DIR",
+                            help="Save entries to a gzip-compressed NDJSON file in DIR before deleting them")
 
-    def handle(self, *args, dry_run, flush_all, days_ago, **options):
+    def handle(self, *args, dry_run, flush_all, days_ago, batch_size, pause, archive, **options):
         log_all = SubmissionPackageLog.objects.all()
         if flush_all:
             to_delete = log_all
@@ -28,17 +42,45 @@ class Command(BaseCommand):
             to_delete = log_all.filter(submission_date__lt=delete_before)
         else:
             raise CommandError('You need to specify either --flush-all or --days-ago')
+        if batch_size < 1:
+            raise CommandError('--batch-size must be a positive number')
 
         self.stdout.write(f'Deleting {to_delete.count()} of {log_all.count()} log entries...')
 
-        if not dry_run:
-            i = 0
-            for obj in to_delete.iterator():
-                if i % 100 == 0:
-                    self.stdout.write(f'\rdeleted {i} entries', ending='')
-                obj.delete()
-                i += 1
-            self.stdout.write(f'\rdeleted {i} entries')
-        else:
+        if dry_run:
             self.stdout.write('--- dry run, nothing deleted ---')
+            return
+
+        id_range = to_delete.aggregate(first=Min('id'), last=Max('id'))
+        if id_range['first'] is None:
+            self.stdout.write('deleted 0 entries')
+            return
+
+        archive_file = None
+        if archive:
+            os.makedirs(archive, exist_ok=True)
+            archive_path = os.path.join(archive, f'submission-log-{datetime.now().strftime("%Y%m%d_%H%M%S")}.ndjson.gz')
+            archive_file = gzip.open(archive_path, 'wt', encoding='utf-8')
+
+        i = 0
+        try:
+            for start in range(id_range['first'], id_range['last'] + 1, batch_size):
+                batch = to_delete.filter(id__gte=start, id__lt=start + batch_size)
+                with transaction.atomic():
+                    if archive_file:
+                        for entry in batch.order_by('id').values(*self.ARCHIVE_FIELDS).iterator():
+                            archive_file.write(json.dumps(entry, default=str) + '\n')
+                    # report logs have no dependants, so this is one set-based DELETE
+                    SubmissionReportLog.objects.filter(submission_package_log__in=batch.values('id')).delete()
+                    deleted, _ = batch.only('id').delete()
+                i += deleted
+                self.stdout.write(f'\rdeleted {i} entries', ending='')
+                if pause:
+                    time.sleep(pause)
+        finally:
+            if archive_file:
+                archive_file.close()
 
+        self.stdout.write(f'\rdeleted {i} entries')
+        if archive_file:
+            self.stdout.write(f'archived to {archive_path}')
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lists', '0009_auto_20230913_1027'),
+        ('reports', '0042_reportfile_file_checksum_date'),
+        ('submissionapi', '0009_submissionpackagelog_submission_errors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportFileUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('languages', models.ManyToManyField(to='lists.language')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reports.report')),
+                ('report_file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='reports.reportfile')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'deqar_submission_report_file_upload',
+            },
+        ),
+    ]
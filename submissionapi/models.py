@@ -1,5 +1,10 @@
 import datetime
+import os
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class SubmissionPackageLog(models.Model):
@@ -32,3 +37,78 @@ class SubmissionReportLog(models.Model):
     class Meta:
         db_table = 'deqar_submission_report_log'
 
+
+
+class ReportFileUpload(models.Model):
+    """
+    Resumable upload of a report file, received in chunks and appended to a partial file until complete.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    report = models.ForeignKey('reports.Report', on_delete=models.CASCADE)
+    report_file = models.ForeignKey('reports.ReportFile', on_delete=models.CASCADE, blank=True, null=True)
+    file_name = models.CharField(max_length=255)
+    languages = models.ManyToManyField('lists.Language')
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def partial_file_path(self):
+        return os.path.join(settings.MEDIA_ROOT, settings.REPORT_FILE_UPLOAD_DIRECTORY, str(self.id))
+
+    @property
+    def complete(self):
+        return self.offset >= self.size
+
+    @staticmethod
+    def expiry_date():
+        """
+        Uploads last continued before this date are expired
+        """
+        return timezone.now() - datetime.timedelta(hours=settings.REPORT_FILE_UPLOAD_EXPIRY_HOURS)
+
+    @staticmethod
+    def remove_partial_file(path):
+        """
+        Remove a partial file; called once the deletion of the upload is committed (see submissionapi.signals)
+        """
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def delete_expired(cls):
+        """
+        Delete expired uploads, and partial files that belong to no upload and were not changed since the expiry
+        date. Returns the number of uploads and orphaned files removed.
+        """
+        expiry_date = cls.expiry_date()
+        _, deleted = cls.objects.filter(updated_at__lt=expiry_date).delete()
+        uploads = deleted.get(cls._meta.label, 0)
+
+        files = 0
+        directory = os.path.join(settings.MEDIA_ROOT, settings.REPORT_FILE_UPLOAD_DIRECTORY)
+        if os.path.isdir(directory):
+            with os.scandir(directory) as entries:
+                candidates = {
+                    entry.name: entry.path for entry in entries
+                    if entry.is_file() and entry.stat().st_mtime < expiry_date.timestamp()
+                }
+            valid_ids = []
+            for name in candidates:
+                try:
+                    valid_ids.append(uuid.UUID(name))
+                except ValueError:
+                    pass
+            existing = { str(upload_id) for upload_id in cls.objects.filter(id__in=valid_ids).values_list('id', flat=True) }
+            for name, path in candidates.items():
+                if name not in existing:
+                    os.remove(path)
+                    files += 1
+        return uploads, files
+
+    class Meta:
+        db_table = 'deqar_submission_report_file_upload'
@@ -1,5 +1,4 @@
 from django.core.exceptions import ObjectDoesNotExist
-from django.core.files.base import ContentFile
 from django.db import transaction
 
 from reports.models import ReportFile
@@ -29,11 +28,11 @@ class ReportFilePopulator():
         if original_location != "":
             self._create_report_file_from_original_location(original_location, file_display_name, languages)
 
-        # If file object was submitted as base64, save it to the disk and also generate checksum
+        # If file object was submitted (as base64 or upload), save it to the disk and also generate checksum
         file = self.report_file_data.get('file', None)
         file_name = self.report_file_data.get('file_name', None)
         if file:
-            self._create_report_file_from_base64_object(file, file_name, languages)
+            self._create_report_file_from_file_object(file, file_name, languages)
 
     def report_file_update(self):
         """
@@ -48,11 +47,11 @@ class ReportFilePopulator():
             if original_location != "":
                 self._update_report_file_from_original_location(original_location, file_display_name, languages)
 
-            # If file object was submitted as base64, save it to the disk and also generate checksum
+            # If file object was submitted (as base64 or upload), save it to the disk and also generate checksum
             file = self.report_file_data.get('file', None)
             file_name = self.report_file_data.get('file_name', None)
             if file:
-                self._update_report_file_from_base64_object(file, file_name, languages)
+                self._update_report_file_from_file_object(file, file_name, languages)
 
         except ObjectDoesNotExist:
             pass
@@ -96,21 +95,21 @@ class ReportFilePopulator():
             self.report_file.languages.add(lang)
 
 
-    def _create_report_file_from_base64_object(self, file, file_name, languages):
+    def _create_report_file_from_file_object(self, file, file_name, languages):
         rf = self.report.reportfile_set.create(
             file_display_name=file_name,
             download_status=ReportFile.DOWNLOAD_STATUS_PENDING
         )
-        content = ContentFile(b''.join(file.chunks()))
-        rf.file.save(file_name, content, save=True)
+        rf.store_file(file_name, file)
+        self.report_file = rf
         ReportFile.objects.filter(pk=rf.pk).update(download_status=ReportFile.DOWNLOAD_STATUS_SUCCESS)
         for lang in languages:
             rf.languages.add(lang)
 
-    def _update_report_file_from_base64_object(self, file, file_name, languages):
-        self.report_file.file.delete(save=False)
-        content = ContentFile(b''.join(file.chunks()))
-        self.report_file.file.save(file_name, content, save=True)
+    def _update_report_file_from_file_object(self, file, file_name, languages):
+        if self.report_file.file:
+            self.report_file.delete_stored_file(self.report_file.file.name, self.report_file.file_checksum)
+        self.report_file.store_file(file_name, file)
         ReportFile.objects.filter(pk=self.report_file.pk).update(download_status=ReportFile.DOWNLOAD_STATUS_SUCCESS)
         self.report_file.languages.clear()
         for lang in languages:
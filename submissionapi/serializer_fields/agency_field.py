@@ -3,14 +3,28 @@ from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
 
 from agencies.models import Agency
+from submissionapi.serializer_fields.lookup_cache_mixin import LookupCacheMixin
 
 
-class AgencyField(serializers.Field):
+class AgencyField(LookupCacheMixin, serializers.Field):
     def to_internal_value(self, data):
         if not isinstance(data, six.text_type):
             msg = 'Incorrect type. Expected a string, but got %s'
             raise serializers.ValidationError(msg % type(data).__name__)
 
+        agency = self.cached_lookup(data.lower(), lambda: self.get_agency(data))
+
+        if 'request' in self.context:
+            user = self.context['request'].user
+            submitting_agency = user.deqarprofile.submitting_agency
+            if not self.cached_lookup(('allowed', agency.id), lambda: submitting_agency.agency_allowed(agency)):
+                raise serializers.ValidationError("You can't submit data to this Agency.")
+            return agency
+        else:
+            return agency
+
+    @staticmethod
+    def get_agency(data):
         if data.isdigit():
             try:
                 agency = Agency.objects.get(deqar_id=data)
@@ -22,11 +36,4 @@ class AgencyField(serializers.Field):
             except ObjectDoesNotExist:
                 raise serializers.ValidationError("Please provide valid Agency Acronym.")
 
-        if 'request' in self.context:
-            user = self.context['request'].user
-            submitting_agency = user.deqarprofile.submitting_agency
-            if not submitting_agency.agency_allowed(agency):
-                raise serializers.ValidationError("You can't submit data to this Agency.")
-            return agency
-        else:
-            return agency
+        return agency
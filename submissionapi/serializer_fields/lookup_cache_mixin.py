@@ -0,0 +1,16 @@
+class LookupCacheMixin:
+    """
+    Share lookups between submission packages of the same request.
+
+    If the serializer context holds a 'lookup_cache' dict, successful lookups are stored there and
+    re-used by the same field type for the same value, so a batch resolves each value only once.
+    Without such a dict, every lookup is done as before.
+    """
+    def cached_lookup(self, key, lookup):
+        cache = self.context.get('lookup_cache', None)
+        if cache is None:
+            return lookup()
+        key = (self.__class__.__name__, key)
+        if key not in cache:
+            cache[key] = lookup()
+        return cache[key]
@@ -3,14 +3,19 @@ from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
 
 from reports.models import ReportStatus
+from submissionapi.serializer_fields.lookup_cache_mixin import LookupCacheMixin
 
 
-class ReportStatusField(serializers.Field):
+class ReportStatusField(LookupCacheMixin, serializers.Field):
     def to_internal_value(self, data):
         if not isinstance(data, six.text_type):
             msg = 'Incorrect type. Expected a string, but got %s'
             raise serializers.ValidationError(msg % type(data).__name__)
 
+        return self.cached_lookup(data.lower(), lambda: self.get_status(data))
+
+    @staticmethod
+    def get_status(data):
         if data.isdigit():
             try:
                 status = ReportStatus.objects.get(pk=data)
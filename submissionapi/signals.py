@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from submissionapi.models import ReportFileUpload
+
+
+@receiver(post_delete, sender=ReportFileUpload)
+def do_remove_partial_file(sender, instance, **kwargs):
+    """
+    Remove the partial file of a deleted upload, also when it is deleted in bulk or along with its report
+    """
+    # the primary key is cleared once deletion is complete, so the path is determined now
+    path = instance.partial_file_path
+    transaction.on_commit(lambda: ReportFileUpload.remove_partial_file(path))
@@ -11,6 +11,7 @@ import requests
 from reports.models import ReportFile
 from submissionapi.downloaders.report_downloader import ReportDownloader, RetryHTTPError
 from submissionapi.flaggers.report_flagger import ReportFlagger
+from submissionapi.models import ReportFileUpload
 
 logger = logging.getLogger(__name__)
 
@@ -114,3 +115,9 @@ def send_submission_email(response, institution_id_max, total_submission, agency
 def recheck_flag(report, agency_email=None):
     report_flagger = ReportFlagger(report=report, agency_email=agency_email)
     report_flagger.check_and_set_flags()
+
+
+@task(name="clean_report_file_uploads")
+def clean_report_file_uploads():
+    uploads, files = ReportFileUpload.delete_expired()
+    logger.info(f'Deleted {uploads} expired report file uploads and {files} orphaned partial files')
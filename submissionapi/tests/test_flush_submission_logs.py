@@ -0,0 +1,55 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from accounts.models import DEQARProfile
+from agencies.models import SubmittingAgency
+from submissionapi.models import SubmissionPackageLog
+
+
+class FlushSubmissionLogsTest(TestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'qf_ehea_level', 'eqar_decision_type', 'language',
+        'agency_activity_type', 'agency_focus', 'identifier_resource', 'flag', 'permission_type', 'degree_outcome',
+        'agency_historical_field',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'submitting_agency_demo',
+    ]
+
+    def setUp(self):
+        user = User.objects.create_user(username='testuser', email='testuser@eqar.eu', password='testpassword')
+        profile = DEQARProfile.objects.create(user=user, submitting_agency=SubmittingAgency.objects.get(pk=1))
+        for i in range(5):
+            SubmissionPackageLog.objects.create(user=profile, origin='api-v2', submitted_data=json.dumps({'n': i}))
+
+    def test_flush_without_option(self):
+        with self.assertRaisesRegex(CommandError, 'You need to specify either --flush-all or --days-ago'):
+            call_command('flush_submission_logs')
+
+    def test_flush_dry_run(self):
+        out = StringIO()
+        call_command('flush_submission_logs', '--flush-all', '--dry-run', stdout=out)
+        self.assertIn('Deleting 5 of 5 log entries', out.getvalue())
+        self.assertEqual(SubmissionPackageLog.objects.count(), 5)
+
+    def test_flush_in_batches_with_archive(self):
+        archive = tempfile.mkdtemp(prefix='test_archive_')
+        try:
+            out = StringIO()
+            call_command('flush_submission_logs', '--flush-all', '--batch-size=2', f'--archive={archive}', stdout=out)
+            self.assertIn('deleted 5 entries', out.getvalue())
+            self.assertEqual(SubmissionPackageLog.objects.count(), 0)
+            files = os.listdir(archive)
+            self.assertEqual(len(files), 1)
+            with gzip.open(os.path.join(archive, files[0]), 'rt') as f:
+                entries = [json.loads(line) for line in f]
+            self.assertEqual([json.loads(e['submitted_data'])['n'] for e in entries], [0, 1, 2, 3, 4])
+        finally:
+            shutil.rmtree(archive, ignore_errors=True)
@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from accounts.models import DEQARProfile
+from agencies.models import SubmittingAgency
+from reports.models import Report
+from submissionapi.models import SubmissionPackageLog
+
+
+class SubmissionAPIV2BatchTest(APITestCase):
+    fixtures = [
+        'country_qa_requirement_type', 'country', 'qf_ehea_level', 'eqar_decision_type', 'language',
+        'agency_activity_type', 'agency_focus', 'identifier_resource', 'flag', 'permission_type', 'degree_outcome',
+        'agency_historical_field',
+        'agency_demo_01', 'agency_demo_02', 'association',
+        'submitting_agency_demo',
+        'institution_historical_field',
+        'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+        'programme_demo_01', 'programme_demo_02', 'programme_demo_03',
+        'programme_demo_04', 'programme_demo_05', 'programme_demo_06',
+        'programme_demo_07', 'programme_demo_08', 'programme_demo_09',
+        'programme_demo_10', 'programme_demo_11', 'programme_demo_12',
+        'report_decision', 'report_status',
+        'users', 'report_demo_01'
+    ]
+
+    def setUp(self):
+        self.valid_data = {
+            "agency": "ACQUIN",
+            "valid_from": "2010-05-05",
+            "date_format": "%Y-%M-%d",
+            "activities": [
+                {
+                    "id": "1"
+                }
+            ],
+            "status": "1",
+            "decision": "1",
+            "institutions": [
+                {
+                    "eter_id": "DE0392"
+                }
+            ],
+            "programmes": [
+                {
+                    "name_primary": "Programme name",
+                    "degree_outcome": "1",
+                    "qf_ehea_level": "1"
+                }
+            ]
+        }
+        self.user = User.objects.create_user(username='testuser',
+                                             email='testuser@eqar.eu',
+                                             password='testpassword')
+        self.user.save()
+        self.token = Token.objects.get(user__username='testuser')
+        submitting_agency = SubmittingAgency.objects.get(pk=1)
+        self.deqar_profile = DEQARProfile.objects.create(user=self.user, submitting_agency=submitting_agency)
+        self.deqar_profile.save()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+    @patch('submissionapi.v2.submission_batch_handler.send_submission_email.delay')
+    def test_batch_submission(self, mocked_email):
+        invalid_data = self.valid_data.copy()
+        invalid_data['status'] = "99"
+        data = [
+            dict(self.valid_data, local_identifier='BATCH-1'),
+            invalid_data,
+            dict(self.valid_data, local_identifier='BATCH-2'),
+        ]
+        response = self.client.post('/submissionapi/v2/submit/reports', data=data, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([r['submission_status'] for r in response.data], ['success', 'errors', 'success'])
+        self.assertEqual([r['index'] for r in response.data], [0, 1, 2])
+        self.assertIn('status', response.data[1]['errors'])
+        self.assertTrue(Report.objects.filter(local_identifier='BATCH-1').exists())
+        self.assertTrue(Report.objects.filter(local_identifier='BATCH-2').exists())
+        # one package log and one email for the whole batch
+        self.assertEqual(SubmissionPackageLog.objects.filter(origin='api-batch').count(), 1)
+        mocked_email.assert_called_once()
+        self.assertEqual(len(mocked_email.call_args.kwargs['response']), 2)
+        self.assertEqual(mocked_email.call_args.kwargs['total_submission'], 3)
+
+    @patch('submissionapi.v2.submission_batch_handler.send_submission_email.delay')
+    def test_batch_update(self, mocked_email):
+        response = self.client.post('/submissionapi/v2/submit/reports',
+                                    data=[dict(self.valid_data, local_identifier='BATCH-UPDATE')], format='json')
+        self.assertEqual(response.data[0]['submission_status'], 'success', response.data)
+        response = self.client.put('/submissionapi/v2/submit/reports',
+                                   data=[dict(self.valid_data, local_identifier='BATCH-UPDATE', decision="2")], format='json')
+        self.assertEqual(response.data[0]['submission_status'], 'success', response.data)
+        self.assertEqual(Report.objects.get(local_identifier='BATCH-UPDATE').decision_id, 2)
+
+    def test_batch_submission_not_a_list(self):
+        response = self.client.post('/submissionapi/v2/submit/reports', data=self.valid_data, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(SUBMISSION_BATCH_MAX_PACKAGES=1)
+    def test_batch_submission_too_large(self):
+        response = self.client.post('/submissionapi/v2/submit/reports', data=[self.valid_data, self.valid_data], format='json')
+        self.assertEqual(response.status_code, 400)
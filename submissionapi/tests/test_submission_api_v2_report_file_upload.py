@@ -0,0 +1,202 @@
+import base64
+import datetime
+import hashlib
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from accounts.models import DEQARProfile
+from agencies.models import AgencyProxy, SubmittingAgency
+from reports.models import Report, ReportFile
+from submissionapi.models import ReportFileUpload
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SubmissionAPIV2ReportFileUploadTest(APITestCase):
+    fixtures = ['agency_activity_type', 'agency_focus',
+                'identifier_resource',
+                'association',
+                'country_historical_field',
+                'country_qa_requirement_type', 'country',
+                'language', 'qf_ehea_level',
+                'report_decision', 'report_status',
+                'flag', 'permission_type',
+                'degree_outcome',
+                'eqar_decision_type',
+                'agency_historical_field',
+                'agency_demo_01', 'agency_demo_02',
+                'institution_historical_field',
+                'institution_demo_01', 'institution_demo_02', 'institution_demo_03',
+                'users', 'report_demo_01',
+                'submitting_agency_demo']
+
+    def setUp(self):
+        current_dir = os.path.dirname(os.path.realpath(__file__))
+        with open(os.path.join(current_dir, "file_base64", "file.txt"), 'r') as file:
+            self.pdf = base64.b64decode(file.read())
+
+        self.user = User.objects.create_user(username='testuser',
+                                             email='testuser@eqar.eu',
+                                             password='testpassword')
+        self.token = Token.objects.get(user__username='testuser')
+        submitting_agency = SubmittingAgency.objects.get(pk=1)
+        DEQARProfile.objects.create(user=self.user, submitting_agency=submitting_agency)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+    def test_multipart_upload(self):
+        response = self.client.post('/submissionapi/v2/manage/report-file/upload', data={
+            'report_id': 1,
+            'report_language': ['eng', 'ger'],
+            'file': SimpleUploadedFile('uploaded_report.pdf', self.pdf, content_type='application/pdf'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+        rf = ReportFile.objects.get(pk=response.data['report_file_id'])
+        self.assertEqual(rf.report_id, 1)
+        self.assertEqual(rf.file_display_name, 'uploaded_report.pdf')
+        self.assertEqual(rf.languages.count(), 2)
+        self.assertEqual(rf.file_checksum, hashlib.md5(self.pdf).hexdigest())
+        self.assertEqual(rf.file_checksum, rf.generate_checksum())
+        self.assertEqual(rf.download_status, ReportFile.DOWNLOAD_STATUS_SUCCESS)
+
+    def test_multipart_upload_invalid(self):
+        response = self.client.post('/submissionapi/v2/manage/report-file/upload', data={
+            'report_id': 1,
+            'report_language': ['eng'],
+            'file': SimpleUploadedFile('uploaded_report.pdf', b'not a pdf', content_type='application/pdf'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertIn('file', response.data)
+
+    def test_multipart_upload_report_and_report_file(self):
+        response = self.client.post('/submissionapi/v2/manage/report-file/upload', data={
+            'report_id': 1,
+            'report_file_id': 1,
+            'report_language': ['eng'],
+            'file': SimpleUploadedFile('uploaded_report.pdf', self.pdf, content_type='application/pdf'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400, response.data)
+
+    def test_resumable_upload(self):
+        response = self.client.post('/submissionapi/v2/manage/report-file/uploads', data={
+            'report_file_id': 1,
+            'report_language': ['eng'],
+            'file_name': 'replaced_report.pdf',
+            'size': len(self.pdf),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        url = f"/submissionapi/v2/manage/report-file/uploads/{response.data['upload_id']}"
+        half = len(self.pdf) // 2
+
+        # first chunk
+        response = self.client.put(url, data=self.pdf[:half], content_type='application/octet-stream',
+                                   HTTP_CONTENT_RANGE=f'bytes 0-{half - 1}/{len(self.pdf)}')
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertEqual(response.data['offset'], half)
+
+        # chunk at wrong position is rejected, status tells where to resume
+        response = self.client.put(url, data=self.pdf[10:half], content_type='application/octet-stream',
+                                   HTTP_CONTENT_RANGE=f'bytes 10-{half - 1}/{len(self.pdf)}')
+        self.assertEqual(response.status_code, 409, response.data)
+        response = self.client.get(url)
+        self.assertEqual(response.data['offset'], half)
+
+        # final chunk
+        response = self.client.put(url, data=self.pdf[half:], content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['report_file_id'], 1)
+        rf = ReportFile.objects.get(pk=1)
+        self.assertEqual(rf.file_checksum, hashlib.md5(self.pdf).hexdigest())
+        self.assertEqual(rf.file.read(), self.pdf)
+        self.assertFalse(ReportFileUpload.objects.exists())
+
+    def test_resumable_upload_completed_twice(self):
+        upload = self.start_upload()
+        url = f"/submissionapi/v2/manage/report-file/uploads/{upload.id}"
+        report_files = ReportFile.objects.count()
+        response = self.client.put(url, data=self.pdf[10:], content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 200, response.data)
+        # a retried final chunk, or an empty one, does not store the file again
+        response = self.client.put(url, data=self.pdf[10:], content_type='application/octet-stream',
+                                   HTTP_CONTENT_RANGE=f'bytes 10-{len(self.pdf) - 1}/{len(self.pdf)}')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.put(url, data=b'', content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(ReportFile.objects.count(), report_files + 1)
+
+    def test_resumable_upload_too_large(self):
+        response = self.client.post('/submissionapi/v2/manage/report-file/uploads', data={
+            'report_id': 1,
+            'report_language': ['eng'],
+            'file_name': 'report.pdf',
+            'size': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        url = f"/submissionapi/v2/manage/report-file/uploads/{response.data['upload_id']}"
+        response = self.client.put(url, data=self.pdf, content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertEqual(self.client.get(url).data['offset'], 0)
+
+    def start_upload(self):
+        response = self.client.post('/submissionapi/v2/manage/report-file/uploads', data={
+            'report_id': 1,
+            'report_language': ['eng'],
+            'file_name': 'report.pdf',
+            'size': len(self.pdf),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        upload = ReportFileUpload.objects.get(pk=response.data['upload_id'])
+        response = self.client.put(f"/submissionapi/v2/manage/report-file/uploads/{upload.id}",
+                                   data=self.pdf[:10], content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertTrue(os.path.isfile(upload.partial_file_path))
+        return upload
+
+    def test_resumable_upload_permission_revoked(self):
+        upload = self.start_upload()
+        AgencyProxy.objects.filter(submitting_agency_id=1, allowed_agency_id=5).delete()
+        response = self.client.put(f"/submissionapi/v2/manage/report-file/uploads/{upload.id}",
+                                   data=self.pdf[10:], content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 403, response.data)
+        upload.refresh_from_db()
+        self.assertEqual(upload.offset, 10)
+
+    def test_resumable_upload_expired(self):
+        upload = self.start_upload()
+        ReportFileUpload.objects.filter(pk=upload.pk).update(
+            updated_at=ReportFileUpload.expiry_date() - datetime.timedelta(minutes=1))
+        response = self.client.put(f"/submissionapi/v2/manage/report-file/uploads/{upload.id}",
+                                   data=self.pdf[10:], content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 404)
+
+    def test_partial_file_removed_with_report(self):
+        upload = self.start_upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            Report.objects.filter(pk=1).delete()
+        self.assertFalse(ReportFileUpload.objects.exists())
+        self.assertFalse(os.path.isfile(upload.partial_file_path))
+
+    def test_clean_report_file_uploads(self):
+        expired = self.start_upload()
+        current = self.start_upload()
+        ReportFileUpload.objects.filter(pk=expired.pk).update(
+            updated_at=ReportFileUpload.expiry_date() - datetime.timedelta(minutes=1))
+        orphan = os.path.join(os.path.dirname(current.partial_file_path), 'orphan')
+        with open(orphan, 'wb') as f:
+            f.write(self.pdf[:10])
+        os.utime(orphan, (0, 0))
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('clean_report_file_uploads', stdout=out)
+        self.assertIn('deleted 1 uploads and 1 orphaned partial files', out.getvalue())
+        self.assertEqual(list(ReportFileUpload.objects.values_list('id', flat=True)), [current.id])
+        self.assertFalse(os.path.isfile(expired.partial_file_path))
+        self.assertFalse(os.path.isfile(orphan))
+        self.assertTrue(os.path.isfile(current.partial_file_path))
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from adminapi.fields import PDFBase64File
+from django.conf import settings
+
+from adminapi.fields import PDFBase64File, PDFFile
 from reports.models import ReportFile
 from submissionapi.serializer_fields.report_identifier_field_with_integer import ReportIdentifierPlusIntegerField
 from submissionapi.serializer_fields.report_language_field import ReportLanguageField
@@ -76,3 +78,52 @@ class ReportFileDeleteSerializer(serializers.Serializer):
 
     class Meta:
         ref_name = "ReportFileDeleteSerializer"
+
+
+class ReportFileUploadSerializer(serializers.Serializer):
+    report_id = ReportIdentifierPlusIntegerField(required=False, label='DEQAR identifier of the report, to add a file')
+    report_file_id = serializers.PrimaryKeyRelatedField(
+        required=False, label='Identifier of the report-file record, to replace its file', queryset=ReportFile.objects.all()
+    )
+    report_language = serializers.ListField(child=ReportLanguageField(required=True), required=True,
+                                            label='Language(s) of the report',
+                                            help_text='example: ["eng", "ger"]')
+    file_name = serializers.CharField(required=False, max_length=255,
+                                      label='The name of the file',
+                                      help_text='example: ACQUIN_institutional_report.pdf')
+
+    def validate(self, data):
+        if bool(data.get('report_id', None)) == bool(data.get('report_file_id', None)):
+            raise ValidationError("Please provide either report_id or report_file_id.")
+        return super(ReportFileUploadSerializer, self).validate(data)
+
+    class Meta:
+        ref_name = "ReportFileUploadSerializer"
+
+
+class ReportFileMultipartUploadSerializer(ReportFileUploadSerializer):
+    file = PDFFile(required=True, label='The report file in PDF format')
+
+    def validate(self, data):
+        if not data.get('file_name', None):
+            data['file_name'] = data['file'].name
+        return super(ReportFileMultipartUploadSerializer, self).validate(data)
+
+    class Meta:
+        ref_name = "ReportFileMultipartUploadSerializer"
+
+
+class ReportFileUploadSessionSerializer(ReportFileUploadSerializer):
+    file_name = serializers.CharField(required=True, max_length=255,
+                                      label='The name of the file',
+                                      help_text='example: ACQUIN_institutional_report.pdf')
+    size = serializers.IntegerField(required=True, min_value=1, label='Total size of the file in bytes')
+
+    def validate_size(self, value):
+        max_size = getattr(settings, 'PDF_UPLOAD_MAX_SIZE', None)
+        if max_size and value > max_size:
+            raise ValidationError(f"File is larger than the maximum size of {max_size} bytes")
+        return value
+
+    class Meta:
+        ref_name = "ReportFileUploadSessionSerializer"
@@ -0,0 +1,84 @@
+import traceback
+
+from ipware import get_client_ip
+
+from django.core.exceptions import ValidationError
+
+from submissionapi.trackers.submission_tracker import SubmissionTracker
+from submissionapi.tasks import send_submission_email
+from submissionapi.v2.submission_package_handler import SubmissionPackageHandler
+
+
+class SubmissionBatchHandler(SubmissionPackageHandler):
+    """
+    Handles a list of submission packages in one request: packages are validated with lookups shared
+    across the batch, each one is applied in its own transaction, and one summary email is sent.
+    """
+    origin = 'api-batch'
+    log_note = "Report %sd via API (batch)."
+
+    def __init__(self, request, serializer_class, action):
+        super(SubmissionBatchHandler, self).__init__(request, serializer=None, action=action)
+        self.serializer_class = serializer_class
+        self.response = []
+        self.accepted = []
+
+    def handle(self):
+        # Tracking
+        client_ip, is_routable = get_client_ip(self.request)
+        tracker = SubmissionTracker(original_data=self.request.data,
+                                    origin=self.origin,
+                                    user_profile=self.request.user.deqarprofile,
+                                    ip_address=client_ip)
+        tracker.log_package()
+
+        context = {
+            'request': self.request,
+            'lookup_cache': {},
+        }
+        error_messages = []
+
+        for index, data in enumerate(self.request.data):
+            serializer = self.serializer_class(data=data, context=context)
+
+            if not serializer.is_valid():
+                error_messages.append(serializer.errors)
+                self.response.append(self._make_package_error_response(index, data, serializer.errors))
+                continue
+
+            try:
+                populator, flagger = self._submit_report(tracker, serializer.validated_data)
+            except ValidationError as error:
+                errors = dict(error) if hasattr(error, "error_dict") else list(error)
+                error_messages.append(errors)
+                self.response.append(self._make_package_error_response(index, data, errors))
+            except Exception as unexpected:
+                error_messages.append({
+                    "unexpected_error": str(unexpected),
+                    "traceback": traceback.format_exc()
+                })
+                self.response.append(self._make_package_error_response(index, data, [[f"Server error! - {str(unexpected)}"]]))
+            else:
+                success = dict(index=index, **self._report_response(populator, flagger))
+                error_messages.append(None)
+                self.response.append(success)
+                self.accepted.append(success)
+
+        # Log all errors of the package at once
+        tracker.log_errors(error_messages)
+
+        # Send one email summarising the whole batch
+        if self.accepted:
+            send_submission_email.delay(response=self.accepted,
+                                        institution_id_max=self.max_inst,
+                                        total_submission=len(self.response),
+                                        agency_email=self.request.user.email,
+                                        version='v2')
+
+    def _make_package_error_response(self, index, data, errors):
+        return {
+            'index': index,
+            'submission_status': 'errors',
+            'original_data': data,
+            'errors': errors
+        }
@@ -13,6 +13,9 @@ from submissionapi.tasks import send_submission_email
 
 
 class SubmissionPackageHandler:
+    origin = 'api-v2'
+    log_note = "Report %sd via API."
+
     def __init__(self, request, serializer, action):
         self.max_inst = self._get_max_inst()
         self.request = request
@@ -27,30 +30,14 @@ class SubmissionPackageHandler:
         # Tracking
         client_ip, is_routable = get_client_ip(self.request)
         tracker = SubmissionTracker(original_data=self.request.data,
-                                    origin='api-v2',
+                                    origin=self.origin,
                                     user_profile=self.request.user.deqarprofile,
                                     ip_address=client_ip)
         tracker.log_package()
 
         if self.serializer.is_valid():
             try:
-                with transaction.atomic():
-                    self.populator = Populator(data=self.serializer.validated_data, user=self.request.user)
-                    self.populator.populate(action=self.action)
-
-                    self.flagger = ReportFlagger(
-                        report=self.populator.report,
-                        agency_email=self.request.user.email
-                    )
-                    self.flagger.check_and_set_flags()
-                    # Add submission report log
-                    tracker.log_report(self.populator, self.flagger)
-                    # Add log entry
-                    ReportUpdateLog.objects.create(
-                        report=self.populator.report,
-                        note="Report %sd via API." % self.action,
-                        updated_by=self.request.user
-                    )
+                self.populator, self.flagger = self._submit_report(tracker, self.serializer.validated_data)
             except ValidationError as error:
                 if hasattr(error, "error_dict"):
                     tracker.log_errors(dict(error))
@@ -78,26 +65,53 @@ class SubmissionPackageHandler:
             max_inst = 0
         return max_inst
 
-    def _make_success_response(self):
-        institution_warnings = self.populator.institution_flag_log
-        report_warnings = [fl.flag_message for fl in self.flagger.report.reportflag_set.filter(active=True)]
+    def _submit_report(self, tracker, validated_data):
+        """
+        Populate, flag and log one submitted report in a transaction; returns the populator and the flagger
+        """
+        with transaction.atomic():
+            populator = Populator(data=validated_data, user=self.request.user)
+            populator.populate(action=self.action)
+
+            flagger = ReportFlagger(
+                report=populator.report,
+                agency_email=self.request.user.email
+            )
+            flagger.check_and_set_flags()
+            # Add submission report log
+            tracker.log_report(populator, flagger)
+            # Add log entry
+            ReportUpdateLog.objects.create(
+                report=populator.report,
+                note=self.log_note % self.action,
+                updated_by=self.request.user
+            )
+        return populator, flagger
+
+    @staticmethod
+    def _report_response(populator, flagger):
+        institution_warnings = populator.institution_flag_log
+        report_warnings = [fl.flag_message for fl in flagger.report.reportflag_set.filter(active=True)]
 
         if len(institution_warnings) > 0 or len(report_warnings) > 0:
             sanity_check_status = "warnings"
         else:
             sanity_check_status = "success"
 
-        serializer = ResponseReportSerializer(self.flagger.report)
+        serializer = ResponseReportSerializer(flagger.report)
 
-        self.response = {
+        return {
             'submission_status': 'success',
             'submitted_report': serializer.data,
             'sanity_check_status': sanity_check_status,
-            'report_flag': self.flagger.report.flag.flag,
+            'report_flag': flagger.report.flag.flag,
             'report_warnings': report_warnings,
             'institution_warnings': institution_warnings
         }
 
+    def _make_success_response(self):
+        self.response = self._report_response(self.populator, self.flagger)
+
     def _make_error_response(self):
         self.response = {
             'submission_status': 'errors',
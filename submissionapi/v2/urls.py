@@ -5,8 +5,9 @@ from rest_framework import permissions
 
 from submissionapi.v2.views.csv_upload_report_view import SubmissionCSVView
 from submissionapi.v2.views.check_local_identifier_view import CheckLocalIdentifierView
-from submissionapi.v2.views.submission_report_view import SubmissionReportView, ReportDelete
-from submissionapi.v2.views.submission_report_file_views import ReportFileView
+from submissionapi.v2.views.submission_report_view import SubmissionReportView, SubmissionBatchView, ReportDelete
+from submissionapi.v2.views.submission_report_file_views import ReportFileView, ReportFileUploadView, \
+    ReportFileUploadSessionView, ReportFileUploadChunkView
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -25,11 +26,16 @@ app_name = 'submissionapi'
 
 urlpatterns = [
     re_path(r'^submit/report$', SubmissionReportView.as_view(), name='submit-report-v2'),
+    re_path(r'^submit/reports$', SubmissionBatchView.as_view(), name='submit-reports-batch'),
     re_path(r'^submit/csv', SubmissionCSVView.as_view(), name='submit-csv'),
 
     re_path(r'^check/local-identifier', CheckLocalIdentifierView.as_view(), name='check-report-local-identifier'),
 
     re_path(r'^manage/report-file$', ReportFileView.as_view(), name='report_file-manage'),
+    re_path(r'^manage/report-file/upload$', ReportFileUploadView.as_view(), name='report_file-upload'),
+    re_path(r'^manage/report-file/uploads$', ReportFileUploadSessionView.as_view(), name='report_file-upload-session'),
+    re_path(r'^manage/report-file/uploads/(?P<upload_id>[0-9a-f-]+)$', ReportFileUploadChunkView.as_view(),
+            name='report_file-upload-chunk'),
     re_path(r'^delete/report/(?P<pk>[0-9]+)/$', ReportDelete.as_view(), name='report-delete'),
 
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=None), name='schema-json'),
@@ -1,12 +1,23 @@
+import os
+import re
+
+from django.core.files import File
+from django.db import transaction
+from django.utils.decorators import method_decorator
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from adminapi.fields import is_valid_pdf
 from reports.models import ReportFile
+from submissionapi.models import ReportFileUpload
 from submissionapi.populators.report_file_populator import ReportFilePopulator
 from submissionapi.v2.serializers.report_file_serializer import ReportFileCreateSerializer, ReportFileUpdateSerializer, \
-    ReportFileDeleteSerializer
+    ReportFileDeleteSerializer, ReportFileMultipartUploadSerializer, ReportFileUploadSessionSerializer
 
 
 class ReportFileView(APIView):
@@ -100,3 +111,193 @@ class ReportFileView(APIView):
                                 status=status.HTTP_403_FORBIDDEN)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def get_report_file_populator(user, data, report_file_data=None):
+    """
+    Populator for adding a file to data['report_id'] or replacing the file of data['report_file_id']
+    """
+    report_file = data.get('report_file_id', None)
+    return ReportFilePopulator(
+        report=report_file.report if report_file else data['report_id'],
+        report_file=report_file,
+        report_file_data=report_file_data,
+        user=user
+    )
+
+
+def store_report_file(populator, file, file_name, languages):
+    """
+    Create or update the report file from an uploaded file object
+    """
+    populator.report_file_data = {
+        'file': file,
+        'file_name': file_name,
+        'report_language': languages,
+    }
+    with transaction.atomic():
+        if populator.report_file:
+            populator.report_file_update()
+        else:
+            populator.report_file_create()
+    return Response({
+        'report_file_id': populator.report_file.id,
+        'file_checksum': populator.report_file.file_checksum,
+    }, status=status.HTTP_200_OK)
+
+
+class ReportFileUploadView(APIView):
+    parser_classes = (MultiPartParser,)
+
+    @swagger_auto_schema(
+        request_body=ReportFileMultipartUploadSerializer,
+        responses={
+            '200': 'report file ID and checksum',
+            '400': 'errors',
+            '403': "You don't have permission to add files to this report."
+        })
+    def post(self, request, *args, **kwargs):
+        """
+            Upload of a report file as multipart/form-data, to add it to a report or replace an existing file
+        """
+        serializer = ReportFileMultipartUploadSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            populator = get_report_file_populator(request.user, serializer.validated_data)
+            if populator.check_permission():
+                return store_report_file(populator, serializer.validated_data['file'],
+                                         serializer.validated_data['file_name'],
+                                         serializer.validated_data['report_language'])
+            else:
+                return Response({"error": "You don't have permission to add files to this report."},
+                                status=status.HTTP_403_FORBIDDEN)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ReportFileUploadSessionView(APIView):
+    @swagger_auto_schema(
+        request_body=ReportFileUploadSessionSerializer,
+        responses={
+            '201': 'upload ID and offset',
+            '400': 'errors',
+            '403': "You don't have permission to add files to this report."
+        })
+    def post(self, request, *args, **kwargs):
+        """
+            Start a resumable upload of a report file; the content is then sent in one or more chunks
+        """
+        serializer = ReportFileUploadSessionSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            populator = get_report_file_populator(request.user, serializer.validated_data)
+            if populator.check_permission():
+                upload = ReportFileUpload.objects.create(
+                    user=request.user,
+                    report=populator.report,
+                    report_file=populator.report_file,
+                    file_name=serializer.validated_data['file_name'],
+                    size=serializer.validated_data['size']
+                )
+                upload.languages.set(serializer.validated_data['report_language'])
+                return Response(ReportFileUploadChunkView.upload_status(upload), status=status.HTTP_201_CREATED)
+            else:
+                return Response({"error": "You don't have permission to add files to this report."},
+                                status=status.HTTP_403_FORBIDDEN)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@method_decorator(name='put', decorator=swagger_auto_schema(
+    manual_parameters=[
+        openapi.Parameter('Content-Range', openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False,
+                          description='Position of the chunk, e.g. "bytes 0-1048575/5242880"; '
+                                      'defaults to the current offset'),
+    ],
+    responses={
+        '200': 'report file ID and checksum, once the upload is complete',
+        '202': 'upload ID and offset',
+        '400': 'errors',
+        '403': "You don't have permission to add files to this report.",
+        '404': 'upload not found, expired or already complete',
+        '409': 'chunk does not start at the current offset',
+    }
+))
+class ReportFileUploadChunkView(APIView):
+    CHUNK_SIZE = 1024 * 1024
+    content_range = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+    @staticmethod
+    def upload_status(upload):
+        return {
+            'upload_id': upload.id,
+            'offset': upload.offset,
+            'size': upload.size,
+        }
+
+    def get_upload(self, request, for_update=False):
+        queryset = ReportFileUpload.objects.select_for_update() if for_update else ReportFileUpload.objects
+        return get_object_or_404(queryset, pk=self.kwargs['upload_id'], user=request.user,
+                                 updated_at__gte=ReportFileUpload.expiry_date())
+
+    def get(self, request, *args, **kwargs):
+        """
+            Status of a resumable upload: the offset where the next chunk has to start
+        """
+        return Response(self.upload_status(self.get_upload(request)), status=status.HTTP_200_OK)
+
+    def put(self, request, *args, **kwargs):
+        """
+            Send a chunk of a resumable upload as raw binary body; the report file is stored once complete
+        """
+        with transaction.atomic():
+            upload = self.get_upload(request, for_update=True)
+            # permissions may have been revoked since the upload was started
+            populator = ReportFilePopulator(report=upload.report, report_file=upload.report_file, user=request.user)
+            if not populator.check_permission():
+                return Response({"error": "You don't have permission to add files to this report."},
+                                status=status.HTTP_403_FORBIDDEN)
+            start = upload.offset
+            if 'Content-Range' in request.headers:
+                match = self.content_range.match(request.headers['Content-Range'])
+                if not match:
+                    return Response({"error": "Invalid Content-Range header."}, status=status.HTTP_400_BAD_REQUEST)
+                start = int(match.group(1))
+            if start != upload.offset:
+                return Response(dict(error="Chunk does not start at the current offset.", **self.upload_status(upload)),
+                                status=status.HTTP_409_CONFLICT)
+
+            os.makedirs(os.path.dirname(upload.partial_file_path), exist_ok=True)
+            with open(upload.partial_file_path, 'r+b' if os.path.isfile(upload.partial_file_path) else 'wb') as f:
+                # discard anything written beyond the offset by an interrupted request
+                f.seek(upload.offset)
+                f.truncate()
+                offset = upload.offset
+                stream = request.stream
+                for chunk in iter(lambda: stream.read(self.CHUNK_SIZE) if stream else b'', b''):
+                    offset += len(chunk)
+                    if offset > upload.size:
+                        f.truncate(upload.offset)
+                        return Response({"error": "Chunk exceeds the announced file size."},
+                                        status=status.HTTP_400_BAD_REQUEST)
+                    f.write(chunk)
+            upload.offset = offset
+            upload.save()
+
+            if not upload.complete:
+                return Response(self.upload_status(upload), status=status.HTTP_202_ACCEPTED)
+
+            # finalised while the upload is still locked, so that a retried or concurrent request finds it deleted
+            with open(upload.partial_file_path, 'rb') as f:
+                if not is_valid_pdf(f):
+                    upload.delete()
+                    return Response({"file": ["File is not a valid pdf file"]}, status=status.HTTP_400_BAD_REQUEST)
+                response = store_report_file(populator, File(f, name=upload.file_name), upload.file_name,
+                                             list(upload.languages.all()))
+            upload.delete()
+        return response
+
+    def delete(self, request, *args, **kwargs):
+        """
+            Abort a resumable upload
+        """
+        self.get_upload(request).delete()
+        return Response('deleted', status=status.HTTP_200_OK)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, generics
 from rest_framework.generics import get_object_or_404
@@ -12,6 +13,7 @@ from submissionapi.v2.serializers.response_serializers import ResponseReportSucc
     ResponseReportErrorResponseSerializer
 from submissionapi.v2.serializers.submisson_serializers import SubmissionPackageCreateSerializer, \
     SubmissionPackageUpdateSerializer
+from submissionapi.v2.submission_batch_handler import SubmissionBatchHandler
 from submissionapi.v2.submission_package_handler import SubmissionPackageHandler
 
 
@@ -65,6 +67,47 @@ class SubmissionReportView(APIView):
             return Response(handler.response, status=status.HTTP_400_BAD_REQUEST)
     '''
 
+class SubmissionBatchView(APIView):
+    """
+        Submission of several report data packages in one request
+    """
+    def handle_batch(self, request, serializer_class, action):
+        max_packages = getattr(settings, "SUBMISSION_BATCH_MAX_PACKAGES", 500)
+        if not isinstance(request.data, list):
+            return Response({'errors': ['Please submit a list of report data packages.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > max_packages:
+            return Response({'errors': [f'A batch may contain at most {max_packages} report data packages.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        handler = SubmissionBatchHandler(request=request, serializer_class=serializer_class, action=action)
+        handler.handle()
+        return Response(handler.response, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        request_body=SubmissionPackageCreateSerializer(many=True),
+        responses={
+            '200': ResponseReportSuccessResponseSerializer(many=True),
+            '400': 'Request body is not a list or exceeds the batch size limit'
+        })
+    def post(self, request):
+        """
+            Submission of report data for several new reports not yet recorded in DEQAR
+        """
+        return self.handle_batch(request, SubmissionPackageCreateSerializer, 'create')
+
+    @swagger_auto_schema(
+        request_body=SubmissionPackageUpdateSerializer(many=True),
+        responses={
+            '200': ResponseReportSuccessResponseSerializer(many=True),
+            '400': 'Request body is not a list or exceeds the batch size limit'
+        })
+    def put(self, request):
+        """
+            Submission of updated report data for several existing reports
+        """
+        return self.handle_batch(request, SubmissionPackageUpdateSerializer, 'update')
+
+
 class ReportDelete(APIView):
     """
         Requests report records to be not visible on the public and on the search interface.
@@ -161,16 +161,4 @@ def validate_submission_package_root(data):
     return data
 
 def calculate_activity_type_id(activities):
-    # Default = institutional
-    activity_type_id = 2
-    for activity in activities:
-        # If there is a programme or institutional/programme activity, set the activity type to programme
-        # if there was no joint/programme activity before
-        if activity.activity_type_id == 1 or activity.activity_type_id == 4:
-            if activity_type_id == 2:
-                activity_type_id = activity.activity_type_id
-        # If there is a joint/programme activity, set the activity type to joint programme
-        # all the time
-        elif activity.activity_type_id == 3:
-            activity_type_id = 3
-    return activity_type_id
+    return Report.calculate_activity_type(activity.activity_type_id for activity in activities)
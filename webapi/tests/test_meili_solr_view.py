@@ -0,0 +1,118 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from webapi.v2.views.meili_solr_view import MeiliSolrBackportView
+
+
+class CursorView(MeiliSolrBackportView):
+    CURSOR_FIELDS = ( 'valid_from', 'report.created_at' )
+
+
+class ExportView(MeiliSolrBackportView):
+    permission_classes = ()
+    MEILI_INDEX = 'INDEX_REPORTS'
+    EXPORT_BATCH_SIZE = 2
+
+    def make_filters(self, request):
+        return [ 'flag != "high level"' ]
+
+    def make_meili_params(self, request):
+        return { 'attributesToRetrieve': [ 'id', 'agency' ] }
+
+    def convert_hit(self, hit):
+        hit['agency_acronym'] = hit['agency'].pop('acronym_primary')
+
+
+class MeiliSolrBackportViewTest(SimpleTestCase):
+    """
+    Test pagination helpers of the Meilisearch-based v2 list views
+    """
+
+    def setUp(self):
+        self.view = CursorView()
+
+    def get_request(self, **params):
+        return Request(APIRequestFactory().get('/', params))
+
+    def test_get_page(self):
+        hits = list(range(200))
+        for offset in range(0, 100):
+            for limit in range(1, 25):
+                page, size, skip = self.view.get_page(offset, limit)
+                page_hits = hits[(page - 1) * size:page * size]
+                self.assertEqual(page_hits[skip:skip + limit], hits[offset:offset + limit])
+        self.assertEqual(self.view.get_page(20, 10), (3, 10, 0))
+        self.assertEqual(self.view.get_page(15, 0), (1, 0, 0))
+
+    def test_cursor_roundtrip(self):
+        hit = { 'id': 42, 'report': { 'created_at': 1700000000 } }
+        cursor = self.view.encode_cursor('report.created_at', hit)
+        self.assertEqual(self.view.decode_cursor(cursor, 'report.created_at'), [ 1700000000, 42 ])
+        cursor = self.view.encode_cursor(None, hit)
+        self.assertEqual(self.view.decode_cursor(cursor, None), [ 42 ])
+        with self.assertRaises(ParseError):
+            self.view.decode_cursor(cursor, 'report.created_at')
+        with self.assertRaises(ParseError):
+            self.view.decode_cursor('not a cursor', None)
+
+    def test_cursor_params(self):
+        request = self.get_request()
+        self.assertEqual(self.view.make_cursor_params(request, None, '*'), (None, [ 'id:asc' ], None))
+        cursor = self.view.encode_cursor(None, { 'id': 7 })
+        self.assertEqual(self.view.make_cursor_params(request, None, cursor), (None, [ 'id:asc' ], 'id > 7'))
+
+        cursor = self.view.encode_cursor('valid_from', { 'id': 7, 'valid_from': 1000 })
+        self.assertEqual(self.view.make_cursor_params(request, [ 'valid_from:desc' ], cursor), (
+            'valid_from',
+            [ 'valid_from:desc', 'id:asc' ],
+            'valid_from < 1000 OR (valid_from = 1000 AND id > 7)'
+        ))
+
+        # relevance ordering of a search query and ordering by other fields cannot be paginated by cursor
+        with self.assertRaises(ParseError):
+            self.view.make_cursor_params(self.get_request(query='test'), None, '*')
+        with self.assertRaises(ParseError):
+            self.view.make_cursor_params(request, [ 'name_sort:asc' ], '*')
+
+    def export(self, **params):
+        documents = [ { 'id': i, 'agency': { 'id': 5, 'acronym_primary': 'ACQUIN' } } for i in range(5) ]
+        def fetch_documents(index, parameters):
+            offset = parameters['offset']
+            return { 'results': documents[offset:offset + parameters['limit']], 'total': len(documents) }
+
+        with mock.patch('webapi.v2.views.meili_solr_view.MeiliClient') as client:
+            client.return_value.INDEX_REPORTS = 'test_reports'
+            client.return_value.fetch_documents.side_effect = fetch_documents
+            response = ExportView.as_view()(APIRequestFactory().get('/', params))
+            content = b''.join(response.streaming_content).decode() if response.streaming else None
+            return response, content, client.return_value.fetch_documents.call_args_list
+
+    def test_export_ndjson(self):
+        response, content, calls = self.export(export='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="test_reports.ndjson"')
+        lines = content.splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[4], '{"id": 4, "agency": {"id": 5}, "agency_acronym": "ACQUIN"}')
+        self.assertEqual([ c.args[1]['offset'] for c in calls ], [ 0, 2, 4 ])
+        self.assertEqual(calls[0].args[1]['filter'], [ 'flag != "high level"' ])
+        self.assertEqual(calls[0].args[1]['fields'], [ 'id', 'agency' ])
+
+    def test_export_csv(self):
+        response, content, calls = self.export(export='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = content.splitlines()
+        self.assertEqual(lines[0], 'id,agency,agency_acronym')
+        self.assertEqual(lines[1], '0,"{""id"": 5}",ACQUIN')
+        self.assertEqual(len(lines), 6)
+
+    def test_export_errors(self):
+        response, content, calls = self.export(export='xml')
+        self.assertEqual(response.status_code, 400)
+        response, content, calls = self.export(export='csv', query='test')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(calls, [])
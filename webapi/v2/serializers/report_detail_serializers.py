@@ -1,6 +1,5 @@
 import datetime
 
-from django.db.models import Q
 from datedelta import datedelta
 from institutions.models import Institution
 from reports.models import Report
@@ -85,7 +84,6 @@ class ReportDetailSerializer(serializers.ModelSerializer):
     programmes = ProgrammeSerializer(many=True, source='programme_set')
     status = serializers.StringRelatedField()
     decision = serializers.StringRelatedField()
-    crossborder = serializers.SerializerMethodField()
     flag = serializers.StringRelatedField()
     report_valid = serializers.SerializerMethodField()
 
@@ -103,15 +101,6 @@ class ReportDetailSerializer(serializers.ModelSerializer):
         else:
             return 'N/A'
 
-    def get_crossborder(self, obj):
-        crossborder = False
-        focus_countries = obj.agency.agencyfocuscountry_set
-        for inst in obj.institutions.iterator():
-            for ic in inst.institutioncountry_set.iterator():
-                if focus_countries.filter(Q(country__id=ic.country.id) & Q(country_is_crossborder=True)):
-                    crossborder = True
-        return crossborder
-
     def get_report_valid(self, obj):
         valid_from = obj.valid_from
         valid_to = obj.valid_to
@@ -1,9 +1,13 @@
+import base64
+import binascii
+import csv
 import datetime
 import json
 import re
 
 from collections import defaultdict
 
+from django.http import StreamingHttpResponse
 from rest_framework.exceptions import ParseError
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
@@ -13,6 +17,14 @@ from eqar_backend.meilisearch import MeiliClient
 from meilisearch.errors import MeilisearchApiError
 
 
+class EchoBuffer:
+    """
+    Pseudo-buffer for csv.writer, returning what is written instead of storing it
+    """
+    def write(self, value):
+        return value
+
+
 class MeiliSolrBackportView(ListAPIView):
     """
     A compatibility view for the legacy v2 API, originally based on Solr. The class helps
@@ -26,7 +38,27 @@ class MeiliSolrBackportView(ListAPIView):
      - FACET_NAMES (dict) : maps the name of Meili facets to old (Solr) ones for the API response
      - FACET_LOOKUP (dict of dicts) : specifies which (numeric) facet values have to be looked up in DB,
                      member dicts of the format { 'model': Model, 'attribute': 'attribute to return' }
+     - CURSOR_FIELDS (tuple) : Meili fields (numeric and always set) by which results can be ordered when using
+                     cursor pagination; relevance ordering without a search query is always possible
+
+    Besides limit/offset, the view supports keyset pagination: with cursor=* the first page is returned along
+    with an opaque next_cursor, which is passed as cursor to get the next page. Results are then ordered by the
+    sort key plus id, and each page is fetched with a range filter, at constant cost however deep it is. On
+    pages after the first, count only includes the hits from the cursor position onwards, and no facets are
+    returned.
+
+    With export=ndjson or export=csv, all documents matching the filters are streamed instead, fetched in batches
+    through the Meilisearch documents API. There is no text search, ordering or faceting in export mode. In CSV,
+    nested values are JSON-encoded; columns are taken from CSV_FIELDS (list) if set, or from the first document.
     """
+    CURSOR_FIELDS = ()
+    CURSOR_START = '*'
+    CSV_FIELDS = None
+    EXPORT_FORMATS = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+    EXPORT_BATCH_SIZE = 1000
 
     def zero_or_more(self, request, field, default):
         """
@@ -72,6 +104,80 @@ class MeiliSolrBackportView(ListAPIView):
             raise ParseError(detail=f'unknown field [{field}] for ordering')
 
 
+    def get_page(self, offset, limit):
+        """
+        Meilisearch only supports pages of the same size, so find the smallest page size that fits all requested hits
+        on one page - returns page number, page size and position of the first requested hit on that page
+        """
+        if limit == 0:
+            return 1, 0, 0
+        size = limit
+        while offset // size != (offset + limit - 1) // size:
+            size += 1
+        return offset // size + 1, size, offset % size
+
+
+    def encode_cursor(self, sort_field, hit):
+        """
+        create opaque cursor pointing after hit
+        """
+        position = [ hit['id'] ]
+        if sort_field:
+            position.insert(0, self.get_hit_value(hit, sort_field))
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+    def decode_cursor(self, cursor, sort_field):
+        """
+        decode cursor into position (sort key value and id)
+        """
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, UnicodeError, ValueError):
+            raise ParseError(detail=f'invalid cursor [{cursor}]')
+        if not isinstance(position, list) or len(position) != (2 if sort_field else 1) \
+                or not all(isinstance(value, int) for value in position):
+            raise ParseError(detail=f'invalid cursor [{cursor}]')
+        return position
+
+
+    def get_hit_value(self, hit, field):
+        """
+        get value of a (possibly nested, dot-separated) field from a hit
+        """
+        for key in field.split('.'):
+            hit = hit[key]
+        return hit
+
+
+    def make_cursor_params(self, request, sort, cursor):
+        """
+        keyset pagination: order by sort key and id, and filter for hits after the cursor position
+
+        returns the sort field (None for id only), sort parameter and filter (or None, on the first page)
+        """
+        if sort is None:
+            if request.query_params.get('query', ''):
+                raise ParseError(detail='cursor cannot be used with relevance ordering of a search query')
+            sort_field, direction = None, 'asc'
+        else:
+            sort_field, direction = sort[0].rsplit(':', 1)
+            if sort_field not in self.CURSOR_FIELDS:
+                raise ParseError(detail=f'cursor cannot be used with ordering by [{sort_field}]')
+
+        if cursor == self.CURSOR_START:
+            cursor_filter = None
+        elif sort_field:
+            value, last_id = self.decode_cursor(cursor, sort_field)
+            operator = '>' if direction == 'asc' else '<'
+            cursor_filter = f'{sort_field} {operator} {value} OR ({sort_field} = {value} AND id > {last_id})'
+        else:
+            last_id, = self.decode_cursor(cursor, sort_field)
+            cursor_filter = f'id > {last_id}'
+
+        return sort_field, (sort or []) + [ 'id:asc' ], cursor_filter
+
+
     def lookup_object(self, model, key, parameter, attribute, raw_parameter, multi=False):
         """
         If parameter is set, looks up model object against key and returns its attribute - otherwise raw_parameter if set
@@ -125,39 +231,130 @@ class MeiliSolrBackportView(ListAPIView):
         raise NotImplemented
 
 
+    def iter_documents(self, meili, index, parameters, response):
+        """
+        Yield converted documents, starting with the batch in response and fetching further ones as needed
+        """
+        offset = 0
+        while response['results']:
+            for document in response['results']:
+                self.convert_hit(document)
+                yield document
+            offset += len(response['results'])
+            if offset >= response['total']:
+                break
+            response = meili.fetch_documents(index, { **parameters, 'offset': offset })
+
+
+    def iter_ndjson(self, documents):
+        for document in documents:
+            yield json.dumps(document) + '\n'
+
+
+    def iter_csv(self, documents):
+        writer = None
+        for document in documents:
+            if writer is None:
+                writer = csv.DictWriter(EchoBuffer(), fieldnames=self.CSV_FIELDS or list(document.keys()),
+                                        extrasaction='ignore')
+                yield writer.writeheader()
+            yield writer.writerow({
+                key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                for key, value in document.items()
+            })
+
+
+    def export(self, request, export_format):
+        """
+        Stream all documents matching the filters as NDJSON or CSV
+        """
+        if export_format not in self.EXPORT_FORMATS:
+            raise ParseError(detail=f'unknown export format [{export_format}]')
+        if request.query_params.get('query', ''):
+            raise ParseError(detail='export does not support text search, only filters')
+
+        meili = MeiliClient()
+        index = getattr(meili, self.MEILI_INDEX)
+
+        parameters = {
+            'filter': self.make_filters(request),
+            'limit': self.EXPORT_BATCH_SIZE,
+        }
+        if fields := self.make_meili_params(request).get('attributesToRetrieve'):
+            parameters['fields'] = fields
+
+        try:
+            response = meili.fetch_documents(index, { **parameters, 'offset': 0 })
+        except MeilisearchApiError as e:
+            return Response(status=HTTP_400_BAD_REQUEST, data={'error': str(e)})
+
+        documents = self.iter_documents(meili, index, parameters, response)
+        if export_format == 'csv':
+            content = self.iter_csv(documents)
+        else:
+            content = self.iter_ndjson(documents)
+        streaming_response = StreamingHttpResponse(content, content_type=self.EXPORT_FORMATS[export_format])
+        streaming_response['Content-Disposition'] = f'attachment; filename="{index}.{export_format}"'
+        return streaming_response
+
+
     def list(self, request, *args, **kwargs):
         """
         The main view function
         """
         self.request = request
 
+        if export_format := request.query_params.get('export', None):
+            return self.export(request, export_format)
+
         limit = self.zero_or_more(request, 'limit', 10)
-        offset = self.zero_or_more(request, 'offset', 0)
+        cursor = request.query_params.get('cursor', None)
+        sort = self.convert_ordering(request.query_params.get('ordering', '-score'))
+        filters = self.make_filters(request)
+        facets = list(self.FACET_NAMES.keys())
+
+        if cursor is None:
+            offset = self.zero_or_more(request, 'offset', 0)
+            page, page_size, skip = self.get_page(offset, limit)
+        else:
+            offset = 0
+            page, page_size, skip = 1, limit, 0
+            sort_field, sort, cursor_filter = self.make_cursor_params(request, sort, cursor)
+            if cursor_filter:
+                filters.append(cursor_filter)
+                facets = []
 
         meili = MeiliClient()
         index = getattr(meili, self.MEILI_INDEX)
 
         params = {
-            'sort': self.convert_ordering(request.query_params.get('ordering', '-score')),
-            'filter': self.make_filters(request),
-            'facets': list(self.FACET_NAMES.keys()),
-            'hitsPerPage': limit,
-            'page': int(offset/limit) + 1 if limit > 0 else 1,
+            'sort': sort,
+            'filter': filters,
+            'facets': facets,
+            'hitsPerPage': page_size,
+            'page': page,
             **self.make_meili_params(request),
         }
+        if cursor is not None and 'attributesToRetrieve' in params:
+            params['attributesToRetrieve'] = params['attributesToRetrieve'] + [ 'id', (sort_field or 'id').split('.')[0] ]
 
         try:
             response = meili.meili.index(index).search(query=request.query_params.get('query', ''), opt_params=params)
         except MeilisearchApiError as e:
             return Response(status=HTTP_400_BAD_REQUEST, data={'error': str(e)})
 
+        hits = response['hits'][skip:skip + limit]
+        has_next = limit + offset < response['totalHits']
+        if cursor is not None:
+            next_cursor = self.encode_cursor(sort_field, hits[-1]) if has_next and hits else None
+
         # convert result structure
-        for r in response['hits']:
+        for r in hits:
             self.convert_hit(r)
 
         # rename, lookup and merge
         fields = defaultdict(lambda: defaultdict(int))
-        for facet_name, distribution in response['facetDistribution'].items():
+        for facet_name, distribution in response.get('facetDistribution', {}).items():
             for value, count in distribution.items():
                 if facet_name in self.FACET_LOOKUP:
                     try:
@@ -175,8 +372,8 @@ class MeiliSolrBackportView(ListAPIView):
         # create a response dict looking like the Solr one
         resp = {
             'count': response['totalHits'],
-            'next': (limit + offset < response['totalHits']),
-            'results': response['hits'],
+            'next': has_next,
+            'results': hits,
             'facets': {
                 'facet_queries': {},
                 'facet_fields': solr_fields,
@@ -185,5 +382,7 @@ class MeiliSolrBackportView(ListAPIView):
                 'facet_heatmaps': {},
             },
         }
+        if cursor is not None:
+            resp['next_cursor'] = next_cursor
 
         return Response(resp)
@@ -119,6 +119,7 @@ class ReportList(MeiliSolrBackportView):
         "activity": "agency_esg_activities.type",
         "flag": "flag",
     }
+    CURSOR_FIELDS = ( 'created_at', 'updated_at', 'valid_from', 'valid_to_calculated' )
     FACET_NAMES = {
         'agency.id': 'agency_facet',
         'contributing_agencies.id': 'agency_facet',
@@ -177,6 +177,7 @@ class InstitutionalReportsByInstitution(MeiliSolrBackportView):
         "valid_from": "valid_from",
         "valid_to_calculated": "valid_to_calculated",
     }
+    CURSOR_FIELDS = ( 'created_at', 'updated_at', 'valid_from', 'valid_to_calculated' )
     FACET_NAMES = {
         'agency.id': 'agency_facet',
         'contributing_agencies.id': 'agency_facet',
@@ -280,6 +281,7 @@ class ProgrammesByInstitution(MeiliSolrBackportView):
         "valid_from": "report.valid_from",
         "valid_to_calculated": "report.valid_to_calculated",
     }
+    CURSOR_FIELDS = ( 'report.created_at', 'report.updated_at', 'report.valid_from', 'report.valid_to_calculated' )
     FACET_NAMES = {
         'report.agency.id': 'agency_facet',
         'report.contributing_agencies.id': 'agency_facet',